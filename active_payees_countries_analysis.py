@@ -9,6 +9,7 @@ import config_rest
 from datetime import datetime
 from collections import defaultdict
 import json
+from profiling import maybe_profile
 
 def get_all_active_payees(api):
     """Получить всех активных payees с детальной информацией"""
@@ -289,4 +290,5 @@ def main():
         traceback.print_exc()
 
 if __name__ == "__main__":
+    maybe_profile()
     main() 
\ No newline at end of file
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Backup Diff
+Что изменилось между двумя бэкапами: добавленные, удаленные и измененные
+payees с изменениями по полям и переходами статусов
+
+Both backups are streamed (JSON or JSONL). By default the old backup is
+indexed in memory as id -> 16-byte record digest (roughly 100-150 bytes per
+payee, ~150 MB for a million), the new backup is compared record by record
+against that index, and the old backup is read a second time to diff just
+the changed payees. With --partitions N both backups are first spilled into
+N temporary files by hash of the payee id and every partition is diffed on
+its own, so peak memory is about 1/N of that (plus one write buffer per
+partition). API-ordered backups are not sorted by id, so a merge join is
+not an option.
+
+An id that occurs more than once in a backup is reported once per extra
+occurrence as a 'duplicate' event; only its first occurrence is diffed.
+
+Usage:
+  python backup_diff.py                                   # two latest local backups
+  python backup_diff.py OLD.json NEW.jsonl --output changes.jsonl
+  python backup_diff.py OLD NEW --ignore lastUpdated,balance
+  python backup_diff.py OLD NEW --partitions 32             # bounded memory for very large backups
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backup_io import BACKUP_PATTERNS, iter_backup_payees
+from profiling import maybe_profile
+
+# Canonical (sorted-key, compact) encoding for digests; orjson when installed
+try:
+    import orjson
+
+    def canonical_bytes(record: Dict) -> bytes:
+        return orjson.dumps(record, option=orjson.OPT_SORT_KEYS)
+except ImportError:
+    def canonical_bytes(record: Dict) -> bytes:
+        return json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def flatten(record: Dict, prefix: str = '') -> Dict:
+    """Nested dicts as dotted paths: {'contactInformation.email': ...}"""
+    flat = {}
+    for key, value in record.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            flat.update(flatten(value, path + '.'))
+        else:
+            flat[path] = value
+    return flat
+
+
+def _without(record: Dict, ignore: Tuple[str, ...]) -> Dict:
+    if not ignore:
+        return record
+    flat = flatten(record)
+    return {path: value for path, value in flat.items()
+            if not any(path == field or path.startswith(field + '.') for field in ignore)}
+
+
+def record_digest(record: Dict, ignore: Tuple[str, ...] = ()) -> bytes:
+    """Stable content hash of a payee record (key order does not matter)"""
+    return hashlib.blake2b(canonical_bytes(_without(record, ignore)), digest_size=16).digest()
+
+
+def field_changes(old: Dict, new: Dict, ignore: Tuple[str, ...] = ()) -> Dict[str, list]:
+    """{dotted path: [old value, new value]} for every differing field"""
+    old_flat, new_flat = flatten(old), flatten(new)
+    changes = {}
+    for path in sorted(old_flat.keys() | new_flat.keys()):
+        if any(path == field or path.startswith(field + '.') for field in ignore):
+            continue
+        before, after = old_flat.get(path), new_flat.get(path)
+        if before != after:
+            changes[path] = [before, after]
+    return changes
+
+
+def _iter_jsonl(path: str) -> Iterator[Dict]:
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+class BackupDiff:
+    """Streaming change set between two backups, plus summary counters
+
+    ``partitions`` > 1 spills both backups into hash partitions under
+    ``spill_dir`` (system temp dir by default) to bound memory.
+    """
+
+    def __init__(self, old_path: str, new_path: str, ignore: Iterable[str] = (),
+                 partitions: int = 1, spill_dir: Optional[str] = None):
+        self.old_path = old_path
+        self.new_path = new_path
+        self.ignore = tuple(ignore)
+        self.partitions = max(1, partitions)
+        self.spill_dir = spill_dir
+        self.counts = Counter()
+        self.duplicates = Counter()
+        self.status_transitions = Counter()
+        self.changed_fields = Counter()
+
+    def _event(self, change: str, payee: Dict, **extra) -> Dict:
+        self.counts[change] += 1
+        return {'change': change, 'id': payee.get('id'), 'refCode': payee.get('refCode'), **extra}
+
+    def _duplicate(self, backup: str, payee: Dict) -> Dict:
+        self.duplicates[backup] += 1
+        return self._event('duplicate', payee, backup=backup, record=payee)
+
+    def changes(self) -> Iterator[Dict]:
+        """Yield added payees while reading the new backup, then changed and removed ones
+
+        Without partitions holds an id -> digest entry for every payee of the
+        old backup and the set of ids seen in the new one (O(N) memory).
+        """
+        if self.partitions == 1:
+            yield from self._diff(lambda: iter_backup_payees(self.old_path), iter_backup_payees(self.new_path))
+            return
+
+        with tempfile.TemporaryDirectory(prefix='backup_diff_', dir=self.spill_dir) as tmpdir:
+            old_parts = self._spill(iter_backup_payees(self.old_path), os.path.join(tmpdir, 'old'))
+            new_parts = self._spill(iter_backup_payees(self.new_path), os.path.join(tmpdir, 'new'))
+            for old_part, new_part in zip(old_parts, new_parts):
+                yield from self._diff(lambda path=old_part: _iter_jsonl(path), _iter_jsonl(new_part))
+
+    def _spill(self, payees: Iterable[Dict], prefix: str) -> List[str]:
+        """Write payees into ``partitions`` JSONL files by crc32 of the id, keeping input order"""
+        paths = [f"{prefix}-{index:04d}.jsonl" for index in range(self.partitions)]
+        files = [open(path, 'w', encoding='utf-8') for path in paths]
+        try:
+            for payee in payees:
+                partition = zlib.crc32(str(payee['id']).encode('utf-8')) % self.partitions
+                files[partition].write(json.dumps(payee, ensure_ascii=False, separators=(',', ':')))
+                files[partition].write('\n')
+        finally:
+            for f in files:
+                f.close()
+        return paths
+
+    def _diff(self, old_payees: Callable[[], Iterable[Dict]], new_payees: Iterable[Dict]) -> Iterator[Dict]:
+        """Diff one pair of inputs; ``old_payees`` is called twice (index pass, then changed/removed pass)"""
+        old_index: Dict[str, bytes] = {}
+        for payee in old_payees():
+            self.counts['old_total'] += 1
+            if payee['id'] in old_index:
+                yield self._duplicate('old', payee)
+            else:
+                old_index[payee['id']] = record_digest(payee, self.ignore)
+
+        changed_new: Dict[str, Dict] = {}
+        seen_new = set()
+        for payee in new_payees:
+            self.counts['new_total'] += 1
+            payee_id = payee['id']
+            if payee_id in seen_new:
+                yield self._duplicate('new', payee)
+                continue
+            seen_new.add(payee_id)
+            digest = old_index.pop(payee_id, None)
+            if digest is None:
+                yield self._event('added', payee, status=payee.get('status'), record=payee)
+            elif digest != record_digest(payee, self.ignore):
+                changed_new[payee_id] = payee
+            else:
+                self.counts['unchanged'] += 1
+        seen_new.clear()
+
+        # Whatever is left in the index was not in the new backup
+        removed = old_index
+        if not changed_new and not removed:
+            return
+
+        # First occurrences come first, so later duplicates of an old id are skipped here
+        for payee in old_payees():
+            payee_id = payee['id']
+            new = changed_new.pop(payee_id, None)
+            if new is not None:
+                fields = field_changes(payee, new, self.ignore)
+                self.changed_fields.update(fields.keys())
+                extra = {'fields': fields}
+                if payee.get('status') != new.get('status'):
+                    transition = [payee.get('status'), new.get('status')]
+                    self.status_transitions[tuple(transition)] += 1
+                    extra['status'] = transition
+                yield self._event('changed', new, **extra)
+            elif removed.pop(payee_id, None) is not None:
+                yield self._event('removed', payee, status=payee.get('status'), record=payee)
+
+    def summary(self) -> Dict:
+        return {
+            'old_backup': self.old_path,
+            'new_backup': self.new_path,
+            'old_total': self.counts['old_total'],
+            'new_total': self.counts['new_total'],
+            'added': self.counts['added'],
+            'removed': self.counts['removed'],
+            'changed': self.counts['changed'],
+            'unchanged': self.counts['unchanged'],
+            'duplicates': {'old': self.duplicates['old'], 'new': self.duplicates['new']},
+            'status_transitions': {f"{old} -> {new}": count
+                                   for (old, new), count in self.status_transitions.most_common()},
+            'changed_fields': dict(self.changed_fields.most_common())
+        }
+
+
+def latest_two_backups(directory: str = '.') -> Optional[Tuple[str, str]]:
+    """(older, newer) of the two most recently modified backups"""
+    files = sorted({path for pattern in BACKUP_PATTERNS for path in glob.glob(os.path.join(directory, pattern))},
+                   key=os.path.getmtime)
+    return (files[-2], files[-1]) if len(files) >= 2 else None
+
+
+def print_summary(summary: Dict):
+    print(f"\n📊 ИЗМЕНЕНИЯ: {summary['old_total']:,} -> {summary['new_total']:,} payees")
+    print("-" * 50)
+    print(f"  ➕ Добавлено: {summary['added']:,}")
+    print(f"  ➖ Удалено: {summary['removed']:,}")
+    print(f"  ✏️ Изменено: {summary['changed']:,}")
+    print(f"  ✅ Без изменений: {summary['unchanged']:,}")
+    duplicates = summary['duplicates']
+    if duplicates['old'] or duplicates['new']:
+        print(f"  ⚠️ Повторяющиеся id: {duplicates['old']:,} в старом, {duplicates['new']:,} в новом бэкапе")
+
+    if summary['status_transitions']:
+        print("\n🔄 ПЕРЕХОДЫ СТАТУСОВ:")
+        for transition, count in summary['status_transitions'].items():
+            print(f"  {transition}: {count:,}")
+
+    if summary['changed_fields']:
+        print("\n🧩 ИЗМЕНЕННЫЕ ПОЛЯ:")
+        for field, count in list(summary['changed_fields'].items())[:15]:
+            print(f"  {field}: {count:,}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Diff two payee backups')
+    parser.add_argument('old', nargs='?', help='Older backup (default: second newest local backup)')
+    parser.add_argument('new', nargs='?', help='Newer backup (default: newest local backup)')
+    parser.add_argument('--ignore', default='', help='Comma-separated fields to ignore (e.g. lastUpdated)')
+    parser.add_argument('--output', help='Write the change set as JSONL')
+    parser.add_argument('--partitions', type=int, default=1,
+                        help='Spill both backups into N hash partitions on disk (memory ~1/N)')
+    parser.add_argument('--spill-dir', help='Directory for partition files (default: system temp dir)')
+    args = parser.parse_args(argv)
+
+    if args.old and args.new:
+        old_path, new_path = args.old, args.new
+    elif not args.old and not args.new:
+        pair = latest_two_backups()
+        if not pair:
+            print("❌ Нужно минимум два локальных бэкапа - укажите файлы явно")
+            return None
+        old_path, new_path = pair
+    else:
+        parser.error('Give both OLD and NEW, or neither')
+
+    print(f"🔍 DIFF БЭКАПОВ - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 50)
+    print(f"📁 Было:  {old_path}")
+    print(f"📁 Стало: {new_path}")
+
+    diff = BackupDiff(old_path, new_path, [field.strip() for field in args.ignore.split(',') if field.strip()],
+                      args.partitions, args.spill_dir)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for event in diff.changes():
+                f.write(json.dumps(event, ensure_ascii=False, separators=(',', ':'), default=str))
+                f.write('\n')
+    else:
+        for _ in diff.changes():
+            pass
+
+    summary = diff.summary()
+    print_summary(summary)
+    if args.output:
+        print(f"\n💾 Изменения: {args.output}")
+    return summary
+
+
+if __name__ == "__main__":
+    maybe_profile()
+    main()
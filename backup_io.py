@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Backup File I/O
+Read and write payee backups in the formats produced by the backup scripts,
+plus the countries_list CSVs written by the country analysis
+"""
+
+import csv
+import glob
+import json
+import os
+import re
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Keys under which the backup scripts store payee lists
+PAYEE_LIST_KEYS = ('payees', 'users')
+
+# File name patterns written by the backup scripts and `tipalti backup`
+BACKUP_PATTERNS = ('payees_backup_cursor_*.json', 'payees_backup_*.jsonl', 'backup_rest_*.json')
+
+# Start of the payee array in a JSON backup object
+_PAYEE_ARRAY_START = re.compile(r'"(?:%s)"\s*:\s*\[' % '|'.join(PAYEE_LIST_KEYS))
+
+
+def is_jsonl(path: str) -> bool:
+    return path.endswith('.jsonl') or path.endswith('.ndjson')
+
+
+def find_latest_backup(directory: str = '.') -> Optional[str]:
+    """Most recently modified backup file, or None"""
+    files = [path for pattern in BACKUP_PATTERNS for path in glob.glob(os.path.join(directory, pattern))]
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def _payee_list(data, path: str) -> List[Dict]:
+    """Payee list of a loaded JSON backup"""
+    if isinstance(data, list):
+        return data
+
+    for key in PAYEE_LIST_KEYS:
+        if key in data:
+            return data[key]
+
+    raise ValueError(f"No payee list found in {path} (expected one of {', '.join(PAYEE_LIST_KEYS)})")
+
+
+def _iter_json_payees(path: str, chunk_size: int = 1024 * 1024) -> Iterator[Dict]:
+    """Stream the payee array of a JSON backup without loading the whole file"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_size)
+        eof = not buffer
+
+        # Locate the array: a bare list, or the value of one of PAYEE_LIST_KEYS
+        start = None
+        while start is None:
+            stripped = buffer.lstrip()
+            if stripped.startswith('['):
+                start = len(buffer) - len(stripped) + 1
+                break
+            match = _PAYEE_ARRAY_START.search(buffer)
+            if match:
+                start = match.end()
+                break
+            if eof:
+                raise ValueError(f"No payee list found in {path} (expected one of {', '.join(PAYEE_LIST_KEYS)})")
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+
+        position = start
+        while True:
+            # Skip separators; refill when the buffer runs out
+            while True:
+                while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                    position += 1
+                if position < len(buffer) or eof:
+                    break
+                buffer, position = f.read(chunk_size), 0
+                eof = not buffer
+
+            if position >= len(buffer):
+                raise ValueError(f"Unterminated payee list in {path}")
+            if buffer[position] == ']':
+                return
+
+            try:
+                payee, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Item continues in the next chunk
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+
+            yield payee
+            position = end
+
+
+def iter_backup_payees(path: str) -> Iterator[Dict]:
+    """Yield payees from a backup file
+
+    Supports JSON Lines (one payee per line) and the JSON backups written by
+    backup_payees_with_cursor.py ({"payees": [...]}), backup_users_rest.py
+    ({"users": [...]}) or a bare list. Both are streamed, so memory does not
+    grow with the file size.
+    """
+    if is_jsonl(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        return
+
+    yield from _iter_json_payees(path)
+
+
+def load_backup_payees(path: str) -> List[Dict]:
+    """Load all payees from a backup file into memory"""
+    if is_jsonl(path):
+        return list(iter_backup_payees(path))
+
+    # One json.load is faster than streaming when everything is kept anyway
+    with open(path, 'r', encoding='utf-8') as f:
+        return _payee_list(json.load(f), path)
+
+
+def write_backup_payees(path: str, payees: Iterable[Dict], metadata: Optional[Dict] = None) -> int:
+    """Write payees as JSONL (.jsonl) or a cursor-style JSON backup; returns the count"""
+    count = 0
+
+    if is_jsonl(path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for payee in payees:
+                f.write(json.dumps(payee, ensure_ascii=False, separators=(',', ':')))
+                f.write('\n')
+                count += 1
+        return count
+
+    payees = list(payees)
+    count = len(payees)
+    backup_data = {
+        'metadata': {
+            'datetime': datetime.now().isoformat(),
+            'total_payees': count,
+            **(metadata or {})
+        },
+        'payees': payees
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(backup_data, f, ensure_ascii=False)
+    return count
+
+
+def find_latest_countries_csv() -> Optional[str]:
+    """Latest countries_list CSV in the working directory, else next to this module"""
+    for directory in ('.', os.path.dirname(os.path.abspath(__file__))):
+        files = sorted(glob.glob(os.path.join(directory, 'countries_list_*.csv')))
+        if files:
+            return files[-1]
+    return None
+
+
+def read_countries_csv(path: str) -> List[Tuple[str, int]]:
+    """(country code, count) pairs from a countries_list CSV; '--' means no country"""
+    countries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            code = row['Country_Code'].strip()
+            countries.append(('' if code == '--' else code, int(row['Count'])))
+    return countries
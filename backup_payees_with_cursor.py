@@ -9,6 +9,7 @@ import sys
 from datetime import datetime
 from tipalti_rest_api import TipaltiRestAPI
 import config_rest
+from profiling import maybe_profile
 
 
 def backup_all_payees_with_cursor():
@@ -136,6 +137,10 @@ def backup_all_payees_with_cursor():
         print(f"🌐 Среда: {backup_data['metadata']['environment']}")
         print(f"🔄 Метод: cursor пагинация")
         
+        print()
+        print("⏱️ СТАТИСТИКА ЗАПРОСОВ:")
+        print(api.metrics.format_table())
+        
         # Показываем примеры данных
         if all_payees:
             print()
@@ -179,4 +184,5 @@ def main():
 
 
 if __name__ == "__main__":
+    maybe_profile()
     main() 
\ No newline at end of file
@@ -11,6 +11,7 @@ import json
 from datetime import datetime
 from tipalti_hybrid_api import TipaltiHybridAPI
 import config
+from profiling import maybe_profile
 
 
 def verify_credentials_work():
@@ -206,6 +207,7 @@ def create_production_backup():
 
 
 if __name__ == "__main__":
+    maybe_profile()
     success = create_production_backup()
     
     if success:
@@ -7,6 +7,7 @@ Modern REST API interface with JSON responses
 import sys
 from datetime import datetime
 from tipalti_hybrid_api import TipaltiHybridAPI, create_api_client
+from profiling import maybe_profile
 
 
 def main():
@@ -53,4 +54,5 @@ def main():
 
 
 if __name__ == "__main__":
+    maybe_profile()
     main() 
\ No newline at end of file
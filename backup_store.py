@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Backup Store
+Хранилище бэкапов с дедупликацией: каждая уникальная запись payee хранится
+один раз, снапшот - это манифест пар (id, hash)
+
+Layout (default ./backup_store):
+  objects/pack-NNNNNN.jsonl   payee records, one per line, append-only
+  objects/index.tsv           <hash> <pack> <offset> <length> per stored record
+  snapshots/<name>.json.gz    manifest: metadata, (id, hash) pairs set and ids unset vs the parent
+  snapshots.jsonl             catalog: manifest metadata, one line per snapshot
+
+A record's hash is the 16-byte blake2b digest of its canonical encoding (the
+same digest backup_diff.py uses), so an unchanged payee is never written
+twice. Manifests are stored as deltas against the previous snapshot (changed
+and removed ids), with a full manifest every FULL_MANIFEST_EVERY snapshots
+to keep chains short. A year of daily backups costs about one full copy plus
+the changed records.
+
+Usage:
+  python backup_store.py add payees_backup_cursor_20250801.json [more backups...]
+  python backup_store.py list
+  python backup_store.py materialize 20250801_120000 --output restored.jsonl
+  python backup_store.py stats
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backup_diff import canonical_bytes
+from backup_io import iter_backup_payees, write_backup_payees
+from profiling import maybe_profile
+
+
+DEFAULT_STORE = 'backup_store'
+
+# Every Nth snapshot stores a full manifest instead of a delta
+FULL_MANIFEST_EVERY = 30
+
+# Start a new pack file once the current one reaches this size
+PACK_SIZE_LIMIT = 256 * 1024 * 1024
+
+
+class SnapshotExistsError(ValueError):
+    """A snapshot with this name is already in the store"""
+
+
+def record_hash(record: Dict) -> str:
+    return hashlib.blake2b(canonical_bytes(record), digest_size=16).hexdigest()
+
+
+class BackupStore:
+    """Deduplicated snapshots of payee backups"""
+
+    def __init__(self, root: str = DEFAULT_STORE):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.snapshots_dir = os.path.join(root, 'snapshots')
+        self.index_path = os.path.join(self.objects_dir, 'index.tsv')
+        self.catalog_path = os.path.join(root, 'snapshots.jsonl')
+        self._index: Optional[Dict[str, Tuple[str, int, int]]] = None
+
+    # Objects
+
+    def index(self) -> Dict[str, Tuple[str, int, int]]:
+        """hash -> (pack file, offset, length)
+
+        Entries pointing past the end of their pack (or a torn last line) are
+        left over from an interrupted write and are ignored: the record is
+        simply written again by the next snapshot that contains it.
+        """
+        if self._index is None:
+            self._index = {}
+            pack_sizes: Dict[str, int] = {}
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'r', encoding='ascii') as f:
+                    for line in f:
+                        fields = line.split()
+                        if len(fields) != 4 or not line.endswith('\n'):
+                            continue
+                        digest, pack, offset, length = fields[0], fields[1], int(fields[2]), int(fields[3])
+                        if pack not in pack_sizes:
+                            pack_path = os.path.join(self.objects_dir, pack)
+                            pack_sizes[pack] = os.path.getsize(pack_path) if os.path.exists(pack_path) else 0
+                        if offset + length <= pack_sizes[pack]:
+                            self._index[digest] = (pack, offset, length)
+        return self._index
+
+    def _current_pack(self) -> str:
+        packs = sorted(glob.glob(os.path.join(self.objects_dir, 'pack-*.jsonl')))
+        if packs and os.path.getsize(packs[-1]) < PACK_SIZE_LIMIT:
+            return os.path.basename(packs[-1])
+        return f"pack-{len(packs) + 1:06d}.jsonl"
+
+    def read_record(self, digest: str, handles: Optional[Dict] = None) -> Dict:
+        pack, offset, length = self.index()[digest]
+        handles = handles if handles is not None else {}
+        f = handles.get(pack)
+        if f is None:
+            f = handles[pack] = open(os.path.join(self.objects_dir, pack), 'rb')
+        f.seek(offset)
+        return json.loads(f.read(length))
+
+    # Manifests
+
+    def _manifest_path(self, name: str) -> str:
+        return os.path.join(self.snapshots_dir, f"{name}.json.gz")
+
+    def _read_manifest(self, name: str) -> Dict:
+        with gzip.open(self._manifest_path(name), 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    def snapshots(self) -> List[Dict]:
+        """Snapshot metadata from the catalog, oldest first"""
+        if not os.path.exists(self.catalog_path):
+            return []
+        with open(self.catalog_path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def entries(self, name: str) -> Dict[str, str]:
+        """id -> hash of a snapshot, resolving its delta chain"""
+        chain = []
+        manifest = self._read_manifest(name)
+        while True:
+            chain.append(manifest)
+            if manifest['full']:
+                break
+            manifest = self._read_manifest(manifest['parent'])
+
+        entries: Dict[str, str] = {}
+        for manifest in reversed(chain):
+            for payee_id in manifest['unset']:
+                del entries[payee_id]
+            entries.update(manifest['set'])
+        return entries
+
+    # Writing
+
+    def add_snapshot(self, payees: Iterable[Dict], name: Optional[str] = None,
+                     source: Optional[str] = None) -> Dict:
+        """Store a snapshot, writing only records not already in the store"""
+        name = name or datetime.now().strftime('%Y%m%d_%H%M%S')
+        if os.path.exists(self._manifest_path(name)):
+            raise SnapshotExistsError(f"Snapshot {name} already exists in {self.root}")
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+
+        history = self.snapshots()
+        parent = history[-1] if history else None
+        parent_entries = self.entries(parent['name']) if parent else {}
+
+        index = self.index()
+        pack = self._current_pack()
+        pack_path = os.path.join(self.objects_dir, pack)
+        entries: Dict[str, str] = {}
+        index_lines: List[str] = []
+        new_records = new_bytes = 0
+
+        try:
+            with open(pack_path, 'ab') as pack_file:
+                offset = pack_file.tell()
+                for payee in payees:
+                    digest = record_hash(payee)
+                    entries[payee['id']] = digest
+                    if digest in index:
+                        continue
+                    data = json.dumps(payee, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                    pack_file.write(data + b'\n')
+                    index[digest] = (pack, offset, len(data))
+                    index_lines.append(f"{digest}\t{pack}\t{offset}\t{len(data)}\n")
+                    offset += len(data) + 1
+                    new_records += 1
+                    new_bytes += len(data) + 1
+                # Records must be on disk before the index (and then a manifest) refers to them
+                pack_file.flush()
+                os.fsync(pack_file.fileno())
+        except BaseException:
+            # The in-memory index may list records that never reached the disk
+            self._index = None
+            raise
+
+        if index_lines:
+            with open(self.index_path, 'a+b') as index_file:
+                # Terminate a torn last line so it does not swallow the first new entry
+                if index_file.tell():
+                    index_file.seek(-1, os.SEEK_END)
+                    if index_file.read(1) != b'\n':
+                        index_lines.insert(0, '\n')
+                index_file.write(''.join(index_lines).encode('ascii'))
+                index_file.flush()
+                os.fsync(index_file.fileno())
+
+        changed = {payee_id: digest for payee_id, digest in entries.items()
+                   if parent_entries.get(payee_id) != digest}
+        removed = [payee_id for payee_id in parent_entries if payee_id not in entries]
+        full = parent is None or parent['depth'] + 1 >= FULL_MANIFEST_EVERY
+
+        metadata = {
+            'name': name,
+            'created': datetime.now().isoformat(),
+            'source': source,
+            'count': len(entries),
+            'parent': None if full else parent['name'],
+            'full': full,
+            'depth': 0 if full else parent['depth'] + 1,
+            'changed': len(changed),
+            'removed': len(removed),
+            'new_records': new_records,
+            'new_bytes': new_bytes
+        }
+        manifest = {
+            **metadata,
+            'set': list((entries if full else changed).items()),
+            'unset': [] if full else removed
+        }
+
+        temp_path = self._manifest_path(name) + '.tmp'
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(temp_path, self._manifest_path(name))
+
+        with open(self.catalog_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(metadata, ensure_ascii=False) + '\n')
+        return metadata
+
+    def add_backup(self, path: str, name: Optional[str] = None) -> Dict:
+        """Store a backup file (JSON or JSONL) as a snapshot named after its timestamp
+
+        A file name with only a date (payees_backup_cursor_20250801.json) gets
+        the file's modification time appended, so same-day backups do not collide.
+        """
+        if not name:
+            stem = os.path.basename(path).split('.')[0]
+            digits = ''.join(ch if ch.isdigit() else ' ' for ch in stem).split()
+            modified = datetime.fromtimestamp(os.path.getmtime(path))
+            if len(digits) >= 2:
+                name = '_'.join(digits[-2:])
+            elif digits:
+                name = f"{digits[0]}_{modified.strftime('%H%M%S')}"
+            else:
+                name = modified.strftime('%Y%m%d_%H%M%S')
+        return self.add_snapshot(iter_backup_payees(path), name, source=os.path.abspath(path))
+
+    # Reading
+
+    def iter_snapshot(self, name: str) -> Iterator[Dict]:
+        """Yield the payees of a snapshot"""
+        handles: Dict = {}
+        try:
+            for digest in self.entries(name).values():
+                yield self.read_record(digest, handles)
+        finally:
+            for f in handles.values():
+                f.close()
+
+    def materialize(self, name: str, output: str) -> int:
+        """Write a snapshot back out as a regular backup file (.jsonl or .json)"""
+        return write_backup_payees(output, self.iter_snapshot(name), metadata={
+            'backup_type': 'backup_store',
+            'snapshot': name
+        })
+
+    def stats(self) -> Dict:
+        packs = glob.glob(os.path.join(self.objects_dir, 'pack-*.jsonl'))
+        manifests = glob.glob(os.path.join(self.snapshots_dir, '*.json.gz'))
+        index = self.index()
+        stored = sum(os.path.getsize(path) for path in packs)
+        snapshots = self.snapshots()
+        logical = 0
+        if snapshots:
+            # Bytes the snapshots would take as individual backups
+            average = stored / max(1, len(index))
+            logical = int(sum(snapshot['count'] for snapshot in snapshots) * average)
+        manifest_bytes = sum(os.path.getsize(path) for path in manifests)
+        return {
+            'snapshots': len(snapshots),
+            'records': len(index),
+            'pack_bytes': stored,
+            'manifest_bytes': manifest_bytes,
+            'index_bytes': os.path.getsize(self.index_path) if os.path.exists(self.index_path) else 0,
+            'logical_bytes_estimate': logical,
+            'dedup_ratio': round(logical / (stored + manifest_bytes), 1) if stored else 0.0
+        }
+
+
+def _size(value: int) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if value < 1024 or unit == 'GB':
+            return f"{value:,.0f} {unit}" if unit == 'B' else f"{value:,.1f} {unit}"
+        value /= 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Content-addressed deduplicated payee backup store')
+    parser.add_argument('--store', default=os.getenv('TIPALTI_BACKUP_STORE', DEFAULT_STORE),
+                        help='Store directory (default: TIPALTI_BACKUP_STORE or ./backup_store)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help='Add backup files as snapshots (oldest first)')
+    add.add_argument('backups', nargs='+')
+    add.add_argument('--name', help='Snapshot name (single backup only)')
+
+    commands.add_parser('list', help='List snapshots')
+
+    materialize = commands.add_parser('materialize', help='Write a snapshot out as a backup file')
+    materialize.add_argument('name', nargs='?', help='Snapshot name (default: latest)')
+    materialize.add_argument('--output', help='.jsonl or .json (default: payees_backup_<name>.jsonl)')
+
+    commands.add_parser('stats', help='Storage statistics')
+    args = parser.parse_args(argv)
+
+    store = BackupStore(args.store)
+
+    if args.command == 'add':
+        if args.name and len(args.backups) > 1:
+            parser.error('--name works with a single backup')
+        for path in sorted(args.backups, key=os.path.getmtime):
+            try:
+                snapshot = store.add_backup(path, args.name)
+            except SnapshotExistsError as e:
+                sys.exit(f"❌ {path}: {e}. Укажите другое имя через --name")
+            print(f"📦 {snapshot['name']}: {snapshot['count']:,} payees, "
+                  f"{snapshot['changed']:,} изменено, {snapshot['removed']:,} удалено, "
+                  f"записано {snapshot['new_records']:,} новых записей ({_size(snapshot['new_bytes'])})")
+
+    elif args.command == 'list':
+        snapshots = store.snapshots()
+        if not snapshots:
+            print(f"📭 В {args.store} нет снапшотов")
+        for snapshot in snapshots:
+            kind = 'full' if snapshot['full'] else f"delta/{snapshot['depth']}"
+            print(f"  {snapshot['name']}  {snapshot['count']:>9,} payees  "
+                  f"+{snapshot['new_records']:,} записей  ({kind})  {snapshot.get('source') or ''}")
+
+    elif args.command == 'materialize':
+        name = args.name
+        if not name:
+            snapshots = store.snapshots()
+            if not snapshots:
+                print(f"📭 В {args.store} нет снапшотов")
+                return
+            name = snapshots[-1]['name']
+        output = args.output or f"payees_backup_{name}.jsonl"
+        count = store.materialize(name, output)
+        print(f"💾 {name}: {count:,} payees -> {output}")
+
+    elif args.command == 'stats':
+        stats = store.stats()
+        print(f"📦 Снапшотов: {stats['snapshots']:,}")
+        print(f"🧾 Уникальных записей: {stats['records']:,}")
+        print(f"💽 Объекты: {_size(stats['pack_bytes'])}, манифесты: {_size(stats['manifest_bytes'])}, "
+              f"индекс: {_size(stats['index_bytes'])}")
+        print(f"📈 Без дедупликации: ~{_size(stats['logical_bytes_estimate'])} "
+              f"(сжатие x{stats['dedup_ratio']})")
+
+
+if __name__ == "__main__":
+    maybe_profile()
+    main()
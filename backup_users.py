@@ -7,8 +7,9 @@ Saves all users to a timestamped JSON file
 import json
 import sys
 from datetime import datetime
-from tipalti_api import TipaltiAPI
+from tipalti_api import SOAP_DETAILS_RATE_LIMIT, TipaltiAPI
 import config
+from profiling import maybe_profile
 
 
 def backup_users():
@@ -19,7 +20,8 @@ def backup_users():
         
         # Initialize API client
         print("Connecting to Tipalti API...")
-        api = TipaltiAPI(payer_name, master_key, is_sandbox)
+        # Details are fetched concurrently: throttle so the fan-out does not hammer the API
+        api = TipaltiAPI(payer_name, master_key, is_sandbox, rate_limit=SOAP_DETAILS_RATE_LIMIT)
         
         # Get all payees
         print("Fetching all users...")
@@ -32,23 +34,28 @@ def backup_users():
         print(f"Found {len(payees)} users")
         
         # Get detailed information for each user
-        detailed_users = []
+        with_idap = []
         for i, payee in enumerate(payees, 1):
             idap = payee.get('idap', payee.get('Idap', ''))
             if not idap:
                 print(f"Warning: User {i} has no IDAP, skipping...")
                 continue
-            
-            print(f"Getting details for user {i}/{len(payees)}: {idap}")
-            
-            details = api.get_payee_details(idap)
-            if details:
+            with_idap.append((idap, payee))
+        
+        print(f"Getting details for {len(with_idap)} users...")
+        results = api.get_payees_details([idap for idap, _ in with_idap])
+        
+        detailed_users = []
+        failed_idaps = []
+        for (idap, payee), result in zip(with_idap, results):
+            if result['success']:
                 # Merge basic info with detailed info
-                user_data = {**payee, **details}
-                detailed_users.append(user_data)
+                detailed_users.append({**payee, **result['data']})
             else:
-                # Fallback to basic info if details unavailable
-                detailed_users.append(payee)
+                # Fallback to basic info, flagged so the record is not mistaken for a full one
+                print(f"Details unavailable for {idap}: {result['error']}")
+                failed_idaps.append(idap)
+                detailed_users.append({**payee, 'details_error': result['error']})
         
         # Create timestamped backup filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -60,12 +67,19 @@ def backup_users():
             'total_users': len(detailed_users),
             'environment': 'sandbox' if is_sandbox else 'production',
             'payer_name': payer_name,
+            'complete': not failed_idaps,
+            'failed_details': failed_idaps,
             'users': detailed_users
         }
         
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(backup_data, f, indent=2, ensure_ascii=False)
         
+        if failed_idaps:
+            print(f"\n⚠️ Backup INCOMPLETE: details missing for {len(failed_idaps)} users")
+            print(f"📁 Saved {len(detailed_users)} users (basic info only for failed ones) to: {filename}")
+            return False
+        
         print(f"\n✅ Backup completed successfully!")
         print(f"📁 Saved {len(detailed_users)} users to: {filename}")
         print(f"🔧 Environment: {'Sandbox' if is_sandbox else 'Production'}")
@@ -82,6 +96,7 @@ def backup_users():
 
 
 if __name__ == "__main__":
+    maybe_profile()
     print("🔄 Starting Tipalti Users Backup")
     print("=" * 40)
     
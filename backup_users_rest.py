@@ -9,6 +9,7 @@ import sys
 from datetime import datetime
 from tipalti_rest_api import TipaltiRestAPI
 import config_rest
+from profiling import maybe_profile
 
 
 def backup_users():
@@ -20,7 +21,7 @@ def backup_users():
         # Initialize REST API client
         print("🔗 Connecting to Tipalti REST API...")
         print(f"🌐 Environment: {'Sandbox' if is_sandbox else 'Production'}")
-        api = TipaltiRestAPI(client_id, client_secret, is_sandbox)
+        api = TipaltiRestAPI(client_id, client_secret, is_sandbox, rate_limit=10)
         
         # Get OAuth token
         print("🔐 Authenticating with OAuth 2.0...")
@@ -37,29 +38,29 @@ def backup_users():
         
         print(f"📊 Found {len(payees)} users")
         
-        # Get detailed information for each user (optional, for smaller lists)
-        detailed_users = []
-        if len(payees) <= 50:  # Only get details for small lists to avoid rate limits
-            print("📋 Getting detailed information...")
-            for i, payee in enumerate(payees, 1):
-                payee_id = payee.get('id') or payee.get('payee_id')
-                if not payee_id:
-                    print(f"⚠️  User {i} has no ID, using basic info...")
-                    detailed_users.append(payee)
-                    continue
-                
-                print(f"  📝 Getting details for user {i}/{len(payees)}: {payee_id}")
-                
-                details = api.get_payee_details(payee_id)
-                if details:
-                    # Use detailed info
-                    detailed_users.append(details)
-                else:
-                    # Fallback to basic info
-                    detailed_users.append(payee)
-        else:
-            print("📊 Using basic user information (large dataset)")
-            detailed_users = payees
+        # Get detailed information for each user (concurrent, rate limited by the client)
+        print("📋 Getting detailed information...")
+        payee_ids = [payee.get('id') or payee.get('payee_id') for payee in payees]
+        ids_to_fetch = [payee_id for payee_id in payee_ids if payee_id]
+        
+        if len(ids_to_fetch) < len(payee_ids):
+            print(f"⚠️  {len(payee_ids) - len(ids_to_fetch)} users have no ID, using basic info...")
+        
+        details_by_id = {}
+        for i, result in enumerate(api.get_payees_details(ids_to_fetch, concurrency=8, stream=True), 1):
+            if result['success']:
+                details_by_id[result['id']] = result['data']
+            else:
+                print(f"  ⚠️  Details failed for {result['id']}: {result['error']}")
+            
+            if i % 100 == 0 or i == len(ids_to_fetch):
+                print(f"  📝 Details fetched: {i}/{len(ids_to_fetch)}")
+        
+        # Keep original order; fall back to basic info when details are unavailable
+        detailed_users = [
+            details_by_id.get(payee_id, payee) if payee_id else payee
+            for payee, payee_id in zip(payees, payee_ids)
+        ]
         
         # Create timestamped backup filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -96,6 +97,7 @@ def backup_users():
 
 
 if __name__ == "__main__":
+    maybe_profile()
     print("🔄 Starting Tipalti Users Backup (REST API)")
     print("=" * 50)
     
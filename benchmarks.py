@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Tipalti Tools Benchmark Suite
+Listing, bulk mutation, SOAP parsing, backup I/O and analytics measured
+against the local stand-in server and synthetic payees
+
+Usage:
+  python benchmarks.py                                   # 1k/10k/100k, all benchmarks
+  python benchmarks.py --sizes 1000,10000,100000,1000000 --latency-ms 50
+  python benchmarks.py --only list_cursor,soap_parse --compare benchmark_results/<old>.json
+
+Results are written to benchmark_results/<git revision>_<timestamp>.json;
+--compare prints the ratio against an earlier run and flags regressions.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from backup_io import load_backup_payees, write_backup_payees
+from mock_tipalti_server import MockConfig, _soap_envelope, _soap_fields, _xml_fields, start_mock_server
+from synthetic_payees import generate_payees
+from profiling import maybe_profile
+
+
+RESULTS_DIR = 'benchmark_results'
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+REGRESSION_THRESHOLD = 1.10
+
+
+class Benchmark:
+    """One benchmark: ``run(ctx)`` is timed and returns the number of items processed
+
+    ``setup(ctx)`` runs once per dataset size, outside the timed region.
+    """
+
+    def __init__(self, name: str, group: str, run: Callable[[Dict], int], network: bool = False,
+                 setup: Optional[Callable[[Dict], None]] = None):
+        self.name = name
+        self.group = group
+        self.run = run
+        self.network = network
+        self.setup = setup
+
+
+def _new_api(ctx: Dict):
+    from tipalti_rest_api import TipaltiRestAPI
+    return TipaltiRestAPI('bench-client', 'bench-secret', api_root=ctx['server'].url, **ctx['client_options'])
+
+
+# Benchmarks
+
+def bench_list_offset(ctx: Dict) -> int:
+    api = _new_api(ctx)
+    try:
+        return len(api.get_payees_list(limit=ctx['page_size']))
+    finally:
+        api.close()
+
+
+def bench_list_cursor(ctx: Dict) -> int:
+    # Same loop as backup_payees_with_cursor.py
+    api = _new_api(ctx)
+    try:
+        collected = 0
+        params = {'limit': ctx['page_size']}
+        while True:
+            response = api._make_request('GET', '/payees', params=params)
+            items = response.get('items', [])
+            collected += len(items)
+            next_cursor = (response.get('pageInfo') or {}).get('nextPageCursor')
+            if not items or not next_cursor:
+                return collected
+            params = {'limit': ctx['page_size'], 'pageCursor': next_cursor}
+    finally:
+        api.close()
+
+
+def bench_bulk_patch(ctx: Dict) -> int:
+    api = _new_api(ctx)
+    ids = [payee['id'] for payee in ctx['payees'][:ctx['patch_count']]]
+    try:
+        with ThreadPoolExecutor(max_workers=ctx['patch_concurrency']) as pool:
+            results = list(pool.map(lambda payee_id: api.update_payee(payee_id, {'status': 'SUSPENDED'}), ids))
+        return sum(1 for ok in results if ok)
+    finally:
+        api.close()
+
+
+def setup_soap_parse(ctx: Dict):
+    from tipalti_api import TipaltiAPI
+    body = ''.join(f'<PayeeInfo>{_xml_fields(_soap_fields(p))}</PayeeInfo>' for p in ctx['payees'])
+    ctx['soap_xml'] = _soap_envelope('GetExtendedPayeeDetailList', body)
+    ctx['soap_api'] = TipaltiAPI('bench', 'key')
+
+
+def bench_soap_parse(ctx: Dict) -> int:
+    return len(ctx['soap_api']._parse_payees_list(ctx['soap_xml']))
+
+
+def _backup_path(ctx: Dict, extension: str) -> str:
+    return os.path.join(ctx['tmpdir'], f"backup_{len(ctx['payees'])}.{extension}")
+
+
+def bench_backup_json_dump(ctx: Dict) -> int:
+    # Same settings as the backup scripts (indent=2)
+    backup_data = {'metadata': {'total_payees': len(ctx['payees'])}, 'payees': ctx['payees']}
+    with open(_backup_path(ctx, 'json'), 'w', encoding='utf-8') as f:
+        json.dump(backup_data, f, ensure_ascii=False, indent=2)
+    return len(ctx['payees'])
+
+
+def setup_backup_json_load(ctx: Dict):
+    if not os.path.exists(_backup_path(ctx, 'json')):
+        bench_backup_json_dump(ctx)
+
+
+def bench_backup_json_load(ctx: Dict) -> int:
+    return len(load_backup_payees(_backup_path(ctx, 'json')))
+
+
+def bench_backup_jsonl_dump(ctx: Dict) -> int:
+    return write_backup_payees(_backup_path(ctx, 'jsonl'), ctx['payees'])
+
+
+def setup_backup_jsonl_load(ctx: Dict):
+    if not os.path.exists(_backup_path(ctx, 'jsonl')):
+        bench_backup_jsonl_dump(ctx)
+
+
+def bench_backup_jsonl_load(ctx: Dict) -> int:
+    return len(load_backup_payees(_backup_path(ctx, 'jsonl')))
+
+
+def setup_analytics(ctx: Dict):
+    # Import outside the timed region (pulls in the REST client and config)
+    import active_payees_countries_analysis  # noqa: F401
+    import payees_full_status_report  # noqa: F401
+
+
+def bench_analyze_status_country(ctx: Dict) -> int:
+    from payees_full_status_report import analyze_payees_comprehensive
+    with contextlib.redirect_stdout(io.StringIO()):
+        analysis = analyze_payees_comprehensive(ctx['payees'])
+    return sum(analysis['status_stats'].values())
+
+
+def bench_analyze_active_countries(ctx: Dict) -> int:
+    from active_payees_countries_analysis import analyze_active_payees_countries
+    active = [payee for payee in ctx['payees'] if payee.get('status') == 'ACTIVE']
+    with contextlib.redirect_stdout(io.StringIO()):
+        analysis = analyze_active_payees_countries(active)
+    return len(analysis['payees_details'])
+
+
+BENCHMARKS = [
+    Benchmark('list_offset', 'listing', bench_list_offset, network=True),
+    Benchmark('list_cursor', 'listing', bench_list_cursor, network=True),
+    Benchmark('bulk_patch', 'mutation', bench_bulk_patch, network=True),
+    Benchmark('soap_parse', 'parsing', bench_soap_parse, setup=setup_soap_parse),
+    Benchmark('backup_json_dump', 'backup', bench_backup_json_dump),
+    Benchmark('backup_json_load', 'backup', bench_backup_json_load, setup=setup_backup_json_load),
+    Benchmark('backup_jsonl_dump', 'backup', bench_backup_jsonl_dump),
+    Benchmark('backup_jsonl_load', 'backup', bench_backup_jsonl_load, setup=setup_backup_jsonl_load),
+    Benchmark('analyze_status_country', 'analytics', bench_analyze_status_country, setup=setup_analytics),
+    Benchmark('analyze_active_countries', 'analytics', bench_analyze_active_countries, setup=setup_analytics),
+]
+
+
+# Runner
+
+def run_benchmark(benchmark: Benchmark, ctx: Dict, repeat: int) -> Dict:
+    if benchmark.setup:
+        benchmark.setup(ctx)
+
+    timings = []
+    items = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        items = benchmark.run(ctx)
+        timings.append(time.perf_counter() - started)
+
+    best = min(timings)
+    return {
+        'benchmark': benchmark.name,
+        'group': benchmark.group,
+        'size': len(ctx['payees']),
+        'items': items,
+        'repeat': repeat,
+        'min_s': round(best, 6),
+        'median_s': round(statistics.median(timings), 6),
+        'max_s': round(max(timings), 6),
+        'items_per_s': round(items / best, 1) if best > 0 else None
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare_results(current: List[Dict], baseline_path: str) -> int:
+    """Print current vs baseline timings; returns the number of regressions"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['benchmark'], r['size']): r for r in json.load(f)['results']}
+
+    regressions = 0
+    print(f"\n📊 СРАВНЕНИЕ С {baseline_path}")
+    print(f"{'benchmark':<26} {'size':>9} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for result in current:
+        old = baseline.get((result['benchmark'], result['size']))
+        if not old or not old['min_s']:
+            continue
+        ratio = result['min_s'] / old['min_s']
+        flag = ''
+        if ratio > REGRESSION_THRESHOLD:
+            flag = ' ⚠️ регрессия'
+            regressions += 1
+        elif ratio < 1 / REGRESSION_THRESHOLD:
+            flag = ' 🚀'
+        print(f"{result['benchmark']:<26} {result['size']:>9,} {old['min_s']:>9.3f}s {result['min_s']:>9.3f}s "
+              f"{ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark suite for the Tipalti tools')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='Comma-separated dataset sizes (payees)')
+    parser.add_argument('--only', help='Comma-separated benchmark names or groups')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--patch-count', type=int, default=1000, help='PATCHes per bulk_patch run')
+    parser.add_argument('--patch-concurrency', type=int, default=8)
+    parser.add_argument('--max-network-size', type=int, default=100_000,
+                        help='Skip network benchmarks above this dataset size')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Mock server latency per request')
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--http2', action='store_true', help='Use the HTTP/2 transport')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--label', help='Result label (default: git revision)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    parser.add_argument('--no-save', action='store_true')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    selected = set(args.only.split(',')) if args.only else None
+    benchmarks = [b for b in BENCHMARKS if not selected or b.name in selected or b.group in selected]
+
+    print("⏱️ TIPALTI BENCHMARKS")
+    print("=" * 60)
+    print(f"📏 Размеры: {', '.join(f'{s:,}' for s in sizes)} | 🔁 Повторов: {args.repeat}")
+    print(f"🧪 Бенчмарки: {', '.join(b.name for b in benchmarks)}")
+
+    results = []
+    client_options = {'http2': True} if args.http2 else {}
+
+    with tempfile.TemporaryDirectory(prefix='tipalti_bench_') as tmpdir:
+        for size in sizes:
+            print(f"\n👥 {size:,} payees")
+            payees = generate_payees(size, seed=args.seed)
+            ctx = {
+                'payees': payees,
+                'tmpdir': tmpdir,
+                'page_size': args.page_size,
+                'patch_count': args.patch_count,
+                'patch_concurrency': args.patch_concurrency,
+                'client_options': client_options,
+                'server': None
+            }
+
+            for benchmark in benchmarks:
+                if benchmark.network and size > args.max_network_size:
+                    print(f"  ⏭️ {benchmark.name:<26} пропущен (> --max-network-size)")
+                    continue
+
+                if benchmark.network:
+                    # Fresh server per benchmark so mutations do not leak between runs
+                    config = MockConfig(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, seed=args.seed)
+                    ctx['server'] = start_mock_server(payees if benchmark.name != 'bulk_patch'
+                                                      else [dict(p) for p in payees], config=config)
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()) if benchmark.network else contextlib.nullcontext():
+                        result = run_benchmark(benchmark, ctx, args.repeat)
+                finally:
+                    if ctx['server'] is not None:
+                        ctx['server'].shutdown()
+                        ctx['server'].server_close()
+                        ctx['server'] = None
+
+                results.append(result)
+                print(f"  ✅ {benchmark.name:<26} {result['min_s']:>9.3f}s  "
+                      f"{result['items_per_s'] or 0:>12,.0f} items/s")
+
+    label = args.label or git_revision()
+    output = {
+        'metadata': {
+            'label': label,
+            'datetime': datetime.now().isoformat(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'sizes': sizes,
+            'repeat': args.repeat,
+            'page_size': args.page_size,
+            'latency_ms': args.latency_ms,
+            'http2': args.http2
+        },
+        'results': results
+    }
+
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        filename = os.path.join(RESULTS_DIR, f"{label}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Результаты: {filename}")
+
+    if args.compare:
+        regressions = compare_results(results, args.compare)
+        if regressions:
+            print(f"\n⚠️ Регрессий: {regressions}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    maybe_profile()
+    main()
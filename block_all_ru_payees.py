@@ -9,6 +9,7 @@ import time
 from datetime import datetime
 from tipalti_rest_api import TipaltiRestAPI
 import config_rest
+from profiling import maybe_profile
 
 
 def get_current_ru_payees_count(api: TipaltiRestAPI) -> dict:
@@ -181,6 +182,7 @@ def main():
 
 
 if __name__ == "__main__":
+    maybe_profile()
     try:
         main()
     except KeyboardInterrupt:
@@ -10,6 +10,7 @@ Tipalti RU Payees Management Script
 import json
 import csv
 from datetime import datetime
+from profiling import maybe_profile
 
 
 def load_ru_payees(backup_file: str) -> list:
@@ -217,6 +218,7 @@ def main():
 
 
 if __name__ == "__main__":
+    maybe_profile()
     try:
         main()
     except Exception as e:
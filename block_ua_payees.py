@@ -9,89 +9,47 @@ import time
 import csv
 from datetime import datetime
 from tipalti_rest_api import TipaltiRestAPI
+from payee_record import PayeeRecord
 import config_rest
+from profiling import maybe_profile
+from event_log import ProgressLine, get_event_logger
 
 def get_active_ua_payees(api):
-    """Получить всех активных UA payees"""
+    """Получить всех активных UA payees
+
+    Returns (payees, skipped_offsets): страницы, не загруженные после повторов,
+    пропускаются и возвращаются отдельно - список payees тогда неполный.
+    """
     
     print("📥 Загружаем всех активных UA payees...")
     
     ua_payees = []
-    limit = 100
-    offset = 0
     page = 1
     
-    while True:
-        print(f"  📄 Страница {page} (offset: {offset})...", end=" ")
+    # status пушится на сервер, страна проверяется локально (beneficiary или payment = UA)
+    query = api.query(page_size=100, page_delay=0.1, skip_failed_pages=True).status('ACTIVE').country('UA')
+    
+    for page_ua_payees, response in query.pages():
+        payees = response.get('items', [])
+        print(f"  📄 Страница {page}: найдено {len(page_ua_payees)} UA payees (всего на странице: {len(payees)})")
         
-        try:
-            # Параметры для текущей страницы
-            params = {
-                'limit': limit,
-                'offset': offset,
-                'status': 'ACTIVE'
-            }
-            
-            # Прямой запрос к API
-            response = api._make_request('GET', '/payees', params=params)
-            
-            # Получить payees с текущей страницы
-            payees = response.get('items', [])
-            total_count = response.get('totalCount', 0)
-            
-            if not payees:
-                break
-            
-            # Фильтровать только UA payees
-            page_ua_payees = []
-            for payee in payees:
-                if payee.get('status') == 'ACTIVE':
-                    contact = payee.get('contactInformation', {})
-                    beneficiary_country = contact.get('beneficiaryCountryCode', '')
-                    payment_country = contact.get('paymentCountryCode', '')
-                    
-                    # Проверяем оба поля на UA
-                    if beneficiary_country == 'UA' or payment_country == 'UA':
-                        page_ua_payees.append({
-                            'id': payee.get('id'),
-                            'name': payee.get('name', 'No name'),
-                            'status': payee.get('status'),
-                            'beneficiary_country': beneficiary_country,
-                            'payment_country': payment_country,
-                            'email': contact.get('email', 'No email'),
-                            'payee_data': payee  # Сохраняем полные данные
-                        })
-            
-            ua_payees.extend(page_ua_payees)
-            
-            print(f"найдено {len(page_ua_payees)} UA payees (всего на странице: {len(payees)})")
-            
-            # Показать прогресс
-            print(f"  📊 Всего UA payees найдено: {len(ua_payees)}")
-            
-            # Если получили меньше чем лимит, то это последняя страница
-            if len(payees) < limit:
-                break
-            
-            offset += limit
-            page += 1
-            
-            # Небольшая пауза
-            time.sleep(0.1)
-            
-        except Exception as e:
-            print(f"❌ Ошибка на странице {page}: {e}")
-            offset += limit
-            page += 1
-            continue
+        # Компактные записи (raw API данные не хранятся)
+        ua_payees.extend(PayeeRecord.from_api(payee) for payee in page_ua_payees)
+        
+        # Показать прогресс
+        print(f"  📊 Всего UA payees найдено: {len(ua_payees)}")
+        page += 1
     
+    if query.skipped_pages:
+        print(f"\n⚠️  Поиск НЕПОЛНЫЙ: пропущено {len(query.skipped_pages)} страниц "
+              f"(offset: {', '.join(map(str, query.skipped_pages))})")
     print(f"\n✅ Поиск завершен! Найдено {len(ua_payees)} активных UA payees")
-    return ua_payees
+    return ua_payees, query.skipped_pages
 
 def suspend_payee(api, payee_info, dry_run=True):
     """Заблокировать одного payee"""
     
-    payee_id = payee_info['id']
+    payee_id = payee_info.id
     
     if dry_run:
         return {
@@ -145,62 +103,75 @@ def block_ua_payees_batch(api, ua_payees, dry_run=True, batch_size=10, delay=1.0
     print(f"📦 Размер батча: {batch_size}, пауза: {delay}s")
     print("=" * 80)
     
+    # Circuit breaker для PATCH: при деградации Tipalti ставим обработку на паузу
+    breaker = api.breakers.get('PATCH /payees/{id}')
+    
+    # События по каждому payee - в JSONL лог (фоновая запись), в терминале - одна строка прогресса
+    log = get_event_logger()
+    progress = ProgressLine(total_payees, f"{'[DRY RUN] ' if dry_run else ''}Блокировка UA")
+    log.info('block_started', dry_run=dry_run, total=total_payees, batch_size=batch_size, delay=delay)
+    
     for i in range(0, total_payees, batch_size):
         batch = ua_payees[i:i + batch_size]
         batch_num = (i // batch_size) + 1
         total_batches = (total_payees + batch_size - 1) // batch_size
         
-        print(f"\n📦 Батч {batch_num}/{total_batches} ({len(batch)} payees):")
-        
         batch_results = []
         for j, payee in enumerate(batch):
             payee_num = i + j + 1
             
-            print(f"  {payee_num:4d}/{total_payees} | {payee['id']} | {payee['email'][:30]:<30} | ", end="")
+            if not dry_run and breaker.is_open():
+                pause = breaker.retry_after()
+                log.warning('circuit_open_pause', endpoint='PATCH /payees/{id}', pause_seconds=round(pause, 1))
+                progress.note(f"  ⛔ Tipalti недоступен (circuit open), пауза {pause:.0f}s...")
+                time.sleep(pause)
             
             # Заблокировать payee
             result = suspend_payee(api, payee, dry_run)
             
             # Добавить дополнительную информацию
             result.update({
-                'payee_name': payee['name'],
-                'payee_email': payee['email'],
-                'beneficiary_country': payee['beneficiary_country'],
-                'payment_country': payee['payment_country'],
+                'payee_name': payee.name,
+                'payee_email': payee.email,
+                'beneficiary_country': payee.beneficiary_country,
+                'payment_country': payee.payment_country,
                 'processed_at': datetime.now().isoformat()
             })
             
             batch_results.append(result)
             results.append(result)
             
-            # Показать результат
             if result['success']:
                 successful += 1
-                print(f"✅ {result['action']}")
+                log.audit('payee_processed', n=payee_num, payee_id=payee.id, action=result['action'])
             else:
                 failed += 1
-                print(f"❌ {result['action']}: {result['message']}")
+                log.error('payee_failed', n=payee_num, payee_id=payee.id, action=result['action'],
+                          message=result['message'])
+            progress.update(ok=result['success'])
             
             # Небольшая пауза между payees
             if not dry_run:
                 time.sleep(0.2)
         
-        # Показать статистику батча
+        # Статистика батча
         batch_success = sum(1 for r in batch_results if r['success'])
-        batch_failed = len(batch_results) - batch_success
-        
-        print(f"  📊 Батч завершен: ✅ {batch_success} | ❌ {batch_failed}")
+        log.info('batch_done', batch=batch_num, batches=total_batches, successful=batch_success,
+                 failed=len(batch_results) - batch_success)
         
         # Пауза между батчами
         if i + batch_size < total_payees:  # Не ждать после последнего батча
-            print(f"  ⏳ Пауза {delay}s перед следующим батчем...")
             time.sleep(delay)
     
+    progress.close()
+    log.info('block_finished', dry_run=dry_run, total=total_payees, successful=successful, failed=failed)
+    
     print("\n" + "=" * 80)
     print(f"🏁 {'[DRY RUN] ' if dry_run else ''}Блокировка завершена!")
     print(f"  📊 Всего обработано: {total_payees}")
     print(f"  ✅ Успешно: {successful}")
     print(f"  ❌ Ошибок: {failed}")
+    print(f"  📝 Лог событий: {log.path}")
     
     if successful > 0:
         success_rate = (successful / total_payees) * 100
@@ -281,7 +252,7 @@ def main():
         api = TipaltiRestAPI(client_id, client_secret, is_sandbox)
         
         # Получить всех активных UA payees
-        ua_payees = get_active_ua_payees(api)
+        ua_payees, skipped_pages = get_active_ua_payees(api)
         
         if not ua_payees:
             print("❌ Не найдено активных UA payees для блокировки")
@@ -293,7 +264,7 @@ def main():
         # Показать примеры
         print(f"  📝 Примеры (первые 5):")
         for i, payee in enumerate(ua_payees[:5]):
-            print(f"    {i+1}. {payee['email']} | {payee['beneficiary_country']} -> {payee['payment_country']}")
+            print(f"    {i+1}. {payee.email} | {payee.beneficiary_country} -> {payee.payment_country}")
         
         # DRY RUN
         print(f"\n🔍 Запускаем DRY RUN...")
@@ -305,11 +276,17 @@ def main():
         # Запросить подтверждение для реального выполнения
         print(f"\n" + "="*80)
         print(f"❓ DRY RUN завершен. Хотите выполнить РЕАЛЬНУЮ блокировку {len(ua_payees)} UA payees?")
-        print(f"   Введите 'BLOCK UA PAYEES' для подтверждения:")
+        expected_input = 'BLOCK UA PAYEES'
+        if skipped_pages:
+            # Неполная когорта: блокировка затронет только загруженных payees
+            print(f"⚠️  ВНИМАНИЕ: {len(skipped_pages)} страниц не загружено - список UA payees НЕПОЛНЫЙ!")
+            print(f"   Пропущенные payees НЕ будут заблокированы. Перезапустите позже или подтвердите частичную блокировку.")
+            expected_input = 'BLOCK PARTIAL UA PAYEES'
+        print(f"   Введите '{expected_input}' для подтверждения:")
         
         user_input = input().strip()
         
-        if user_input != 'BLOCK UA PAYEES':
+        if user_input != expected_input:
             print("❌ Блокировка отменена пользователем")
             return
         
@@ -330,4 +307,5 @@ def main():
         traceback.print_exc()
 
 if __name__ == "__main__":
+    maybe_profile()
     main() 
\ No newline at end of file
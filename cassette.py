@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Record/Replay Cassettes
+Transport wrapper that records real REST/SOAP responses (secrets scrubbed)
+and replays them offline, at full speed or at the original timing
+
+Usage:
+  TIPALTI_CASSETTE=sweep.jsonl.gz TIPALTI_CASSETTE_MODE=record python backup_payees_with_cursor.py
+  TIPALTI_CASSETTE=sweep.jsonl.gz python backup_payees_with_cursor.py                   # replay, full speed
+  TIPALTI_CASSETTE=sweep.jsonl.gz TIPALTI_CASSETTE_REALTIME=1 python backup_payees_with_cursor.py
+
+  api = TipaltiRestAPI(client_id, client_secret, cassette='sweep.jsonl.gz', cassette_mode='record')
+"""
+
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional
+from urllib.parse import urlencode, urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+MODES = ('record', 'replay')
+
+SCRUBBED = '***'
+
+# Never written to a cassette
+SECRET_HEADERS = frozenset(('authorization', 'cookie', 'set-cookie'))
+SECRET_FIELDS = frozenset(('client_id', 'client_secret', 'access_token', 'refresh_token', 'id_token'))
+
+# SOAP elements that carry credentials or change on every call (signature input)
+VOLATILE_SOAP_TAGS = ('payerName', 'timestamp', 'key')
+
+# Response headers worth keeping for replay
+KEPT_RESPONSE_HEADERS = ('content-type', 'etag', 'last-modified', 'retry-after', 'location')
+
+
+def _scrub_mapping(data: Dict) -> Dict:
+    return {key: (SCRUBBED if key in SECRET_FIELDS else value) for key, value in data.items()}
+
+
+def _scrub_soap(xml: str) -> str:
+    for tag in VOLATILE_SOAP_TAGS:
+        xml = re.sub(rf'<{tag}>[^<]*</{tag}>', f'<{tag}>{SCRUBBED}</{tag}>', xml)
+    return xml
+
+
+def _scrub_body(body: bytes, content_type: str) -> bytes:
+    """Remove tokens from JSON bodies and credentials from SOAP bodies"""
+    if 'json' in content_type:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return body
+        if isinstance(data, dict) and SECRET_FIELDS.intersection(data):
+            return json.dumps(_scrub_mapping(data)).encode('utf-8')
+        return body
+    if 'xml' in content_type:
+        return _scrub_soap(body.decode('utf-8', errors='replace')).encode('utf-8')
+    return body
+
+
+def request_key(method: str, url: str, params: Optional[Dict] = None, data=None, json_body=None) -> str:
+    """Match key: method, path and query (host-independent) plus a normalized body digest"""
+    parsed = urlparse(url)
+    key = f"{method.upper()} {parsed.path}"
+
+    query = sorted((params or {}).items())
+    if query:
+        key += '?' + urlencode(query)
+    elif parsed.query:
+        key += '?' + parsed.query
+
+    if json_body is not None:
+        body = json.dumps(json_body, sort_keys=True)
+    elif isinstance(data, dict):
+        body = urlencode(sorted(_scrub_mapping(data).items()))
+    elif data:
+        body = data.decode('utf-8', errors='replace') if isinstance(data, bytes) else str(data)
+        body = re.sub(r'\s+', ' ', _scrub_soap(body))
+    else:
+        body = ''
+
+    if body:
+        key += ' #' + hashlib.sha1(body.encode('utf-8')).hexdigest()[:16]
+    return key
+
+
+class Cassette:
+    """Recorded interactions in a JSONL file (gzip-compressed for *.gz paths)
+
+    Replay hands out recordings for the same key in recorded order; once they
+    are used up the last one keeps being returned (e.g. repeated polling).
+    Recording always starts from an empty cassette: the file is rewritten with
+    only this run's interactions, never appended to an older recording.
+    """
+
+    _open: Dict[str, 'Cassette'] = {}
+    _open_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: List[Dict] = []
+        self._queues: Dict[str, Deque[Dict]] = defaultdict(deque)
+        self._last: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._replay_started: Optional[float] = None
+        self._replayed_ids = set()
+        self.dirty = False
+        self.recording = False
+
+    @classmethod
+    def open(cls, path: str, mode: str = 'replay') -> 'Cassette':
+        """Shared instance per path, so REST and SOAP clients can record into one file
+
+        The first recorder of a path discards whatever was loaded from disk;
+        later recorders in the same process share (and add to) its entries.
+        """
+        path = os.path.abspath(path)
+        with cls._open_lock:
+            cassette = cls._open.get(path)
+            if cassette is None:
+                cassette = cls(path)
+                if mode != 'record' and os.path.exists(path):
+                    cassette.load()
+                cls._open[path] = cassette
+            if mode == 'record' and not cassette.recording:
+                cassette.reset()
+                cassette.recording = True
+            return cassette
+
+    def reset(self):
+        """Drop all entries; the next save() truncates the file"""
+        with self._lock:
+            self.entries = []
+            self._queues.clear()
+            self._last.clear()
+            self._started = time.perf_counter()
+            self._replay_started = None
+            self._replayed_ids.clear()
+            self.dirty = True
+
+    def _opener(self, mode: str):
+        if self.path.endswith('.gz'):
+            return gzip.open(self.path, mode + 't', encoding='utf-8')
+        return open(self.path, mode, encoding='utf-8')
+
+    def load(self):
+        with self._opener('r') as f:
+            for line in f:
+                if line.strip():
+                    self._add(json.loads(line))
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return
+            entries = list(self.entries)
+            self.dirty = False
+
+        tmp_path = self.path + '.tmp'
+        opener = gzip.open(tmp_path, 'wt', encoding='utf-8') if self.path.endswith('.gz') \
+            else open(tmp_path, 'w', encoding='utf-8')
+        with opener as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')))
+                f.write('\n')
+        os.replace(tmp_path, self.path)
+
+    def _add(self, entry: Dict):
+        self.entries.append(entry)
+        self._queues[entry['key']].append(entry)
+
+    def record(self, key: str, method: str, url: str, response: requests.Response, elapsed: float, started: float):
+        content_type = response.headers.get('Content-Type', '')
+        body = _scrub_body(response.content, content_type)
+
+        entry = {
+            'key': key,
+            'method': method.upper(),
+            'url': urlparse(url).path,
+            'status': response.status_code,
+            'headers': {name: response.headers[name] for name in KEPT_RESPONSE_HEADERS if name in response.headers},
+            'offset': round(started - self._started, 6),
+            'elapsed': round(elapsed, 6)
+        }
+        try:
+            entry['body'] = body.decode('utf-8')
+        except UnicodeDecodeError:
+            entry['body_b64'] = base64.b64encode(body).decode('ascii')
+
+        with self._lock:
+            self._add(entry)
+            self.dirty = True
+
+    def next(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue:
+                self._last[key] = queue.popleft()
+            return self._last.get(key)
+
+    def due(self, entry: Dict) -> float:
+        """perf_counter() time at which a realtime replay of ``entry`` completes
+
+        The replay clock is anchored at the first replayed request, so recorded
+        gaps (and overlaps of concurrent requests) are reproduced rather than
+        summed per call.
+        """
+        offset = entry.get('offset')
+        with self._lock:
+            repeated = id(entry) in self._replayed_ids
+            self._replayed_ids.add(id(entry))
+            if offset is None or repeated:
+                # Recorded before offsets were stored, or the last recording handed out again
+                return time.perf_counter() + entry.get('elapsed', 0.0)
+            if self._replay_started is None:
+                self._replay_started = time.perf_counter() - offset
+            return self._replay_started + offset + entry.get('elapsed', 0.0)
+
+
+class CassetteTransport:
+    """Wraps a transport (requests.Session / Http2Transport) with record or replay
+
+    Record passes calls through and stores the responses. Replay never touches
+    the network; unknown requests raise requests.ConnectionError. With
+    ``realtime`` each response is returned when it arrived in the recording
+    (replay start + offset + elapsed), not earlier.
+    """
+
+    def __init__(self, cassette: Cassette, mode: str = 'replay', inner=None, realtime: bool = False):
+        if mode not in MODES:
+            raise ValueError(f"Cassette mode must be one of {', '.join(MODES)}")
+        if mode == 'record' and inner is None:
+            raise ValueError("Recording requires an inner transport")
+
+        self.cassette = cassette
+        self.mode = mode
+        self.inner = inner
+        self.realtime = realtime
+        self.replayed = 0
+        self.misses = 0
+
+        if mode == 'record':
+            atexit.register(cassette.save)
+
+    def request(self, method: str, url: str, headers: Optional[Dict] = None, params: Optional[Dict] = None,
+                data=None, json=None, stream: bool = False) -> requests.Response:
+        key = request_key(method, url, params, data, json)
+
+        if self.mode == 'record':
+            started = time.perf_counter()
+            response = self.inner.request(method, url, headers=headers, params=params, data=data, json=json,
+                                          stream=stream)
+            _ = response.content
+            self.cassette.record(key, method, url, response, time.perf_counter() - started, started)
+            return response
+
+        entry = self.cassette.next(key)
+        if entry is None:
+            self.misses += 1
+            raise requests.ConnectionError(f"No recorded response in {self.cassette.path} for {key}")
+
+        if self.realtime:
+            delay = self.cassette.due(entry) - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        self.replayed += 1
+        return self._to_response(entry, url)
+
+    @staticmethod
+    def _to_response(entry: Dict, url: str) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry.get('headers') or {})
+        response.url = url
+        response.encoding = 'utf-8'
+        if 'body_b64' in entry:
+            response._content = base64.b64decode(entry['body_b64'])
+        else:
+            response._content = entry.get('body', '').encode('utf-8')
+        response.headers['Content-Length'] = str(len(response._content))
+        return response
+
+    def close(self):
+        if self.mode == 'record':
+            self.cassette.save()
+        if self.inner is not None:
+            self.inner.close()
+
+
+def wrap_transport(transport, path: Optional[str] = None, mode: Optional[str] = None,
+                   realtime: Optional[bool] = None):
+    """Wrap ``transport`` when a cassette is configured (arguments or TIPALTI_CASSETTE* env vars)"""
+    path = path or os.getenv('TIPALTI_CASSETTE')
+    if not path:
+        return transport
+
+    mode = mode or os.getenv('TIPALTI_CASSETTE_MODE', 'replay')
+    if realtime is None:
+        realtime = os.getenv('TIPALTI_CASSETTE_REALTIME', '').lower() in ('1', 'true', 'yes')
+
+    return CassetteTransport(Cassette.open(path, mode), mode, inner=transport, realtime=realtime)
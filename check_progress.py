@@ -1,55 +1,371 @@
 #!/usr/bin/env python3
 """
-Quick Progress Checker
-Быстрая проверка прогресса блокировки RU payees
+Cohort Progress Monitor
+Отслеживание прогресса блокировки всей когорты payees (например, всех RU)
+с точным процентом завершения, скоростью изменений и ETA
+
+The cohort baseline (id -> status) comes from a local backup (--mirror) or a
+one-off listing. Each poll then refreshes only what can have changed:
+
+  status  one limit=1 totalCount probe per tracked status (cohort-scoped with
+          country pushdown). Only when a count moved - or every
+          --relist-every polls, to catch moves that cancel out - are the
+          pending cohort members refreshed, by whichever is cheaper: a listing
+          of the pending statuses or a details fetch per pending member
+  delta   one modifiedSince query for payees changed since the last poll
+          (needs 'modified_since' server pushdown)
+
+The poll interval adapts: it drops to --interval while payees are changing
+and backs off up to --max-interval while nothing moves.
+
+Usage:
+  python check_progress.py --country RU --mirror
+  python check_progress.py --country RU --pushdown status,country --once
+  python check_progress.py --country UA --done SUSPENDED --strategy delta --pushdown status,modified_since
 """
 
+import argparse
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional
+
 from tipalti_rest_api import TipaltiRestAPI
 import config_rest
-from datetime import datetime
+from backup_io import find_latest_backup, iter_backup_payees
+from event_log import format_duration, get_event_logger
+from payee_query import FILTER_PARAMS, parse_timestamp
+from profiling import maybe_profile
+
+
+# Statuses that count as "done" for a blocking campaign
+DONE_STATUSES = ('SUSPENDED', 'BLOCKED', 'BLOCKED_BY_TIPALTI')
+
+# Cohort members that left a pending status but whose new status could not
+# be fetched yet; counted as pending and retried on the next poll
+LEFT_PENDING = 'LEFT_PENDING'
+
+# Payees changed while a delta poll runs are picked up by the next one
+DELTA_OVERLAP = timedelta(seconds=5)
+
+COUNTRY_FIELD = 'beneficiaryCountryCode'
+
+
+def _utcnow() -> datetime:
+    """Naive UTC, matching how PayeeQuery compares lastUpdated"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def payee_country(payee: Dict) -> Optional[str]:
+    return (payee.get('contactInformation') or {}).get(COUNTRY_FIELD)
+
+
+class CohortTracker:
+    """Current status of every payee in a country cohort, refreshed incrementally"""
+
+    def __init__(self, api: TipaltiRestAPI, country: str, statuses: Dict[str, str],
+                 done_statuses: Iterable[str] = DONE_STATUSES, page_size: int = 100,
+                 since: Optional[datetime] = None, relist_every: int = 10):
+        self.api = api
+        self.country = country
+        self.statuses = statuses
+        self.done_statuses = frozenset(done_statuses)
+        self.page_size = page_size
+        self.relist_every = relist_every
+        self.requests = 0
+        # Last probed totalCount per status, and polls since the last full refresh
+        self._counts: Dict[str, int] = {}
+        self._polls_since_refresh = 0
+        # Delta watermark: payees updated at or after it are re-read by poll_delta
+        self._since = since
+
+    @classmethod
+    def from_backup(cls, api: TipaltiRestAPI, country: str, path: str, **options) -> 'CohortTracker':
+        statuses = {}
+        latest = None
+        for payee in iter_backup_payees(path):
+            updated = parse_timestamp(payee.get('lastUpdated', ''))
+            if updated and (latest is None or updated > latest):
+                latest = updated
+            if payee_country(payee) == country:
+                statuses[payee['id']] = payee.get('status')
+        options.setdefault('since', latest)
+        return cls(api, country, statuses, **options)
+
+    @classmethod
+    def from_api(cls, api: TipaltiRestAPI, country: str, **options) -> 'CohortTracker':
+        options.setdefault('since', _utcnow() - DELTA_OVERLAP)
+        tracker = cls(api, country, {}, **options)
+        query = api.query(page_size=tracker.page_size).country(country, fields=(COUNTRY_FIELD,))
+        for matched, _ in query.pages():
+            tracker.requests += 1
+            tracker.statuses.update((payee['id'], payee.get('status')) for payee in matched)
+        return tracker
+
+    # Polling strategies
+
+    def _country_params(self) -> Dict:
+        if 'country' in self.api.pushdown_filters:
+            return {FILTER_PARAMS['country']: self.country}
+        return {}
+
+    def pending_statuses(self):
+        """Statuses still to be worked off (ACTIVE always, to catch re-activations)"""
+        statuses = set(self.statuses.values()) | {'ACTIVE'}
+        return sorted(status for status in statuses
+                      if status not in self.done_statuses and status != LEFT_PENDING)
+
+    def _probe_counts(self) -> Optional[Dict[str, int]]:
+        """totalCount per tracked status from limit=1 probes (None without status pushdown)"""
+        if 'status' not in self.api.pushdown_filters:
+            return None
+        statuses = ({status for status in self.statuses.values() if status != LEFT_PENDING}
+                    | self.done_statuses | {'ACTIVE'})
+        counts = {}
+        for status in sorted(statuses):
+            params = {FILTER_PARAMS['status']: status, 'limit': 1, 'offset': 0, **self._country_params()}
+            total = self.api._make_request('GET', '/payees', params=params).get('totalCount')
+            self.requests += 1
+            if total is None:
+                return None
+            counts[status] = int(total)
+        return counts
+
+    def _resolve(self, payee_ids) -> int:
+        """Fetch the current status of the given cohort members. Returns payees changed"""
+        changed = 0
+        for result in self.api.get_payees_details(payee_ids):
+            self.requests += 1
+            payee_id, details = result['id'], result['data']
+            if not result['success'] or not details:
+                # Unknown for now: stays pending, retried next poll
+                if self.statuses.get(payee_id) != LEFT_PENDING:
+                    self.statuses[payee_id] = LEFT_PENDING
+                    changed += 1
+            elif payee_country(details) not in (None, self.country):
+                del self.statuses[payee_id]
+                changed += 1
+            elif self.statuses.get(payee_id) != details.get('status'):
+                self.statuses[payee_id] = details.get('status')
+                changed += 1
+        return changed
+
+    def _relist(self) -> int:
+        """Re-list each pending status and resolve members that left it. Returns payees changed"""
+        changed = 0
+        seen = set()
+        left = [payee_id for payee_id, current in self.statuses.items() if current == LEFT_PENDING]
+        for status in self.pending_statuses():
+            listed = set()
+            if self._counts.get(status) != 0:
+                query = self.api.query(page_size=self.page_size).status(status)
+                if 'country' in self.api.pushdown_filters:
+                    query = query.country(self.country, fields=(COUNTRY_FIELD,))
+                for matched, _ in query.pages():
+                    self.requests += 1
+                    for payee in matched:
+                        if payee_country(payee) != self.country:
+                            continue
+                        listed.add(payee['id'])
+                        if self.statuses.get(payee['id']) != status:
+                            self.statuses[payee['id']] = status
+                            changed += 1
+
+            seen |= listed
+            left.extend(payee_id for payee_id, current in self.statuses.items()
+                        if current == status and payee_id not in listed)
+
+        left = [payee_id for payee_id in left if payee_id not in seen]
+        if left:
+            changed += self._resolve(left)
+        return changed
+
+    def poll_status(self) -> int:
+        """Probe status counts; refresh pending members only when they may have moved. Returns payees changed
 
-def main():
-    print(f"📊 PROGRESS CHECK - {datetime.now().strftime('%H:%M:%S')}")
+        An unchanged count vector across all tracked statuses means nothing
+        moved, except for exactly offsetting transitions, which the periodic
+        refresh (every ``relist_every`` polls) picks up. Refreshing uses
+        whichever is cheaper: listing the pending statuses (pages from the
+        probed counts) or one details fetch per pending cohort member. Only
+        the listing sees cohort members re-activated from a done status, so
+        the periodic refresh always lists.
+        """
+        counts = self._probe_counts()
+        self._polls_since_refresh += 1
+        periodic = self._polls_since_refresh >= self.relist_every
+        if counts is not None and counts == self._counts and not periodic:
+            return 0
+
+        if counts is not None:
+            self._counts = counts
+        self._polls_since_refresh = 0
+
+        pending_ids = [payee_id for payee_id, status in self.statuses.items()
+                       if status not in self.done_statuses]
+        if counts is not None and not periodic:
+            list_pages = sum(-(-counts.get(status, 0) // self.page_size) or 1
+                             for status in self.pending_statuses())
+            if len(pending_ids) < list_pages:
+                return self._resolve(pending_ids) if pending_ids else 0
+        return self._relist()
+
+    def poll_delta(self) -> int:
+        """Apply payees modified since the previous poll. Returns payees changed"""
+        started = _utcnow()
+        if self._since is None:
+            # First delta poll only establishes the watermark
+            self._since = started - DELTA_OVERLAP
+            return 0
+
+        changed = 0
+        query = self.api.query(page_size=self.page_size).modified_since(self._since)
+        for matched, _ in query.pages():
+            self.requests += 1
+            for payee in matched:
+                payee_id = payee['id']
+                if payee_country(payee) == self.country:
+                    if self.statuses.get(payee_id) != payee.get('status'):
+                        self.statuses[payee_id] = payee.get('status')
+                        changed += 1
+                elif payee_id in self.statuses:
+                    del self.statuses[payee_id]
+                    changed += 1
+        self._since = started - DELTA_OVERLAP
+        return changed
+
+    def snapshot(self) -> Dict:
+        by_status = Counter(self.statuses.values())
+        pending = sum(count for status, count in by_status.items()
+                      if status not in self.done_statuses)
+        return {
+            'total': len(self.statuses),
+            'done': len(self.statuses) - pending,
+            'pending': pending,
+            'by_status': dict(by_status)
+        }
+
+
+class ProgressRate:
+    """Completion rate over a sliding window of polls"""
+
+    def __init__(self, window: int = 10):
+        self.samples = deque(maxlen=window)
+
+    def add(self, done: int, at: Optional[float] = None):
+        self.samples.append((at or time.time(), done))
+
+    def per_second(self) -> float:
+        if len(self.samples) < 2:
+            return 0.0
+        (t0, d0), (t1, d1) = self.samples[0], self.samples[-1]
+        return (d1 - d0) / (t1 - t0) if t1 > t0 else 0.0
+
+
+def print_snapshot(country: str, snapshot: Dict, rate: float, requests: int, changed: int):
+    total = snapshot['total']
+    completion = snapshot['done'] / total if total else 1.0
+    parts = [
+        f"📊 {datetime.now():%H:%M:%S}",
+        f"{country} {snapshot['done']:,}/{total:,} ({completion:.1%})",
+        f"⚠️ осталось {snapshot['pending']:,}",
+        f"{rate * 60:+,.1f}/мин"
+    ]
+    if snapshot['pending'] and rate > 0:
+        parts.append(f"ETA {format_duration(snapshot['pending'] / rate)}")
+    parts.append(f"Δ {changed:,}")
+    parts.append(f"{requests} запр.")
+    print(' | '.join(parts), flush=True)
+
+
+def watch(tracker: CohortTracker, strategy: str = 'status', interval: float = 30.0,
+          max_interval: float = 300.0, once: bool = False):
+    """Poll until the cohort is complete (or once), adapting the interval to the rate of change"""
+    poll = tracker.poll_delta if strategy == 'delta' else tracker.poll_status
+    log = get_event_logger()
+    rate = ProgressRate()
+    delay = interval
+
+    while True:
+        before = tracker.requests
+        changed = poll()
+        snapshot = tracker.snapshot()
+        rate.add(snapshot['done'])
+
+        requests = tracker.requests - before
+        print_snapshot(tracker.country, snapshot, rate.per_second(), requests, changed)
+        log.info('progress_poll', country=tracker.country, strategy=strategy, changed=changed,
+                 requests=requests, **snapshot)
+
+        if once:
+            return snapshot
+        if snapshot['total'] and not snapshot['pending']:
+            print(f"🏆 Когорта {tracker.country} полностью обработана!")
+            return snapshot
+
+        delay = interval if changed else min(max_interval, delay * 2)
+        time.sleep(delay)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Watch blocking progress of a country cohort')
+    parser.add_argument('--country', default='RU', type=str.upper)
+    parser.add_argument('--done', default=','.join(DONE_STATUSES),
+                        help='Comma-separated statuses counted as done')
+    parser.add_argument('--mirror', nargs='?', const='latest', default=None, metavar='BACKUP',
+                        help='Cohort baseline from a local backup (default: latest) instead of a listing')
+    parser.add_argument('--strategy', choices=('auto', 'status', 'delta'), default='auto',
+                        help="Per-poll cost - status: 1 limit=1 probe per tracked status (~4) while idle; "
+                             "when counts move, min(pages of the pending statuses - account-wide "
+                             "without country pushdown, cohort-only with it - , 1 details GET per "
+                             "pending cohort member); a full listing every --relist-every polls. "
+                             "delta: ceil(changed payees / page size) with modified_since pushdown, "
+                             "a full account listing without it. "
+                             "auto = delta when modified_since is pushed down, otherwise status")
+    parser.add_argument('--pushdown', default='status',
+                        help='Comma-separated filters the server applies (status,country,modified_since)')
+    parser.add_argument('--interval', type=float, default=30.0, help='Poll interval while changing (s)')
+    parser.add_argument('--max-interval', type=float, default=300.0, help='Poll interval when idle (s)')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--relist-every', type=int, default=10,
+                        help='Status strategy: full re-list every N polls even if counts did not move')
+    parser.add_argument('--once', action='store_true', help='Single poll, then exit')
+    args = parser.parse_args(argv)
+
+    pushdown = tuple(name.strip() for name in args.pushdown.split(',') if name.strip())
+    strategy = args.strategy
+    if strategy == 'auto':
+        strategy = 'delta' if 'modified_since' in pushdown else 'status'
+
+    print(f"📊 PROGRESS MONITOR - {args.country} ({strategy})")
     print("=" * 40)
-    
+
+    client_id, client_secret, is_sandbox = config_rest.get_validated_config()
+    api = TipaltiRestAPI(client_id, client_secret, is_sandbox, pushdown_filters=pushdown)
+    options = {'done_statuses': [s.strip() for s in args.done.split(',') if s.strip()],
+               'page_size': args.page_size, 'relist_every': args.relist_every}
+
+    if args.mirror:
+        path = find_latest_backup() if args.mirror == 'latest' else args.mirror
+        if not path:
+            print("❌ Не найдено локальных бэкапов - укажите файл или запустите без --mirror")
+            return None
+        tracker = CohortTracker.from_backup(api, args.country, path, **options)
+        print(f"📁 Базовая когорта из {path}: {len(tracker.statuses):,} payees")
+    else:
+        print("🔍 Построение когорты (однократный листинг)...")
+        tracker = CohortTracker.from_api(api, args.country, **options)
+        print(f"✅ Когорта: {len(tracker.statuses):,} payees за {tracker.requests} запросов")
+
     try:
-        client_id, client_secret, is_sandbox = config_rest.get_validated_config()
-        api = TipaltiRestAPI(client_id, client_secret, is_sandbox)
-        
-        # Get sample of payees
-        response = api._make_request('GET', '/payees', params={'limit': 100})
-        
-        if isinstance(response, dict) and 'items' in response:
-            ru_stats = {}
-            for payee in response['items']:
-                contact = payee.get('contactInformation', {})
-                if contact.get('beneficiaryCountryCode') == 'RU':
-                    status = payee.get('status', 'UNKNOWN')
-                    ru_stats[status] = ru_stats.get(status, 0) + 1
-            
-            total_ru = sum(ru_stats.values())
-            suspended = ru_stats.get('SUSPENDED', 0)
-            active = ru_stats.get('ACTIVE', 0)
-            
-            print(f"📈 Sample results (first 100 payees):")
-            print(f"  RU payees found: {total_ru}")
-            print(f"  🔒 SUSPENDED: {suspended}")
-            print(f"  ⚠️ ACTIVE: {active}")
-            
-            if total_ru > 0:
-                completion = (suspended / total_ru) * 100
-                print(f"  📊 Sample completion: {completion:.1f}%")
-                
-                if suspended > 13:  # More than initial 13
-                    print(f"  🎉 Progress detected! (+{suspended - 13} new)")
-                elif active == 0:
-                    print(f"  🏆 Sample fully completed!")
-            
-        else:
-            print("❌ Could not fetch data")
-            
-    except Exception as e:
-        print(f"❌ Error: {e}")
+        return watch(tracker, strategy, args.interval, args.max_interval, args.once)
+    finally:
+        api.close()
+
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    maybe_profile()
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n⏹️  Мониторинг остановлен")
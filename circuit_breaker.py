@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Circuit Breaker
+Per-endpoint closed/open/half-open breaker so outages fail fast
+"""
+
+import threading
+import time
+from typing import Dict
+
+import requests
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request while the endpoint's circuit is open"""
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"Circuit open for {endpoint}, retry in {retry_after:.1f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive failures
+
+    While open every call fails immediately with CircuitOpenError. After
+    ``recovery_timeout`` seconds up to ``half_open_max_calls`` trial calls are
+    let through: a success closes the circuit, a failure re-opens it.
+    """
+
+    def __init__(self, endpoint: str, failure_threshold: int = 5,
+                 recovery_timeout: float = 30.0, half_open_max_calls: int = 1):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a trial call through"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.recovery_timeout - time.monotonic())
+
+    def is_open(self) -> bool:
+        return self.state == OPEN and self.retry_after() > 0
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError"""
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self.retry_after()
+                if remaining > 0:
+                    raise CircuitOpenError(self.endpoint, remaining)
+                self.state = HALF_OPEN
+                self._half_open_calls = 0
+
+            if self.state == HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    raise CircuitOpenError(self.endpoint, self.recovery_timeout)
+                self._half_open_calls += 1
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+
+class CircuitBreakerRegistry:
+    """Lazily creates one breaker per endpoint with shared settings"""
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = CircuitBreaker(endpoint, self.failure_threshold,
+                                         self.recovery_timeout, self.half_open_max_calls)
+                self._breakers[endpoint] = breaker
+            return breaker
+
+    def states(self) -> Dict[str, str]:
+        """Current state per endpoint"""
+        return {endpoint: breaker.state for endpoint, breaker in self._breakers.items()}
+
+
+def is_failure_status(status_code: int) -> bool:
+    """Responses that indicate the service (not the request) is unhealthy"""
+    return status_code >= 500 or status_code == 429
@@ -8,6 +8,7 @@ import sys
 from datetime import datetime, date
 from tipalti_api import TipaltiAPI
 import config
+from profiling import maybe_profile
 
 
 def is_user_inactive(user_data, cutoff_date_str):
@@ -188,6 +189,7 @@ def cleanup_users():
 
 
 if __name__ == "__main__":
+    maybe_profile()
     print("🧹 Tipalti Users Cleanup Tool")
     print("=" * 40)
     print("⚠️  WARNING: This will deactivate inactive users!")
@@ -8,6 +8,7 @@ import sys
 from datetime import datetime, date
 from tipalti_rest_api import TipaltiRestAPI
 import config_rest
+from profiling import maybe_profile
 
 
 def is_user_inactive(user_data, cutoff_date_str):
@@ -190,6 +191,7 @@ def cleanup_users():
 
 
 if __name__ == "__main__":
+    maybe_profile()
     print("🧹 Tipalti Users Cleanup Tool (REST API)")
     print("=" * 50)
     print("⚠️  WARNING: This will deactivate inactive users!")
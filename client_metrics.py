@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Client Metrics
+Per-endpoint request counters and latency histograms with Prometheus export
+"""
+
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+
+# Latency histogram upper bounds in seconds (+Inf is implicit)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class EndpointStats:
+    """Counters for one endpoint label such as 'GET /payees/{id}'"""
+
+    __slots__ = ('requests', 'errors', 'bytes', 'retries', 'throttled_waits',
+                 'throttled_seconds', 'status_codes', 'latency_sum', 'bucket_counts')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.bytes = 0
+        self.retries = 0
+        self.throttled_waits = 0
+        self.throttled_seconds = 0.0
+        self.status_codes: Counter = Counter()
+        self.latency_sum = 0.0
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe_latency(self, seconds: float):
+        self.latency_sum += seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+                return
+        self.bucket_counts[-1] += 1
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        """Upper bucket bound containing the percentile (None when empty)"""
+        total = sum(self.bucket_counts)
+        if not total:
+            return None
+        target = pct / 100 * total
+        running = 0
+        for i, count in enumerate(self.bucket_counts):
+            running += count
+            if running >= target:
+                return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else float('inf')
+        return float('inf')
+
+    def to_dict(self) -> Dict:
+        observed = sum(self.bucket_counts)
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'retries': self.retries,
+            'throttled_waits': self.throttled_waits,
+            'throttled_seconds': round(self.throttled_seconds, 3),
+            'status_codes': dict(self.status_codes),
+            'latency_avg': (self.latency_sum / observed) if observed else None,
+            'latency_p50': self.latency_percentile(50),
+            'latency_p95': self.latency_percentile(95),
+            'latency_buckets': dict(zip([str(b) for b in LATENCY_BUCKETS] + ['+Inf'], self.bucket_counts))
+        }
+
+
+class ClientMetrics:
+    """Thread-safe per-endpoint metrics registry"""
+
+    def __init__(self, prefix: str = 'tipalti_client'):
+        self.prefix = prefix
+        self._endpoints: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, endpoint: str) -> EndpointStats:
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = EndpointStats()
+        return stats
+
+    def record_response(self, endpoint: str, status_code: int, nbytes: int, seconds: float):
+        with self._lock:
+            stats = self._stats(endpoint)
+            stats.requests += 1
+            stats.bytes += nbytes
+            stats.status_codes[status_code] += 1
+            stats.observe_latency(seconds)
+
+    def record_error(self, endpoint: str, seconds: float):
+        """Request that failed without a response (connection error, timeout)"""
+        with self._lock:
+            stats = self._stats(endpoint)
+            stats.requests += 1
+            stats.errors += 1
+            stats.observe_latency(seconds)
+
+    def record_retry(self, endpoint: str):
+        with self._lock:
+            self._stats(endpoint).retries += 1
+
+    def record_throttle(self, endpoint: str, seconds: float):
+        with self._lock:
+            stats = self._stats(endpoint)
+            stats.throttled_waits += 1
+            stats.throttled_seconds += seconds
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Plain-dict copy of all endpoint stats"""
+        with self._lock:
+            return {endpoint: stats.to_dict() for endpoint, stats in sorted(self._endpoints.items())}
+
+    def format_table(self) -> str:
+        """Human readable summary, one line per endpoint"""
+        lines = [f"{'Endpoint':<28} {'Reqs':>7} {'Err':>5} {'MB':>8} {'p50':>6} {'p95':>6} {'Thr.s':>7}"]
+        for endpoint, stats in self.snapshot().items():
+            p50 = stats['latency_p50']
+            p95 = stats['latency_p95']
+            lines.append(
+                f"{endpoint:<28} {stats['requests']:>7} {stats['errors']:>5} "
+                f"{stats['bytes'] / 1_000_000:>8.2f} "
+                f"{p50 if p50 is not None else '-':>6} {p95 if p95 is not None else '-':>6} "
+                f"{stats['throttled_seconds']:>7.1f}"
+            )
+        return "\n".join(lines)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        p = self.prefix
+        out: List[str] = []
+
+        def label(endpoint: str, **extra) -> str:
+            method, _, path = endpoint.partition(' ')
+            pairs = {'method': method, 'endpoint': path, **extra}
+            return '{' + ','.join(f'{k}="{v}"' for k, v in pairs.items()) + '}'
+
+        with self._lock:
+            items = sorted(self._endpoints.items())
+
+            counters = [
+                ('requests_total', 'Requests sent', 'requests'),
+                ('errors_total', 'Requests failed without a response', 'errors'),
+                ('response_bytes_total', 'Response body bytes received', 'bytes'),
+                ('retries_total', 'Retried or hedged duplicate requests', 'retries'),
+                ('throttled_waits_total', 'Requests delayed by the client rate limiter', 'throttled_waits'),
+                ('throttled_seconds_total', 'Seconds spent waiting on the client rate limiter', 'throttled_seconds'),
+            ]
+            for name, help_text, attr in counters:
+                out.append(f"# HELP {p}_{name} {help_text}")
+                out.append(f"# TYPE {p}_{name} counter")
+                for endpoint, stats in items:
+                    out.append(f"{p}_{name}{label(endpoint)} {getattr(stats, attr)}")
+
+            out.append(f"# HELP {p}_responses_total Responses by HTTP status code")
+            out.append(f"# TYPE {p}_responses_total counter")
+            for endpoint, stats in items:
+                for code, count in sorted(stats.status_codes.items()):
+                    out.append(f"{p}_responses_total{label(endpoint, code=code)} {count}")
+
+            out.append(f"# HELP {p}_request_duration_seconds Request latency")
+            out.append(f"# TYPE {p}_request_duration_seconds histogram")
+            for endpoint, stats in items:
+                cumulative = 0
+                for bound, count in zip(list(LATENCY_BUCKETS) + ['+Inf'], stats.bucket_counts):
+                    cumulative += count
+                    out.append(f"{p}_request_duration_seconds_bucket{label(endpoint, le=bound)} {cumulative}")
+                out.append(f"{p}_request_duration_seconds_sum{label(endpoint)} {stats.latency_sum}")
+                out.append(f"{p}_request_duration_seconds_count{label(endpoint)} {cumulative}")
+
+        return "\n".join(out) + "\n"
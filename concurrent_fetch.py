@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Concurrent Batch Fetch
+Runs a per-id fetch function on a thread pool, collecting per-id results
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+
+def _fetch_one(payee_id: str, fetch: Callable[[str], Optional[Dict]]) -> Dict:
+    """Run one fetch and wrap the outcome in a result dict (never raises)"""
+    try:
+        data = fetch(payee_id)
+        if data is None:
+            return {'id': payee_id, 'success': False, 'data': None, 'error': 'No data returned'}
+        return {'id': payee_id, 'success': True, 'data': data, 'error': None}
+    except Exception as e:
+        return {'id': payee_id, 'success': False, 'data': None, 'error': str(e)}
+
+
+def iter_fetch_completed(ids: Iterable[str], fetch: Callable[[str], Optional[Dict]],
+                         concurrency: int = 8) -> Iterator[Dict]:
+    """Yield result dicts as fetches complete (completion order)"""
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [pool.submit(_fetch_one, payee_id, fetch) for payee_id in ids]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def fetch_ordered(ids: Iterable[str], fetch: Callable[[str], Optional[Dict]],
+                  concurrency: int = 8) -> List[Dict]:
+    """Fetch all ids concurrently and return result dicts in input order"""
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        return list(pool.map(lambda payee_id: _fetch_one(payee_id, fetch), ids))
@@ -10,6 +10,8 @@ import time
 from datetime import datetime
 from tipalti_rest_api import TipaltiRestAPI
 import config_rest
+from profiling import maybe_profile
+from event_log import ProgressLine, get_event_logger
 
 
 def load_backup_data(backup_file: str) -> dict:
@@ -46,16 +48,18 @@ def find_ru_payees(backup_data: dict, only_active: bool = False) -> list:
     return ru_payees
 
 
+# Status values tried in order; the first one the API accepts is applied
+DEACTIVATION_STATUSES = ('BLOCKED', 'SUSPENDED', 'INACTIVE')
+
+
 def deactivate_payee_via_rest_api(api: TipaltiRestAPI, payee: dict, dry_run: bool = True) -> dict:
-    """Deactivate single payee by changing status to BLOCKED"""
+    """Deactivate single payee by changing status to BLOCKED (or SUSPENDED / INACTIVE)"""
     if dry_run:
-        return {"success": True, "message": "DRY RUN - Would block payee", "payee_id": payee['id']}
+        return {"success": True, "message": "DRY RUN - Would deactivate payee", "payee_id": payee['id']}
     
     try:
         # Try different status values that might work
-        status_options = ['BLOCKED', 'SUSPENDED', 'INACTIVE']
-        
-        for status in status_options:
+        for status in DEACTIVATION_STATUSES:
             deactivate_data = {'status': status}
             
             # Try to update payee status
@@ -80,6 +84,52 @@ def deactivate_payee_via_rest_api(api: TipaltiRestAPI, payee: dict, dry_run: boo
         return {"success": False, "message": str(e), "payee_id": payee['id']}
 
 
+def deactivate_payees(api: TipaltiRestAPI, payees: list, dry_run: bool = True) -> list:
+    """Deactivate payees one by one, logging events and showing a progress line"""
+    results = []
+    success_count = 0
+    failed_count = 0
+    
+    # Per-payee events go to the JSONL log (background writer); the terminal shows one progress line
+    log = get_event_logger()
+    progress = ProgressLine(len(payees), 'DRY RUN' if dry_run else 'Deactivation')
+    log.info('deactivation_started', dry_run=dry_run, total=len(payees))
+    
+    for i, payee in enumerate(payees, 1):
+        result = deactivate_payee_via_rest_api(api, payee, dry_run)
+        results.append({
+            **result,
+            'payee_refCode': payee['refCode'],
+            'payee_email': payee['email'],
+            'original_status': payee['status']
+        })
+        
+        if not result['success']:
+            failed_count += 1
+            log.error('payee_failed', n=i, payee_id=payee['id'], ref_code=payee['refCode'], dry_run=dry_run,
+                      message=result['message'])
+        elif dry_run:
+            success_count += 1
+            log.info('payee_would_deactivate', n=i, payee_id=payee['id'], ref_code=payee['refCode'],
+                     original_status=payee['status'], dry_run=True)
+        else:
+            success_count += 1
+            # Durable audit trail only for status changes that actually happened
+            log.audit('payee_deactivated', n=i, payee_id=payee['id'], ref_code=payee['refCode'],
+                      original_status=payee['status'], new_status=result.get('new_status'),
+                      dry_run=False, message=result['message'])
+        progress.update(ok=result['success'])
+        
+        # Rate limiting to avoid API throttling
+        if not dry_run and i % 10 == 0:
+            time.sleep(1)  # 1 second pause every 10 requests
+    
+    progress.close()
+    log.info('deactivation_finished', dry_run=dry_run, successful=success_count, failed=failed_count)
+    
+    return results
+
+
 def create_deactivation_report(results: list) -> str:
     """Create detailed deactivation report"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -188,36 +238,9 @@ def main():
     # Perform deactivations
     print(f"\n🚀 Starting {'DRY RUN' if dry_run else 'REAL'} deactivation process...")
     
-    results = []
-    success_count = 0
-    failed_count = 0
-    
-    for i, payee in enumerate(active_ru_payees, 1):
-        print(f"Processing {i}/{len(active_ru_payees)}: {payee['refCode']} | {payee['status']}")
-        
-        result = deactivate_payee_via_rest_api(api, payee, dry_run)
-        results.append({
-            **result,
-            'payee_refCode': payee['refCode'],
-            'payee_email': payee['email'],
-            'original_status': payee['status']
-        })
-        
-        if result['success']:
-            success_count += 1
-            status_msg = result.get('new_status', 'BLOCKED') if not dry_run else 'DRY RUN'
-            print(f"  ✅ {result['message']} -> {status_msg}")
-        else:
-            failed_count += 1
-            print(f"  ❌ {result['message']}")
-        
-        # Progress update every 50
-        if i % 50 == 0:
-            print(f"📊 Progress: {i}/{len(active_ru_payees)} | Success: {success_count} | Failed: {failed_count}")
-        
-        # Rate limiting to avoid API throttling
-        if not dry_run and i % 10 == 0:
-            time.sleep(1)  # 1 second pause every 10 requests
+    results = deactivate_payees(api, active_ru_payees, dry_run)
+    success_count = sum(1 for r in results if r['success'])
+    failed_count = len(results) - success_count
     
     # Create deactivation report
     report_file = create_deactivation_report(results)
@@ -229,6 +252,7 @@ def main():
     print(f"❌ Failed: {failed_count}")
     print(f"📈 Success rate: {success_count/len(active_ru_payees)*100:.1f}%")
     print(f"📋 Report saved: {report_file}")
+    print(f"📝 Event log: {get_event_logger().path}")
     
     if not dry_run and success_count > 0:
         print(f"\n🔒 REAL DEACTIVATIONS COMPLETED!")
@@ -245,6 +269,7 @@ def main():
 
 
 if __name__ == "__main__":
+    maybe_profile()
     try:
         main()
     except KeyboardInterrupt:
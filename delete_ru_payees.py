@@ -9,6 +9,7 @@ import sys
 from datetime import datetime
 from tipalti_rest_api import TipaltiRestAPI
 import config_rest
+from profiling import maybe_profile
 
 
 def load_backup_data(backup_file: str) -> dict:
@@ -41,8 +42,8 @@ def find_ru_payees(backup_data: dict) -> list:
     return ru_payees
 
 
-def create_deletion_report(ru_payees: list) -> str:
-    """Create detailed deletion report"""
+def create_deletion_report(ru_payees: list, results: list = None) -> str:
+    """Create detailed deletion report (with per-payee outcomes when ``results`` are given)"""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     report_file = f"ru_payees_deletion_report_{timestamp}.json"
     
@@ -59,6 +60,15 @@ def create_deletion_report(ru_payees: list) -> str:
         "payees_to_delete": ru_payees
     }
     
+    if results is not None:
+        successful = sum(1 for r in results if r.get('success'))
+        report.update({
+            "total_processed": len(results),
+            "successful_deletions": successful,
+            "failed_deletions": len(results) - successful,
+            "results": results
+        })
+    
     with open(report_file, 'w') as f:
         json.dump(report, f, indent=2, ensure_ascii=False)
     
@@ -192,6 +202,7 @@ def main():
 
 
 if __name__ == "__main__":
+    maybe_profile()
     try:
         main()
     except KeyboardInterrupt:
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Structured Event Log
+JSONL event logger with a background writer thread and level control, plus
+a compact live progress line (rate, ETA, errors) for bulk loops
+
+Settings:
+  TIPALTI_LOG_FILE   JSONL destination (default logs/<script>_<timestamp>.jsonl, '-' = stderr)
+  TIPALTI_LOG_LEVEL  DEBUG, INFO (default), WARNING or ERROR
+
+Usage:
+  log = get_event_logger()
+  progress = ProgressLine(len(payees), 'Блокировка')
+  for payee in payees:
+      ...
+      log.audit('payee_suspended', payee_id=payee.id, action=result['action'])
+      progress.update(ok=result['success'])
+  progress.close()
+"""
+
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, TextIO
+
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+_STOP = object()
+
+
+class EventLogger:
+    """Queues events and writes them as JSON lines from a background thread
+
+    ``log()`` only enqueues. If the writer falls behind and the queue fills
+    up, DEBUG/INFO events are dropped and counted in ``dropped`` rather than
+    stalling the bulk loop. WARNING/ERROR events and ``audit()`` events
+    (mutation outcomes) are never dropped: the caller waits for queue space.
+    """
+
+    def __init__(self, path: Optional[str] = None, level: str = 'INFO', queue_size: int = 10000):
+        self.path = path
+        self.level = LEVELS.get(level.upper(), LEVELS['INFO'])
+        self.dropped = 0
+        self.counts: Dict[str, int] = {name: 0 for name in LEVELS}
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._writer, name='event-log', daemon=True)
+        self._thread.start()
+
+    def _open(self) -> TextIO:
+        if not self.path or self.path == '-':
+            return sys.stderr
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        return open(self.path, 'a', encoding='utf-8', buffering=1024 * 1024)
+
+    def _writer(self):
+        stream = None
+        try:
+            while True:
+                event = self._queue.get()
+                if event is _STOP:
+                    break
+                if stream is None:
+                    stream = self._open()
+                stream.write(json.dumps(event, ensure_ascii=False, default=str))
+                stream.write('\n')
+                # Flush when idle so tail -f stays current without per-event syscalls
+                if self._queue.empty():
+                    stream.flush()
+        finally:
+            if stream is not None and stream is not sys.stderr:
+                stream.close()
+
+    def enabled(self, level: str) -> bool:
+        return LEVELS[level] >= self.level
+
+    def _emit(self, level: str, event: str, fields: Dict, durable: bool):
+        if LEVELS[level] < self.level or self._closed:
+            return
+        self.counts[level] += 1
+        record = {'ts': round(time.time(), 6), 'level': level, 'event': event}
+        record.update(fields)
+        try:
+            self._queue.put_nowait(record)
+            return
+        except queue.Full:
+            if not durable:
+                self.dropped += 1
+                return
+        # Durable event: wait for the writer (unless it has died)
+        while self._thread.is_alive():
+            try:
+                self._queue.put(record, timeout=1.0)
+                return
+            except queue.Full:
+                continue
+        self.dropped += 1
+
+    def log(self, level: str, event: str, **fields):
+        self._emit(level, event, fields, durable=LEVELS[level] >= LEVELS['WARNING'])
+
+    def debug(self, event: str, **fields):
+        self.log('DEBUG', event, **fields)
+
+    def info(self, event: str, **fields):
+        self.log('INFO', event, **fields)
+
+    def audit(self, event: str, **fields):
+        """INFO event that is never dropped (e.g. a payee was suspended)"""
+        self._emit('INFO', event, fields, durable=True)
+
+    def warning(self, event: str, **fields):
+        self.log('WARNING', event, **fields)
+
+    def error(self, event: str, **fields):
+        self.log('ERROR', event, **fields)
+
+    def close(self, timeout: float = 10.0):
+        """Flush queued events and stop the writer (waits at most ``timeout`` seconds)"""
+        if self._closed:
+            return
+        self._closed = True
+
+        stopped = False
+        if self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+                self._thread.join(timeout)
+                stopped = not self._thread.is_alive()
+            except queue.Full:
+                pass
+
+        # Writer died (disk full, permissions) or could not drain in time
+        lost = self.dropped + (0 if stopped else self._queue.qsize())
+        if lost:
+            print(f"⚠️ Журнал событий {self.path}: потеряно {lost} событий", file=sys.stderr)
+
+
+class ProgressLine:
+    """Single, self-overwriting status line: done/total, rate, ETA and errors
+
+    Redrawn at most every ``min_interval`` seconds. When the stream is not a
+    terminal (e.g. redirected to a file) a plain line is written every
+    ``log_interval`` seconds instead.
+    """
+
+    def __init__(self, total: Optional[int] = None, label: str = '', stream: TextIO = None,
+                 min_interval: float = 0.2, log_interval: float = 10.0):
+        self.total = total
+        self.label = label
+        self.stream = stream or sys.stdout
+        self.min_interval = min_interval if self._is_tty() else log_interval
+        self.done = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+        self._last_render = 0.0
+        self._width = 0
+        self._lock = threading.Lock()
+
+    def _is_tty(self) -> bool:
+        isatty = getattr(self.stream, 'isatty', None)
+        return bool(isatty and isatty())
+
+    def update(self, count: int = 1, ok: bool = True):
+        with self._lock:
+            self.done += count
+            if not ok:
+                self.errors += count
+            now = time.perf_counter()
+            if now - self._last_render >= self.min_interval:
+                self._render(now)
+
+    def error(self, count: int = 1):
+        """Count a failure that is not a processed item (e.g. a failed page)"""
+        with self._lock:
+            self.errors += count
+            now = time.perf_counter()
+            if now - self._last_render >= self.min_interval:
+                self._render(now)
+
+    def note(self, message: str):
+        """Print a message above the progress line (for warnings worth seeing live)"""
+        with self._lock:
+            self._clear()
+            print(message, file=self.stream)
+            self._render(time.perf_counter())
+
+    def text(self, now: Optional[float] = None) -> str:
+        elapsed = (now or time.perf_counter()) - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+
+        parts = [f"📊 {self.label}".rstrip()]
+        if self.total:
+            parts.append(f"{self.done:,}/{self.total:,} ({self.done / self.total:.1%})")
+        else:
+            parts.append(f"{self.done:,}")
+        parts.append(f"{rate:,.1f}/s")
+        if self.total and rate > 0:
+            parts.append(f"ETA {format_duration(max(0, self.total - self.done) / rate)}")
+        parts.append(f"❌ {self.errors:,}")
+        return ' | '.join(parts)
+
+    def _clear(self):
+        if self._width and self._is_tty():
+            self.stream.write('\r' + ' ' * self._width + '\r')
+
+    def _render(self, now: float):
+        self._last_render = now
+        line = self.text(now)
+        if self._is_tty():
+            padding = ' ' * max(0, self._width - len(line))
+            self.stream.write('\r' + line + padding)
+            self._width = len(line)
+        else:
+            self.stream.write(line + '\n')
+        self.stream.flush()
+
+    def close(self):
+        """Final render, ending the line"""
+        with self._lock:
+            self._render(time.perf_counter())
+            if self._is_tty():
+                self.stream.write('\n')
+                self.stream.flush()
+            self._width = 0
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+_logger: Optional[EventLogger] = None
+_logger_lock = threading.Lock()
+
+
+def get_event_logger() -> EventLogger:
+    """Process-wide logger configured from TIPALTI_LOG_FILE / TIPALTI_LOG_LEVEL"""
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            path = os.getenv('TIPALTI_LOG_FILE')
+            if not path:
+                script = os.path.splitext(os.path.basename(sys.argv[0] or 'tipalti'))[0] or 'tipalti'
+                path = os.path.join('logs', f"{script}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+            _logger = EventLogger(path, os.getenv('TIPALTI_LOG_LEVEL', 'INFO'))
+            atexit.register(_logger.close)
+        return _logger
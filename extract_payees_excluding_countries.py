@@ -9,6 +9,7 @@ import csv
 import sys
 from datetime import datetime
 import glob
+from profiling import maybe_profile
 
 
 def find_latest_backup_file():
@@ -253,4 +254,5 @@ def main():
 
 
 if __name__ == "__main__":
+    maybe_profile()
     main() 
\ No newline at end of file
@@ -8,6 +8,7 @@ from tipalti_rest_api import TipaltiRestAPI
 import config_rest
 from datetime import datetime
 import json
+from profiling import maybe_profile
 
 def search_payee_comprehensive(api, search_name="Matheus de Morais", search_id="22737"):
     """Поиск payee по имени и ID во всех возможных полях"""
@@ -221,4 +222,5 @@ def main():
         traceback.print_exc()
 
 if __name__ == "__main__":
+    maybe_profile()
     main() 
\ No newline at end of file
@@ -6,6 +6,7 @@
 from tipalti_rest_api import TipaltiRestAPI
 import config_rest
 from datetime import datetime
+from profiling import maybe_profile
 
 def get_token_for_postman():
     """Получить bearer токен для использования в Postman"""
@@ -92,4 +93,5 @@ def main():
         print("\n❌ Не удалось получить токен")
 
 if __name__ == "__main__":
+    maybe_profile()
     main() 
\ No newline at end of file
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Hedged Requests
+Latency tracking per endpoint and hedged execution of idempotent calls
+"""
+
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError, wait
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies (seconds) per endpoint"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float):
+        with self._lock:
+            self._samples[endpoint].append(seconds)
+
+    def percentile(self, endpoint: str, pct: float) -> Optional[float]:
+        """Observed percentile, or None until ``min_samples`` latencies are known"""
+        with self._lock:
+            samples = sorted(self._samples.get(endpoint, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class Hedger:
+    """Runs a call and, if it is slower than ``delay``, races a duplicate
+
+    At most ``budget`` (fraction of all calls) may be hedged, which bounds the
+    extra request volume. The first successful result wins; the loser is left
+    to finish in the background and its result is discarded.
+    """
+
+    def __init__(self, budget: float = 0.05, max_workers: int = 16):
+        self.budget = budget
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='hedge')
+        self._lock = threading.Lock()
+
+    def _allow_hedge(self) -> bool:
+        with self._lock:
+            if self.hedged + 1 > self.budget * self.calls:
+                return False
+            self.hedged += 1
+            return True
+
+    def call(self, fn: Callable[[], Any], delay: float, on_hedge: Optional[Callable[[], None]] = None) -> Any:
+        with self._lock:
+            self.calls += 1
+
+        primary = self._pool.submit(fn)
+        try:
+            return primary.result(timeout=delay)
+        except TimeoutError:
+            pass
+
+        if not self._allow_hedge():
+            return primary.result()
+
+        if on_hedge:
+            on_hedge()
+        backup = self._pool.submit(fn)
+        done, _ = wait([primary, backup], return_when=FIRST_COMPLETED)
+
+        for future in done:
+            if future.exception() is None:
+                if future is backup:
+                    with self._lock:
+                        self.hedge_wins += 1
+                return future.result()
+
+        # The first finisher failed - fall back to whichever is still running
+        other = backup if primary in done else primary
+        return other.result()
+
+    def stats(self) -> Dict:
+        return {'calls': self.calls, 'hedged': self.hedged, 'hedge_wins': self.hedge_wins}
+
+    def close(self):
+        """Stop the worker pool; losing duplicates still in flight are not waited for"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
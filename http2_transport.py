@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+HTTP/2 Transport
+httpx-based transport exposing the requests.Session.request() interface
+"""
+
+from typing import Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+class Http2Transport:
+    """Multiplexes concurrent requests over a few HTTP/2 connections
+
+    Responses are converted to ``requests.Response`` and transport errors to
+    ``requests`` exceptions, so the rest of the client (raise_for_status,
+    RequestException handlers, breakers) works unchanged.
+
+    Requires: pip install "httpx[http2]"
+    """
+
+    def __init__(self, max_connections: int = 4, timeout: float = 60.0):
+        try:
+            import httpx
+        except ImportError as e:
+            raise ImportError('HTTP/2 transport requires httpx: pip install "httpx[http2]"') from e
+
+        self._httpx = httpx
+        self._client = httpx.Client(
+            http2=True,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    def request(self, method: str, url: str, headers: Optional[Dict] = None, params: Optional[Dict] = None,
+                data=None, json=None, stream: bool = False) -> requests.Response:
+        # Bodies are always read eagerly; ``stream`` is accepted for interface parity
+        httpx = self._httpx
+        try:
+            response = self._client.request(method, url, headers=headers, params=params, data=data, json=json)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e)) from e
+
+        return self._to_requests_response(response)
+
+    @staticmethod
+    def _to_requests_response(response) -> requests.Response:
+        converted = requests.Response()
+        converted.status_code = response.status_code
+        converted.reason = response.reason_phrase
+        converted.headers = CaseInsensitiveDict(response.headers)
+        converted.url = str(response.url)
+        converted.encoding = response.encoding
+        converted._content = response.content
+        converted.elapsed = response.elapsed
+        return converted
+
+    def close(self):
+        self._client.close()
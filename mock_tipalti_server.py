@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Local Tipalti Stand-in Server
+Offline mock of the Tipalti REST and SOAP endpoints for benchmarking
+
+Endpoints:
+  POST   /connect/token                    OAuth client credentials token
+  GET    /api/v1/payees                    limit/offset or pageCursor, filters, totalCount, pageInfo
+  GET    /api/v1/payees/{id}               {"data": payee}
+  PATCH  /api/v1/payees/{id}               JSON object or JSON Patch operations
+  DELETE /v2/payees/{id}
+  POST   /v14/PayeeFunctions.asmx          SOAP: GetExtendedPayeeDetailList, GetExtendedPayeeDetails,
+                                           GetPayeeDetails, UpdateOrCreatePayeeInfo
+
+Usage:
+  python mock_tipalti_server.py --seed payees_backup_cursor_20250724.json --port 8080 \\
+      --latency-ms 80 --jitter-ms 40 --rate-limit 20 --error-rate 0.01
+  python mock_tipalti_server.py --synthetic 1000000 --latency-ms 80
+  TIPALTI_API_URL=http://127.0.0.1:8080 python backup_payees_with_cursor.py
+"""
+
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import escape
+
+from backup_io import load_backup_payees
+from profiling import maybe_profile
+
+
+SOAP_PATH = '/v14/PayeeFunctions.asmx'
+MAX_PAGE_SIZE = 1000
+
+
+class MockConfig:
+    """Latency, throttling and fault injection settings"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, rate_limit: Optional[float] = None,
+                 error_rate: float = 0.0, gzip_responses: bool = True, etags: bool = True, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.gzip_responses = gzip_responses
+        self.etags = etags
+        self.random = random.Random(seed)
+
+
+class MockTipaltiState:
+    """In-memory payee store shared by all handler threads"""
+
+    def __init__(self, payees: List[Dict], config: MockConfig):
+        self.config = config
+        self.payees = list(payees)
+        self.by_id = {payee.get('id'): payee for payee in self.payees}
+        self.by_ref_code = {str(payee.get('refCode')): payee for payee in self.payees if payee.get('refCode')}
+        self.request_counts: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self._version = 0
+        self._filter_cache: Dict[Tuple, List[Dict]] = {}
+
+        # Token bucket for 429 responses
+        self._tokens = float(config.rate_limit or 0)
+        self._tokens_updated = time.monotonic()
+
+    def count(self, label: str):
+        with self.lock:
+            self.request_counts[label] = self.request_counts.get(label, 0) + 1
+
+    def throttle(self) -> Optional[float]:
+        """Seconds to wait if the request exceeds the rate limit, else None"""
+        rate = self.config.rate_limit
+        if not rate:
+            return None
+        with self.lock:
+            now = time.monotonic()
+            self._tokens = min(rate, self._tokens + (now - self._tokens_updated) * rate)
+            self._tokens_updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            return (1 - self._tokens) / rate
+
+    def filtered(self, filters: Tuple) -> List[Dict]:
+        """Payees matching (status, country, refCode, modifiedSince), cached until the next write"""
+        with self.lock:
+            cached = self._filter_cache.get(filters)
+            if cached is not None:
+                return cached
+            version = self._version
+
+        status, country, ref_code, modified_since = filters
+        result = []
+        for payee in self.payees:
+            if status and payee.get('status') != status:
+                continue
+            if country and (payee.get('contactInformation') or {}).get('beneficiaryCountryCode') != country:
+                continue
+            if ref_code and str(payee.get('refCode')) != ref_code:
+                continue
+            if modified_since and (payee.get('lastUpdated') or '') < modified_since:
+                continue
+            result.append(payee)
+
+        with self.lock:
+            if version == self._version:
+                self._filter_cache[filters] = result
+        return result
+
+    def list_payees(self, query: Dict[str, List[str]]) -> Dict:
+        first = lambda key: (query.get(key) or [None])[0]
+
+        filters = (first('status'), first('beneficiaryCountryCode'), first('refCode'), first('modifiedSince'))
+        matches = self.filtered(filters)
+
+        limit = min(int(first('limit') or 100), MAX_PAGE_SIZE)
+        cursor = first('pageCursor')
+        offset = _decode_cursor(cursor) if cursor else int(first('offset') or 0)
+
+        page = matches[offset:offset + limit]
+        next_offset = offset + len(page)
+        return {
+            'items': page,
+            'totalCount': len(matches),
+            'pageInfo': {
+                'nextPageCursor': _encode_cursor(next_offset) if next_offset < len(matches) else None
+            }
+        }
+
+    def get(self, payee_id: str) -> Optional[Dict]:
+        return self.by_id.get(payee_id) or self.by_ref_code.get(payee_id)
+
+    def patch(self, payee_id: str, body) -> Optional[Dict]:
+        with self.lock:
+            payee = self.by_id.get(payee_id)
+            if payee is None:
+                return None
+
+            if isinstance(body, list):
+                # JSON Patch: only top-level replace/add are needed by the tools
+                for op in body:
+                    if op.get('op') in ('replace', 'add'):
+                        payee[op.get('path', '').lstrip('/')] = op.get('value')
+            elif isinstance(body, dict):
+                payee.update(body)
+
+            payee['lastUpdated'] = _now_iso()
+            self._changed()
+            return payee
+
+    def delete(self, payee_id: str) -> bool:
+        with self.lock:
+            payee = self.by_id.pop(payee_id, None)
+            if payee is None:
+                return False
+            self.payees.remove(payee)
+            self.by_ref_code.pop(str(payee.get('refCode')), None)
+            self._changed()
+            return True
+
+    def _changed(self):
+        self._version += 1
+        self._filter_cache.clear()
+
+
+def _encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"offset:{offset}".encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode().split(':', 1)[1])
+    except (ValueError, IndexError):
+        return 0
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+# SOAP helpers
+
+def _soap_envelope(action: str, result_xml: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<soap:Envelope xmlns:soap="http://www.w3.org/2003/05/soap-envelope">'
+        f'<soap:Body><{action}Response xmlns="http://Tipalti.org/">'
+        f'<{action}Result>{result_xml}</{action}Result>'
+        f'</{action}Response></soap:Body></soap:Envelope>'
+    )
+
+
+def _soap_fields(payee: Dict) -> Dict[str, str]:
+    """Flatten a REST payee into SOAP-style fields"""
+    contact = payee.get('contactInformation') or {}
+    first_name = contact.get('firstName', '')
+    last_name = contact.get('lastName', '')
+    return {
+        'Idap': str(payee.get('refCode') or payee.get('id', '')),
+        'FirstName': first_name,
+        'LastName': last_name,
+        'CompanyName': contact.get('companyName', ''),
+        'd': payee.get('name') or f"{first_name} {last_name}".strip(),
+        'email': contact.get('email', ''),
+        'Country': contact.get('beneficiaryCountryCode', ''),
+        'PaymentMethod': payee.get('paymentMethod', 'unknown'),
+        'Status': payee.get('status', ''),
+        'IsActive': 'true' if payee.get('status') == 'ACTIVE' else 'false'
+    }
+
+
+def _xml_fields(fields: Dict[str, str]) -> str:
+    return ''.join(f'<{key}>{escape(str(value))}</{key}>' for key, value in fields.items())
+
+
+class MockTipaltiHandler(BaseHTTPRequestHandler):
+    """Routes requests to the shared MockTipaltiState"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'MockTipalti/1.0'
+    # Headers and body go out in separate writes; Nagle + delayed ACK would add ~40ms per response
+    disable_nagle_algorithm = True
+
+    @property
+    def state(self) -> MockTipaltiState:
+        return self.server.state
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # Response helpers
+
+    def _send_body(self, status: int, body: bytes, content_type: str, extra_headers: Optional[Dict] = None):
+        config = self.state.config
+        headers = dict(extra_headers or {})
+
+        if config.etags and self.command == 'GET' and status == 200:
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            headers['ETag'] = etag
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+        if config.gzip_responses and len(body) > 1024 and 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            body = gzip.compress(body, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload, extra_headers: Optional[Dict] = None):
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self._send_body(status, body, 'application/json; charset=utf-8', extra_headers)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _simulate(self, label: str, inject_errors: bool = True) -> bool:
+        """Apply latency, rate limit and error injection; False if a response was already sent"""
+        self.state.count(label)
+        config = self.state.config
+
+        if config.latency_ms or config.jitter_ms:
+            delay = config.latency_ms + config.random.uniform(-config.jitter_ms, config.jitter_ms)
+            time.sleep(max(0.0, delay) / 1000)
+
+        retry_after = self.state.throttle()
+        if retry_after is not None:
+            self._send_json(429, {'error': 'Too Many Requests'},
+                            {'Retry-After': str(max(1, int(retry_after + 0.999)))})
+            return False
+
+        if inject_errors and config.error_rate and config.random.random() < config.error_rate:
+            self._send_json(500, {'error': 'Injected failure'})
+            return False
+
+        return True
+
+    def _authorized(self) -> bool:
+        if not (self.headers.get('Authorization') or '').startswith('Bearer '):
+            self._send_json(401, {'error': 'Missing bearer token'})
+            return False
+        return True
+
+    # Routing
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._read_body()
+
+        if path == '/connect/token':
+            if self._simulate('POST /connect/token', inject_errors=False):
+                self._send_json(200, {'access_token': 'mock-access-token', 'expires_in': 3600,
+                                      'token_type': 'Bearer'})
+            return
+
+        if path == SOAP_PATH:
+            self._handle_soap(body.decode('utf-8', errors='replace'))
+            return
+
+        self._send_json(404, {'error': f'No route for POST {path}'})
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        path = parsed.path
+
+        if path == '/api/v1/payees':
+            if self._simulate('GET /payees') and self._authorized():
+                self._send_json(200, self.state.list_payees(parse_qs(parsed.query)))
+            return
+
+        match = re.fullmatch(r'/api/v1/payees/([^/]+)', path)
+        if match:
+            if self._simulate('GET /payees/{id}') and self._authorized():
+                payee = self.state.get(match.group(1))
+                if payee is None:
+                    self._send_json(404, {'error': 'Payee not found'})
+                else:
+                    self._send_json(200, {'data': payee})
+            return
+
+        self._send_json(404, {'error': f'No route for GET {path}'})
+
+    def do_PATCH(self):
+        path = urlparse(self.path).path
+        match = re.fullmatch(r'/api/v1/payees/([^/]+)', path)
+        body = self._read_body()
+
+        if not match:
+            self._send_json(404, {'error': f'No route for PATCH {path}'})
+            return
+
+        if self._simulate('PATCH /payees/{id}') and self._authorized():
+            try:
+                patch = json.loads(body or b'{}')
+            except ValueError:
+                self._send_json(400, {'error': 'Invalid JSON body'})
+                return
+            payee = self.state.patch(match.group(1), patch)
+            if payee is None:
+                self._send_json(404, {'error': 'Payee not found'})
+            else:
+                self._send_json(200, payee)
+
+    def do_DELETE(self):
+        path = urlparse(self.path).path
+        match = re.fullmatch(r'/v2/payees/([^/]+)', path)
+
+        if not match:
+            self._send_json(404, {'error': f'No route for DELETE {path}'})
+            return
+
+        if self._simulate('DELETE /v2/payees/{id}') and self._authorized():
+            if self.state.delete(match.group(1)):
+                self._send_json(200, {'success': True})
+            else:
+                self._send_json(404, {'error': 'Payee not found'})
+
+    def _handle_soap(self, body: str):
+        # SOAP action comes from the Content-Type header: action="http://Tipalti.org/<Action>"
+        action_match = re.search(r'action="http://Tipalti\.org/([^"]+)"', self.headers.get('Content-Type') or '')
+        action = action_match.group(1) if action_match else ''
+
+        if not self._simulate(f'SOAP {action}'):
+            return
+
+        idap_match = re.search(r'<idap>([^<]*)</idap>', body)
+        idap = idap_match.group(1) if idap_match else ''
+
+        if action == 'GetExtendedPayeeDetailList':
+            result = ''.join(f'<PayeeInfo>{_xml_fields(_soap_fields(p))}</PayeeInfo>' for p in self.state.payees)
+        elif action in ('GetExtendedPayeeDetails', 'GetPayeeDetails'):
+            payee = self.state.get(idap)
+            if payee is None:
+                result = '<errorCode>PayeeUnknown</errorCode><errorMessage>Payee unknown</errorMessage>'
+            else:
+                result = _xml_fields(_soap_fields(payee))
+        elif action == 'UpdateOrCreatePayeeInfo':
+            payee = self.state.get(idap)
+            is_active = re.search(r'<isActive>([^<]*)</isActive>', body)
+            if payee is not None and is_active:
+                status = 'ACTIVE' if is_active.group(1).lower() == 'true' else 'SUSPENDED'
+                self.state.patch(payee.get('id'), {'status': status})
+            result = f'<success>{"true" if payee is not None else "false"}</success>'
+        else:
+            self._send_body(500, _soap_envelope('Fault', f'<faultstring>Unknown action {escape(action)}</faultstring>')
+                            .encode('utf-8'), 'application/soap+xml; charset=utf-8')
+            return
+
+        self._send_body(200, _soap_envelope(action, result).encode('utf-8'), 'application/soap+xml; charset=utf-8')
+
+
+class MockTipaltiServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding the mock state"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], state: MockTipaltiState, verbose: bool = False):
+        super().__init__(address, MockTipaltiHandler)
+        self.state = state
+        self.verbose = verbose
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_mock_server(payees: List[Dict], host: str = '127.0.0.1', port: int = 0,
+                      config: Optional[MockConfig] = None, verbose: bool = False) -> MockTipaltiServer:
+    """Start a mock server in a background thread (port 0 = pick a free port)"""
+    server = MockTipaltiServer((host, port), MockTipaltiState(payees, config or MockConfig()), verbose)
+    thread = threading.Thread(target=server.serve_forever, name='mock-tipalti', daemon=True)
+    thread.start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Tipalti stand-in server for offline benchmarking')
+    parser.add_argument('--seed', help='Backup file to load payees from (JSON or JSONL)')
+    parser.add_argument('--synthetic', type=int, help='Generate this many synthetic payees instead of --seed')
+    parser.add_argument('--synthetic-seed', type=int, default=42, help='Seed for --synthetic data')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Mean added latency per request')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Uniform +/- latency jitter')
+    parser.add_argument('--rate-limit', type=float, default=None, help='Requests/second before 429 responses')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of API requests failing with 500')
+    parser.add_argument('--no-gzip', action='store_true', help='Never compress responses')
+    parser.add_argument('--no-etags', action='store_true', help='Do not send ETags / answer 304')
+    parser.add_argument('--random-seed', type=int, default=0, help='Seed for jitter and error injection')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        from synthetic_payees import generate_payees
+        payees = generate_payees(args.synthetic, seed=args.synthetic_seed)
+    else:
+        payees = load_backup_payees(args.seed) if args.seed else []
+    config = MockConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_limit=args.rate_limit,
+        error_rate=args.error_rate,
+        gzip_responses=not args.no_gzip,
+        etags=not args.no_etags,
+        seed=args.random_seed
+    )
+
+    server = MockTipaltiServer((args.host, args.port), MockTipaltiState(payees, config), args.verbose)
+
+    print("🧪 MOCK TIPALTI SERVER")
+    print("=" * 50)
+    print(f"🌐 URL: {server.url}")
+    print(f"👥 Payees: {len(payees):,}")
+    print(f"⏱️ Latency: {args.latency_ms}ms ± {args.jitter_ms}ms")
+    print(f"🚦 Rate limit: {args.rate_limit or 'none'} req/s | ❌ Error rate: {args.error_rate:.1%}")
+    print(f"💡 export TIPALTI_API_URL={server.url}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️  Server stopped")
+        print(f"📊 Requests: {server.state.request_counts}")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    maybe_profile()
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Payee Details Cache
+In-memory LRU cache with TTL, optionally persisted to a JSON file
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds"""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0, path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._data: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return cached value or None if missing/expired
+
+        The stored object itself is returned, not a copy - callers handing
+        values out (e.g. TipaltiRestAPI details) must copy mutable values.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store value, evicting the least recently used entry when full"""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: str):
+        """Drop a single entry (write-through invalidation)"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for reporting"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / total) if total else 0.0
+        }
+
+    def save(self, path: Optional[str] = None):
+        """Persist non-expired entries to disk"""
+        path = path or self.path
+        if not path:
+            return
+
+        now = time.time()
+        with self._lock:
+            entries = {key: [expires_at, value] for key, (expires_at, value) in self._data.items()
+                       if expires_at >= now}
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, path: Optional[str] = None):
+        """Load persisted entries, skipping expired ones"""
+        path = path or self.path
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not load cache {path}: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, (expires_at, value) in entries.items():
+                if expires_at >= now:
+                    self._data[key] = (expires_at, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Payee Query Builder
+Pushes supported filters down to GET /payees and applies the rest locally
+"""
+
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+
+# Query parameter used for each filter when the server supports it
+FILTER_PARAMS = {
+    'status': 'status',
+    'country': 'beneficiaryCountryCode',
+    'ref_code': 'refCode',
+    'modified_since': 'modifiedSince'
+}
+
+# Country fields checked locally ("UA" payee = beneficiary or payment country UA)
+COUNTRY_FIELDS = ('beneficiaryCountryCode', 'paymentCountryCode')
+
+
+def parse_timestamp(value: str) -> Optional[datetime]:
+    """Parse an API ISO timestamp, ignoring timezone (API returns UTC)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+class PayeeQuery:
+    """Fluent filter builder for GET /payees
+
+    Filters listed in the client's ``pushdown_filters`` are sent to the API as
+    query parameters. Every filter is also compiled into a local predicate, so
+    results are correct even when the server ignores (or does not support) a
+    parameter - pushdown only reduces how much is downloaded.
+
+    A failed page is retried ``page_retries`` times. With ``skip_failed_pages``
+    it is then skipped and its offset recorded in ``skipped_pages`` (callers
+    must check it before trusting the result as complete); otherwise the
+    error is raised.
+
+    Example:
+        api.query().status('ACTIVE').country('UA').all()
+    """
+
+    # Consecutive skipped pages after which listing stops when totalCount is unknown
+    MAX_CONSECUTIVE_SKIPS = 3
+
+    def __init__(self, api, page_size: int = 100, page_delay: float = 0.0,
+                 page_retries: int = 2, skip_failed_pages: bool = False):
+        self.api = api
+        self.page_size = page_size
+        self.page_delay = page_delay
+        self.page_retries = page_retries
+        self.skip_failed_pages = skip_failed_pages
+        self.skipped_pages: List[int] = []
+        self._statuses: List[str] = []
+        self._countries: List[str] = []
+        self._country_fields: Tuple[str, ...] = COUNTRY_FIELDS
+        self._ref_codes: List[str] = []
+        self._modified_since: Optional[datetime] = None
+        self._predicates: List[Callable[[Dict], bool]] = []
+
+    # Filter builders
+
+    def status(self, *statuses: str) -> 'PayeeQuery':
+        """Keep payees with any of the given statuses"""
+        self._statuses.extend(statuses)
+        return self
+
+    def country(self, *codes: str, fields: Tuple[str, ...] = COUNTRY_FIELDS) -> 'PayeeQuery':
+        """Keep payees whose country (any of ``fields``) is one of ``codes``"""
+        self._countries.extend(codes)
+        self._country_fields = tuple(fields)
+        return self
+
+    def ref_code(self, *ref_codes: Union[str, int]) -> 'PayeeQuery':
+        """Keep payees with any of the given refCodes"""
+        self._ref_codes.extend(str(code) for code in ref_codes)
+        return self
+
+    def modified_since(self, since: datetime) -> 'PayeeQuery':
+        """Keep payees updated at or after ``since``"""
+        self._modified_since = since
+        return self
+
+    def where(self, predicate: Callable[[Dict], bool]) -> 'PayeeQuery':
+        """Add an arbitrary local predicate over the raw API item"""
+        self._predicates.append(predicate)
+        return self
+
+    # Compilation
+
+    def server_params(self) -> Dict:
+        """Query parameters for the filters the server can apply"""
+        pushdown = self.api.pushdown_filters
+        params = {}
+
+        # Only single-valued filters can be expressed as one query parameter
+        if 'status' in pushdown and len(self._statuses) == 1:
+            params[FILTER_PARAMS['status']] = self._statuses[0]
+        if ('country' in pushdown and len(self._countries) == 1
+                and self._country_fields == (FILTER_PARAMS['country'],)):
+            params[FILTER_PARAMS['country']] = self._countries[0]
+        if 'ref_code' in pushdown and len(self._ref_codes) == 1:
+            params[FILTER_PARAMS['ref_code']] = self._ref_codes[0]
+        if 'modified_since' in pushdown and self._modified_since:
+            params[FILTER_PARAMS['modified_since']] = self._modified_since.isoformat()
+
+        return params
+
+    def pushed_down(self) -> bool:
+        """True when the server applies every filter (no local filtering needed)"""
+        pushdown = self.api.pushdown_filters
+        return (not self._predicates
+                and (not self._statuses or ('status' in pushdown and len(self._statuses) == 1))
+                and (not self._countries or ('country' in pushdown and len(self._countries) == 1
+                                             and self._country_fields == (FILTER_PARAMS['country'],)))
+                and (not self._ref_codes or ('ref_code' in pushdown and len(self._ref_codes) == 1))
+                and (not self._modified_since or 'modified_since' in pushdown))
+
+    def compile(self) -> Callable[[Dict], bool]:
+        """Compile all filters into a single local predicate"""
+        checks: List[Callable[[Dict], bool]] = []
+
+        if self._statuses:
+            statuses = frozenset(self._statuses)
+            checks.append(lambda p: p.get('status') in statuses)
+
+        if self._countries:
+            countries = frozenset(self._countries)
+            fields = self._country_fields
+
+            def country_check(p: Dict) -> bool:
+                contact = p.get('contactInformation') or {}
+                return any(contact.get(field) in countries for field in fields)
+
+            checks.append(country_check)
+
+        if self._ref_codes:
+            ref_codes = frozenset(self._ref_codes)
+            checks.append(lambda p: str(p.get('refCode', '')) in ref_codes)
+
+        if self._modified_since:
+            since = self._modified_since.replace(tzinfo=None)
+
+            def modified_check(p: Dict) -> bool:
+                updated = parse_timestamp(p.get('lastUpdated', ''))
+                return updated is not None and updated >= since
+
+            checks.append(modified_check)
+
+        checks.extend(self._predicates)
+
+        if not checks:
+            return lambda p: True
+        if len(checks) == 1:
+            return checks[0]
+        return lambda p: all(check(p) for check in checks)
+
+    # Execution
+
+    def _fetch_page(self, params: Dict) -> Dict:
+        """GET one page, retrying with exponential backoff"""
+        for attempt in range(self.page_retries + 1):
+            try:
+                return self.api._make_request('GET', '/payees', params=dict(params))
+            except Exception:
+                if attempt == self.page_retries:
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
+
+    def pages(self) -> Iterator[Tuple[List[Dict], Dict]]:
+        """Yield (matching items, raw response) for every fetched page"""
+        params = self.server_params()
+        params['limit'] = self.page_size
+        params['offset'] = 0
+        predicate = self.compile()
+        self.skipped_pages = []
+        total = None
+        consecutive_skips = 0
+
+        while True:
+            try:
+                response = self._fetch_page(params)
+            except Exception as e:
+                if not self.skip_failed_pages:
+                    raise
+                self.skipped_pages.append(params['offset'])
+                consecutive_skips += 1
+                print(f"⚠️  Страница offset={params['offset']} пропущена после "
+                      f"{self.page_retries + 1} попыток: {e}")
+                params['offset'] += self.page_size
+                if total is not None:
+                    if params['offset'] >= total:
+                        break
+                elif consecutive_skips >= self.MAX_CONSECUTIVE_SKIPS:
+                    break
+                continue
+
+            consecutive_skips = 0
+            if response.get('totalCount') is not None:
+                total = int(response['totalCount'])
+            payees = response.get('items', [])
+
+            yield [p for p in payees if predicate(p)], response
+
+            if len(payees) < self.page_size:
+                break
+
+            params['offset'] += self.page_size
+
+            if self.page_delay:
+                time.sleep(self.page_delay)
+
+    def count(self) -> int:
+        """Number of matching payees from one limit=1 request (the response's totalCount)
+
+        Only exact when the server applies every filter: raises ValueError if a
+        filter is not pushed down, or if the returned sample item shows that
+        the server ignored one.
+        """
+        if not self.pushed_down():
+            raise ValueError("count() needs every filter pushed down to the server; use len(query.all())")
+
+        params = self.server_params()
+        params.update({'limit': 1, 'offset': 0})
+        response = self.api._make_request('GET', '/payees', params=params)
+
+        items = response.get('items', [])
+        if items and not self.compile()(items[0]):
+            raise ValueError(f"Server ignored a filter in {params}; totalCount is not filtered")
+        if response.get('totalCount') is None:
+            raise ValueError("Response has no totalCount")
+        return int(response['totalCount'])
+
+    def __iter__(self) -> Iterator[Dict]:
+        for matched, _ in self.pages():
+            yield from matched
+
+    def all(self) -> List[Dict]:
+        """Fetch every matching payee"""
+        return list(self)
+
+    @property
+    def complete(self) -> bool:
+        """False when the last listing skipped pages (results are partial)"""
+        return not self.skipped_pages
+
+    def first(self) -> Optional[Dict]:
+        """Fetch pages until the first match (stops downloading after it)"""
+        return next(iter(self), None)
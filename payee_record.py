@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Compact Payee Record
+Lightweight __slots__ model for payees from REST API /payees responses
+"""
+
+import sys
+from typing import Dict, Iterable, List, Optional
+
+
+def _intern(value: Optional[str], default: str) -> str:
+    """Intern short repeated codes (country, status) so all records share one string"""
+    if not value:
+        return default
+    return sys.intern(value)
+
+
+class PayeeRecord:
+    """Compact payee view over a raw REST API item
+
+    Country and status codes are interned, so thousands of records share the
+    same string objects. The raw JSON item is not kept unless requested with
+    ``keep_raw=True`` - holding it would keep every full API item alive for
+    as long as the records.
+    """
+
+    __slots__ = (
+        'id', 'ref_code', 'name', 'status', 'beneficiary_country',
+        'payment_country', 'email', 'first_name', 'last_name', 'company_name',
+        'created', 'last_updated', '_raw'
+    )
+
+    def __init__(self, id: str, ref_code: str = '', name: str = '', status: str = 'UNKNOWN',
+                 beneficiary_country: str = 'UNKNOWN', payment_country: str = '',
+                 email: str = 'No email', first_name: str = '', last_name: str = '',
+                 company_name: str = '', created: str = '', last_updated: str = '',
+                 raw: Optional[Dict] = None):
+        self.id = id
+        self.ref_code = ref_code
+        self.name = name
+        self.status = _intern(status, 'UNKNOWN')
+        self.beneficiary_country = _intern(beneficiary_country, 'UNKNOWN')
+        self.payment_country = _intern(payment_country, '')
+        self.email = email
+        self.first_name = first_name
+        self.last_name = last_name
+        self.company_name = company_name
+        self.created = created
+        self.last_updated = last_updated
+        self._raw = raw
+
+    @classmethod
+    def from_api(cls, payee: Dict, keep_raw: bool = False) -> 'PayeeRecord':
+        """Build a record from a /payees item (the raw dict is referenced only with keep_raw)"""
+        contact = payee.get('contactInformation') or {}
+        return cls(
+            id=payee.get('id', 'UNKNOWN'),
+            ref_code=payee.get('refCode', ''),
+            name=payee.get('name', 'No name'),
+            status=payee.get('status'),
+            beneficiary_country=contact.get('beneficiaryCountryCode'),
+            payment_country=contact.get('paymentCountryCode'),
+            email=contact.get('email', 'No email'),
+            first_name=contact.get('firstName', ''),
+            last_name=contact.get('lastName', ''),
+            company_name=contact.get('companyName', ''),
+            created=payee.get('created', ''),
+            last_updated=payee.get('lastUpdated', ''),
+            raw=payee if keep_raw else None
+        )
+
+    @property
+    def country(self) -> str:
+        """Beneficiary country code (the country used by all reports)"""
+        return self.beneficiary_country
+
+    @property
+    def raw(self) -> Dict:
+        """Original API item (empty dict unless built with keep_raw=True)"""
+        return self._raw if self._raw is not None else {}
+
+    @property
+    def contact(self) -> Dict:
+        """Raw contactInformation block (needs keep_raw=True)"""
+        return self.raw.get('contactInformation') or {}
+
+    def get(self, key: str, default=None):
+        """Read any raw API field that is not part of the compact record (needs keep_raw=True)"""
+        return self.raw.get(key, default)
+
+    def to_dict(self) -> Dict:
+        """Short summary dict for JSON reports"""
+        return {
+            'id': self.id,
+            'refCode': self.ref_code,
+            'name': self.name,
+            'status': self.status,
+            'country': self.beneficiary_country,
+            'payment_country': self.payment_country,
+            'email': self.email
+        }
+
+    def __repr__(self) -> str:
+        return f"PayeeRecord(id={self.id!r}, status={self.status!r}, country={self.beneficiary_country!r})"
+
+
+def records_from_api(payees: Iterable[Dict], keep_raw: bool = False) -> List[PayeeRecord]:
+    """Convert raw /payees items to compact records"""
+    return [PayeeRecord.from_api(payee, keep_raw) for payee in payees]
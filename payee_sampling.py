@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Stratified Page Sampling Estimator
+Оценка долей статусов/стран по случайной стратифицированной выборке страниц
+с доверительными интервалами - без полной выгрузки payees
+
+The /payees offset range is split into contiguous strata (offset order follows
+creation order, so neighbouring pages are alike). Random pages are drawn from
+every stratum; each page is one cluster. Proportions use the stratified
+ratio estimator with its linearized variance and finite population
+correction. Sampling runs in rounds: after a pilot the required number of
+pages for the error target is computed from the observed variance, and more
+pages are drawn until every tracked proportion is within the target.
+A sampled page that still fails after the query's retries is dropped from the
+sample (recorded in ``failed_pages``) instead of aborting the estimate.
+
+Usage:
+  python payee_sampling.py --error 0.02                     # status shares, +-2 p.p. at 95%
+  python payee_sampling.py --country RU --error 0.03        # completion of RU suspension
+  python payee_sampling.py --by country --error 0.01 --confidence 0.99
+"""
+
+import argparse
+import json
+import math
+import random
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from statistics import NormalDist
+from typing import Callable, Dict, List, Optional
+
+from tipalti_rest_api import TipaltiRestAPI
+import config_rest
+from profiling import maybe_profile
+
+
+GROUP_KEYS: Dict[str, Callable[[Dict], str]] = {
+    'status': lambda p: p.get('status') or 'UNKNOWN',
+    'country': lambda p: (p.get('contactInformation') or {}).get('beneficiaryCountryCode') or '--'
+}
+
+
+class PageSample:
+    """Sampled pages of one stratum: per page, domain size and per-category counts"""
+
+    def __init__(self, first_page: int, last_page: int):
+        self.first_page = first_page
+        self.last_page = last_page
+        self.sizes: List[int] = []
+        self.counts: List[Counter] = []
+        self.sampled = set()
+
+    @property
+    def pages(self) -> int:
+        return self.last_page - self.first_page + 1
+
+    def remaining(self) -> List[int]:
+        return [page for page in range(self.first_page, self.last_page + 1) if page not in self.sampled]
+
+
+class StratifiedPageSampler:
+    """Estimates category shares among payees (optionally within a country) from random pages"""
+
+    def __init__(self, api: TipaltiRestAPI, group_by: str = 'status', country: Optional[str] = None,
+                 page_size: int = 100, strata: int = 10, confidence: float = 0.95,
+                 seed: Optional[int] = None, concurrency: int = 8, page_retries: int = 2):
+        self.api = api
+        self.query = api.query(page_size=page_size, page_retries=page_retries)
+        self.group = GROUP_KEYS[group_by]
+        self.country = country
+        self.page_size = page_size
+        self.strata_count = strata
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf((1 + confidence) / 2)
+        self.rng = random.Random(seed)
+        self.concurrency = concurrency
+        self.total_payees = 0
+        self.strata: List[PageSample] = []
+        self.requests = 0
+        self.failed_pages: List[int] = []
+
+    # Sampling frame
+
+    def _prepare(self):
+        response = self.query._fetch_page({'limit': 1, 'offset': 0})
+        self.requests += 1
+        self.total_payees = int(response.get('totalCount') or 0)
+        total_pages = math.ceil(self.total_payees / self.page_size)
+        count = max(1, min(self.strata_count, total_pages))
+        bounds = [round(i * total_pages / count) for i in range(count + 1)]
+        self.strata = [PageSample(bounds[i], bounds[i + 1] - 1) for i in range(count) if bounds[i + 1] > bounds[i]]
+
+    @property
+    def total_pages(self) -> int:
+        return sum(stratum.pages for stratum in self.strata)
+
+    @property
+    def sampled_pages(self) -> int:
+        return sum(len(stratum.sampled) for stratum in self.strata)
+
+    def _in_domain(self, payee: Dict) -> bool:
+        if not self.country:
+            return True
+        return (payee.get('contactInformation') or {}).get('beneficiaryCountryCode') == self.country
+
+    @property
+    def observed_pages(self) -> int:
+        return sum(len(stratum.sizes) for stratum in self.strata)
+
+    def _fetch_page(self, page: int) -> Optional[Counter]:
+        """Category counts of one page, or None if it failed after all retries"""
+        params = {'limit': self.page_size, 'offset': page * self.page_size}
+        try:
+            response = self.query._fetch_page(params)
+        except Exception as e:
+            print(f"⚠️  Страница offset={params['offset']} пропущена после "
+                  f"{self.query.page_retries + 1} попыток: {e}")
+            return None
+        return Counter(self.group(payee) for payee in response.get('items', []) if self._in_domain(payee))
+
+    def _draw(self, allocation: Dict[int, int]):
+        """Fetch ``allocation[stratum index]`` new random pages per stratum"""
+        picks = []
+        for index, extra in allocation.items():
+            stratum = self.strata[index]
+            remaining = stratum.remaining()
+            for page in self.rng.sample(remaining, min(extra, len(remaining))):
+                stratum.sampled.add(page)
+                picks.append((stratum, page))
+
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as pool:
+            results = list(pool.map(lambda pick: self._fetch_page(pick[1]), picks))
+        self.requests += len(picks)
+
+        for (stratum, page), counts in zip(picks, results):
+            if counts is None:
+                # Stays in ``sampled`` so it is not redrawn; the estimate uses observed pages only
+                self.failed_pages.append(page)
+                continue
+            stratum.sizes.append(sum(counts.values()))
+            stratum.counts.append(counts)
+
+    def _allocate(self, pages: int) -> Dict[int, int]:
+        """Spread ``pages`` new pages over strata proportionally to their size"""
+        allocation = {}
+        for index, stratum in enumerate(self.strata):
+            share = math.ceil(pages * stratum.pages / self.total_pages)
+            allocation[index] = min(share, stratum.pages - len(stratum.sampled))
+        return allocation
+
+    # Estimation
+
+    def categories(self) -> List[str]:
+        found = set()
+        for stratum in self.strata:
+            for counts in stratum.counts:
+                found.update(counts)
+        return sorted(found)
+
+    def _domain_total(self) -> float:
+        return sum(stratum.pages * sum(stratum.sizes) / len(stratum.sizes)
+                   for stratum in self.strata if stratum.sizes)
+
+    def _estimate(self, category: str) -> Dict:
+        """Ratio estimate of the category's share, its variance and the per-page variance term"""
+        total_y = total_x = 0.0
+        for stratum in self.strata:
+            n = len(stratum.sizes)
+            if n:
+                total_y += stratum.pages * sum(c[category] for c in stratum.counts) / n
+                total_x += stratum.pages * sum(stratum.sizes) / n
+        ratio = total_y / total_x if total_x else 0.0
+
+        variance = 0.0
+        # N^2 * sum(W_h * S_h^2): variance of the ratio is this / X^2 * (1/n - 1/N)
+        unit_term = 0.0
+        for stratum in self.strata:
+            n = len(stratum.sizes)
+            if n < 2:
+                continue
+            residuals = [c[category] - ratio * size for c, size in zip(stratum.counts, stratum.sizes)]
+            mean = sum(residuals) / n
+            s2 = sum((r - mean) ** 2 for r in residuals) / (n - 1)
+            fpc = 1 - n / stratum.pages
+            variance += stratum.pages ** 2 * fpc * s2 / n
+            unit_term += self.total_pages * stratum.pages * s2
+        if total_x:
+            variance /= total_x ** 2
+            unit_term /= total_x ** 2
+
+        return {'ratio': ratio, 'total': total_y, 'variance': variance, 'unit_term': unit_term}
+
+    def _required_pages(self, error: float, estimates: List[Dict]) -> int:
+        """Pages needed (proportional allocation) for every half-width to be <= error"""
+        required = 0
+        for estimate in estimates:
+            if estimate['unit_term'] <= 0:
+                continue
+            pages = 1 / (error ** 2 / (self.z ** 2 * estimate['unit_term']) + 1 / self.total_pages)
+            required = max(required, math.ceil(pages))
+        return min(required, self.total_pages)
+
+    def run(self, error: float = 0.02, pilot_per_stratum: int = 2, max_pages: Optional[int] = None,
+            on_round: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Sample until every category share is within +-error (or the page budget runs out)"""
+        self._prepare()
+        if not self.strata:
+            return self.summary(error)
+
+        budget = min(max_pages or self.total_pages, self.total_pages)
+        self._draw({index: pilot_per_stratum for index in range(len(self.strata))})
+
+        while True:
+            summary = self.summary(error)
+            if on_round:
+                on_round(summary)
+            if summary['target_met'] or self.sampled_pages >= budget:
+                return summary
+
+            estimates = [self._estimate(category) for category in self.categories()]
+            required = self._required_pages(error, estimates)
+            # At least one more page per stratum per round, so rare categories get a chance to appear
+            extra = max(required - self.sampled_pages, len(self.strata))
+            extra = min(extra, budget - self.sampled_pages)
+            self._draw(self._allocate(extra))
+
+    def summary(self, error: Optional[float] = None) -> Dict:
+        estimates = {}
+        half_widths = []
+        for category in self.categories():
+            estimate = self._estimate(category)
+            half_width = self.z * math.sqrt(estimate['variance'])
+            count_half_width = half_width * self._domain_total()
+            half_widths.append(half_width)
+            estimates[category] = {
+                'proportion': round(estimate['ratio'], 4),
+                'ci_low': round(max(0.0, estimate['ratio'] - half_width), 4),
+                'ci_high': round(min(1.0, estimate['ratio'] + half_width), 4),
+                'half_width': round(half_width, 4),
+                'count': round(estimate['total']),
+                'count_ci': [max(0, round(estimate['total'] - count_half_width)),
+                             round(estimate['total'] + count_half_width)]
+            }
+
+        max_half_width = max(half_widths) if half_widths else 0.0
+        # No payee of the domain observed: nothing was estimated, so the target cannot be met
+        insufficient = not any(size for stratum in self.strata for size in stratum.sizes)
+        return {
+            'total_payees': self.total_payees,
+            'domain': self.country or 'ALL',
+            'domain_size_estimate': round(self._domain_total()) if self.observed_pages else 0,
+            'pages_total': self.total_pages,
+            'pages_sampled': self.sampled_pages,
+            'failed_pages': len(self.failed_pages),
+            'requests': self.requests,
+            'confidence': self.confidence,
+            'error_target': error,
+            'max_half_width': round(max_half_width, 4),
+            'insufficient_sample': insufficient,
+            'target_met': error is not None and self.observed_pages > 0 and not insufficient and (
+                max_half_width <= error or self.observed_pages >= self.total_pages),
+            'estimates': estimates
+        }
+
+
+def print_estimates(summary: Dict):
+    print(f"\n📈 ОЦЕНКА ({summary['domain']}, {summary['confidence']:.0%} доверительный интервал):")
+    print("-" * 60)
+    for category, estimate in sorted(summary['estimates'].items(), key=lambda x: -x[1]['proportion']):
+        low, high = estimate['count_ci']
+        print(f"  {category}: {estimate['proportion']:.1%} ± {estimate['half_width']:.1%} "
+              f"(~{estimate['count']:,} payees, {low:,}-{high:,})")
+    if summary['pages_total']:
+        print(f"\n📊 Страниц: {summary['pages_sampled']:,} из {summary['pages_total']:,} "
+              f"({summary['pages_sampled'] / summary['pages_total']:.1%}), запросов: {summary['requests']}")
+    print(f"👥 Оценка размера домена: ~{summary['domain_size_estimate']:,} из {summary['total_payees']:,} payees")
+    if summary['failed_pages']:
+        print(f"⚠️  Не удалось загрузить страниц: {summary['failed_pages']} (исключены из выборки)")
+    if summary['insufficient_sample']:
+        status = '⚠️ недостаточно данных (в выборке нет payees домена)'
+    elif summary['max_half_width'] <= summary['error_target']:
+        status = '✅ достигнута'
+    elif summary['target_met']:
+        status = '✅ полная выборка'
+    else:
+        status = '⚠️ не достигнута (исчерпан бюджет страниц)'
+    print(f"🎯 Точность ±{summary['error_target']:.1%}: {status}, макс. ±{summary['max_half_width']:.2%}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Estimate payee status/country shares from sampled pages')
+    parser.add_argument('--by', choices=sorted(GROUP_KEYS), default='status', help='Category to estimate')
+    parser.add_argument('--country', type=str.upper, help='Only payees of this country (e.g. RU)')
+    parser.add_argument('--error', type=float, default=0.02, help='Target CI half-width (0.02 = ±2 p.p.)')
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--strata', type=int, default=10)
+    parser.add_argument('--max-pages', type=int, help='Page budget')
+    parser.add_argument('--seed', type=int, help='Random seed (reproducible sample)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--page-retries', type=int, default=2, help='Retries per failed page')
+    parser.add_argument('--output', help='Save the estimate as JSON')
+    args = parser.parse_args(argv)
+
+    print(f"🎲 ВЫБОРОЧНАЯ ОЦЕНКА PAYEES - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 60)
+
+    client_id, client_secret, is_sandbox = config_rest.get_validated_config()
+    api = TipaltiRestAPI(client_id, client_secret, is_sandbox)
+    sampler = StratifiedPageSampler(api, args.by, args.country, args.page_size, args.strata,
+                                    args.confidence, args.seed, args.concurrency,
+                                    args.page_retries)
+
+    def on_round(summary: Dict):
+        print(f"  🔄 {summary['pages_sampled']:,} стр. | макс. ±{summary['max_half_width']:.2%}")
+
+    summary = sampler.run(args.error, max_pages=args.max_pages, on_round=on_round)
+    api.close()
+    print_estimates(summary)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        print(f"💾 Сохранено: {args.output}")
+    return summary
+
+
+if __name__ == "__main__":
+    maybe_profile()
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n⏹️  Прервано пользователем")
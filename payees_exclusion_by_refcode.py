@@ -7,11 +7,13 @@
 """
 
 from tipalti_rest_api import TipaltiRestAPI
+from payee_record import PayeeRecord
 import config_rest
 from datetime import datetime
 import csv
 import json
 import time
+from profiling import maybe_profile
 
 # Список refCode для исключения (из сообщения пользователя)
 EXCLUDED_REFCODES = [
@@ -71,29 +73,8 @@ def get_all_payees_comprehensive(api):
             else:
                 empty_pages = 0  # Сбрасываем счетчик пустых страниц
             
-            # Обработать каждого payee
-            for payee in payees:
-                payee_id = payee.get('id', '')
-                ref_code = payee.get('refCode', '')
-                contact = payee.get('contactInformation', {})
-                
-                # Извлечь детальную информацию
-                payee_info = {
-                    'id': payee_id,
-                    'refCode': ref_code,
-                    'status': payee.get('status', ''),
-                    'name': payee.get('name', 'No name'),
-                    'email': contact.get('email', ''),
-                    'firstName': contact.get('firstName', ''),
-                    'lastName': contact.get('lastName', ''),
-                    'companyName': contact.get('companyName', ''),
-                    'beneficiaryCountryCode': contact.get('beneficiaryCountryCode', ''),
-                    'paymentCountryCode': contact.get('paymentCountryCode', ''),
-                    'created': payee.get('created', ''),
-                    'lastUpdated': payee.get('lastUpdated', '')
-                }
-                
-                all_payees.append(payee_info)
+            # Обработать каждого payee (компактная запись без копирования полей)
+            all_payees.extend(PayeeRecord.from_api(payee) for payee in payees)
             
             # Показать прогресс
             if total_count > 0:
@@ -131,7 +112,7 @@ def get_all_payees_comprehensive(api):
     print(f"\n✅ Загрузка завершена! Получено {len(all_payees)} payees")
     
     # Показать статистику по refCode
-    refcodes = [p['refCode'] for p in all_payees if p['refCode']]
+    refcodes = [p.ref_code for p in all_payees if p.ref_code]
     if refcodes:
         refcodes_int = []
         for rc in refcodes:
@@ -157,7 +138,7 @@ def check_refcodes_presence(all_payees, excluded_refcodes):
     payees_by_refcode = {}
     
     for payee in all_payees:
-        ref_code = payee.get('refCode', '')
+        ref_code = payee.ref_code
         if ref_code:
             try:
                 ref_code_int = int(ref_code)
@@ -180,8 +161,8 @@ def check_refcodes_presence(all_payees, excluded_refcodes):
             payee = payees_by_refcode[excluded_refcode]
             found_refcodes.append(excluded_refcode)
             found_payees.append(payee)
-            email_display = (payee['email'][:40] + "...") if len(payee['email']) > 40 else payee['email']
-            print(f"  ✅ {excluded_refcode:5d} | {email_display:<43} | {payee['status']}")
+            email_display = (payee.email[:40] + "...") if len(payee.email) > 40 else payee.email
+            print(f"  ✅ {excluded_refcode:5d} | {email_display:<43} | {payee.status}")
         else:
             missing_refcodes.append(excluded_refcode)
             print(f"  ❌ {excluded_refcode:5d} | НЕ НАЙДЕН в системе")
@@ -218,7 +199,7 @@ def create_exclusion_csv_by_refcode(all_payees, excluded_refcodes):
     excluded_payees = []
     
     for payee in all_payees:
-        ref_code = payee.get('refCode', '')
+        ref_code = payee.ref_code
         
         should_exclude = False
         if ref_code:
@@ -253,10 +234,10 @@ def create_exclusion_csv_by_refcode(all_payees, excluded_refcodes):
         
         for payee in included_payees:
             writer.writerow([
-                payee['id'], payee['refCode'], payee['status'], payee['name'],
-                payee['email'], payee['firstName'], payee['lastName'], payee['companyName'],
-                payee['beneficiaryCountryCode'], payee['paymentCountryCode'],
-                payee['created'], payee['lastUpdated']
+                payee.id, payee.ref_code, payee.status, payee.name,
+                payee.email, payee.first_name, payee.last_name, payee.company_name,
+                payee.beneficiary_country, payee.payment_country,
+                payee.created, payee.last_updated
             ])
     
     # 2. Только ID
@@ -265,7 +246,7 @@ def create_exclusion_csv_by_refcode(all_payees, excluded_refcodes):
         writer = csv.writer(f)
         writer.writerow(['PayeeID'])
         for payee in included_payees:
-            writer.writerow([payee['id']])
+            writer.writerow([payee.id])
     
     # 3. Только refCode
     refcodes_filename = f"payee_refcodes_excluding_specified_{timestamp}.csv"
@@ -273,8 +254,8 @@ def create_exclusion_csv_by_refcode(all_payees, excluded_refcodes):
         writer = csv.writer(f)
         writer.writerow(['RefCode'])
         for payee in included_payees:
-            if payee['refCode']:
-                writer.writerow([payee['refCode']])
+            if payee.ref_code:
+                writer.writerow([payee.ref_code])
     
     # 4. Исключенные payees (для справки)
     excluded_filename = f"excluded_payees_by_refcode_{timestamp}.csv"
@@ -287,10 +268,10 @@ def create_exclusion_csv_by_refcode(all_payees, excluded_refcodes):
         
         for payee in excluded_payees:
             writer.writerow([
-                payee['id'], payee['refCode'], payee['status'], payee['name'],
-                payee['email'], payee['firstName'], payee['lastName'], payee['companyName'],
-                payee['beneficiaryCountryCode'], payee['paymentCountryCode'],
-                payee['created'], payee['lastUpdated']
+                payee.id, payee.ref_code, payee.status, payee.name,
+                payee.email, payee.first_name, payee.last_name, payee.company_name,
+                payee.beneficiary_country, payee.payment_country,
+                payee.created, payee.last_updated
             ])
     
     print(f"\n💾 Созданные файлы:")
@@ -364,4 +345,5 @@ def main():
         traceback.print_exc()
 
 if __name__ == "__main__":
+    maybe_profile()
     main() 
\ No newline at end of file
@@ -12,6 +12,7 @@ from datetime import datetime
 import csv
 import json
 import time
+from profiling import maybe_profile
 
 # Список ID для исключения (из сообщения пользователя)
 EXCLUDED_PAYEE_IDS = [
@@ -349,4 +350,5 @@ def main():
         traceback.print_exc()
 
 if __name__ == "__main__":
+    maybe_profile()
     main() 
\ No newline at end of file
@@ -5,11 +5,18 @@
 """
 
 from tipalti_rest_api import TipaltiRestAPI
+from circuit_breaker import CircuitOpenError
+from payee_record import PayeeRecord
 import config_rest
 from datetime import datetime
 from collections import defaultdict
 import json
 import time
+from profiling import maybe_profile
+from event_log import ProgressLine, get_event_logger
+
+# Паузы подряд на открытом circuit breaker до прерывания загрузки
+MAX_CIRCUIT_WAITS = 5
 
 def get_all_payees_with_progress(api):
     """Получить всех payees з прогрессом загрузки"""
@@ -21,9 +28,12 @@ def get_all_payees_with_progress(api):
     
     print("📥 Загружаем всех payees...")
     
+    # Постраничные события - в JSONL лог, в терминале - строка прогресса (total известен после 1-й страницы)
+    log = get_event_logger()
+    progress = ProgressLine(label='Загрузка payees')
+    circuit_waits = 0
+    
     while True:
-        print(f"  📄 Страница {page} (offset: {offset})...", end=" ")
-        
         try:
             # Параметры для текущей страницы
             params = {
@@ -37,29 +47,28 @@ def get_all_payees_with_progress(api):
             # Получить payees с текущей страницы
             payees = response.get('items', [])
             total_count = response.get('totalCount', 0)
+            progress.total = total_count or None
             
-            print(f"получено {len(payees)} payees (всего в системе: {total_count})")
+            log.info('page_loaded', page=page, offset=offset, items=len(payees), total_count=total_count)
+            circuit_waits = 0
             
             if not payees:
                 # Нет больше данных
-                print("  ✅ Загрузка завершена - больше нет данных")
+                log.info('listing_finished', reason='empty_page', pages=page)
                 break
             
             # Добавить к общему списку
             all_payees.extend(payees)
-            
-            # Показать прогресс
-            progress = (len(all_payees) / total_count) * 100 if total_count > 0 else 0
-            print(f"  📊 Прогресс: {len(all_payees)}/{total_count} ({progress:.1f}%)")
+            progress.update(len(payees))
             
             # Если получили меньше чем лимит, то это последняя страница
             if len(payees) < limit:
-                print("  ✅ Загрузка завершена - получена последняя страница")
+                log.info('listing_finished', reason='last_page', pages=page)
                 break
             
             # Если достигли общего количества
             if len(all_payees) >= total_count:
-                print("  ✅ Загрузка завершена - получены все payees")
+                log.info('listing_finished', reason='total_reached', pages=page)
                 break
             
             # Подготовка к следующей странице
@@ -69,14 +78,33 @@ def get_all_payees_with_progress(api):
             # Небольшая пауза, чтобы не перегружать API
             time.sleep(0.1)
             
+        except CircuitOpenError as e:
+            # Tipalti деградировал - ждем восстановления и повторяем ту же страницу (ограниченно)
+            circuit_waits += 1
+            if circuit_waits > MAX_CIRCUIT_WAITS:
+                log.error('listing_aborted', reason='circuit_open', page=page, offset=offset, waits=circuit_waits - 1)
+                progress.note(f"  ❌ Tipalti недоступен после {MAX_CIRCUIT_WAITS} пауз - загрузка прервана на странице {page}")
+                progress.error()
+                break
+            log.warning('circuit_open_pause', page=page, pause_seconds=round(e.retry_after, 1), attempt=circuit_waits)
+            progress.note(f"  ⛔ {e}")
+            time.sleep(e.retry_after)
+            continue
+            
         except Exception as e:
-            print(f"❌ Ошибка на странице {page}: {e}")
+            log.error('page_failed', page=page, offset=offset, error=str(e))
+            progress.note(f"  ❌ Ошибка на странице {page}: {e}")
+            progress.error()
             # Попробуем продолжить со следующей страницы
             offset += limit
             page += 1
             continue
     
-    print(f"\n✅ Загрузка завершена! Получено {len(all_payees)} payees")
+    progress.close()
+    if circuit_waits > MAX_CIRCUIT_WAITS:
+        print(f"\n⚠️ Загрузка НЕПОЛНАЯ! Получено {len(all_payees)} payees")
+    else:
+        print(f"\n✅ Загрузка завершена! Получено {len(all_payees)} payees")
     return all_payees
 
 def analyze_payees_comprehensive(all_payees):
@@ -97,45 +125,28 @@ def analyze_payees_comprehensive(all_payees):
     other_status_payees = []
     
     # Анализ каждого payee
-    for i, payee in enumerate(all_payees):
-        if (i + 1) % 500 == 0:
-            print(f"  📈 Обработано {i + 1}/{len(all_payees)} payees...")
-        
-        # Основные поля
-        payee_id = payee.get('id', 'UNKNOWN')
-        status = payee.get('status', 'UNKNOWN')
-        name = payee.get('name', 'No name')
-        
-        # Контактная информация
-        contact = payee.get('contactInformation', {})
-        country = contact.get('beneficiaryCountryCode', 'UNKNOWN')
-        email = contact.get('email', 'No email')
+    for raw_payee in all_payees:
+        # Компактная запись (коды стран/статусов интернированы, raw не копируется)
+        payee = PayeeRecord.from_api(raw_payee)
+        status = payee.status
+        country = payee.country
         
         # Статистика
         status_stats[status] += 1
         country_stats[country] += 1
         country_status_stats[country][status] += 1
         
-        # Подробная информация для ключевых групп
-        payee_info = {
-            'id': payee_id,
-            'name': name,
-            'status': status,
-            'country': country,
-            'email': email
-        }
-        
         # Российские payees
         if country == 'RU':
-            ru_payees.append(payee_info)
+            ru_payees.append(payee)
         
         # По статусам
         if status == 'ACTIVE':
-            active_payees.append(payee_info)
+            active_payees.append(payee)
         elif status == 'SUSPENDED':
-            suspended_payees.append(payee_info)
+            suspended_payees.append(payee)
         else:
-            other_status_payees.append(payee_info)
+            other_status_payees.append(payee)
     
     return {
         'status_stats': status_stats,
@@ -190,13 +201,13 @@ def print_comprehensive_report(analysis, total_payees):
         # Показать примеры разных статусов
         ru_by_status = defaultdict(list)
         for payee in ru_payees:
-            ru_by_status[payee['status']].append(payee)
+            ru_by_status[payee.status].append(payee)
         
         print(f"\n  📋 Примеры RU payees по статусам:")
         for status, payees_list in ru_by_status.items():
             print(f"    {status} ({len(payees_list)} шт.):")
             for payee in payees_list[:3]:  # Показать первые 3
-                print(f"      - {payee['name']} - {payee['email']}")
+                print(f"      - {payee.name} - {payee.email}")
     
     # Краткая сводка по активным
     if active_payees:
@@ -204,7 +215,7 @@ def print_comprehensive_report(analysis, total_payees):
         print("-" * 50)
         active_by_country = defaultdict(int)
         for payee in active_payees:
-            active_by_country[payee['country']] += 1
+            active_by_country[payee.country] += 1
         
         for country, count in sorted(active_by_country.items(), key=lambda x: x[1], reverse=True)[:10]:
             print(f"  {country}: {count:,}")
@@ -257,8 +268,8 @@ def main():
             'active_payees_count': len(analysis['active_payees']),
             'suspended_payees_count': len(analysis['suspended_payees']),
             # Сохранить только краткую информацию для экономии места
-            'sample_ru_payees': analysis['ru_payees'][:50],  # Первые 50
-            'sample_active_payees': analysis['active_payees'][:50],
+            'sample_ru_payees': [p.to_dict() for p in analysis['ru_payees'][:50]],  # Первые 50
+            'sample_active_payees': [p.to_dict() for p in analysis['active_payees'][:50]],
         }
         
         with open(report_filename, 'w', encoding='utf-8') as f:
@@ -275,8 +286,8 @@ def main():
         print(f"  🇷🇺 Российских: {len(analysis['ru_payees']):,}")
         
         if analysis['ru_payees']:
-            ru_suspended = sum(1 for p in analysis['ru_payees'] if p['status'] == 'SUSPENDED')
-            ru_active = sum(1 for p in analysis['ru_payees'] if p['status'] == 'ACTIVE')
+            ru_suspended = sum(1 for p in analysis['ru_payees'] if p.status == 'SUSPENDED')
+            ru_active = sum(1 for p in analysis['ru_payees'] if p.status == 'ACTIVE')
             completion = (ru_suspended / len(analysis['ru_payees'])) * 100
             
             print(f"  🇷🇺 Активных RU: {ru_active:,}")
@@ -291,4 +302,5 @@ def main():
         traceback.print_exc()
 
 if __name__ == "__main__":
+    maybe_profile()
     main() 
\ No newline at end of file
@@ -2,13 +2,27 @@
 """
 Полный отчет по статусам Payees
 Статистика по всем payees в системе Tipalti
+
+--counts builds the status/country histograms from parallel limit=1 probes
+(totalCount of each filtered query) instead of downloading every payee:
+  python payees_status_report.py --counts
+  python payees_status_report.py --counts --pushdown status,country --countries RU,UA,BR --focus RU
 """
 
 from tipalti_rest_api import TipaltiRestAPI
 import config_rest
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from collections import defaultdict
 import json
+from typing import List, Optional
+from backup_io import find_latest_countries_csv, read_countries_csv
+from profiling import maybe_profile
+
+
+# Statuses probed by --counts (anything else shows up as OTHER)
+COUNT_STATUSES = ('ACTIVE', 'SUSPENDED', 'BLOCKED_BY_TIPALTI', 'BLOCKED', 'INACTIVE')
 
 def get_full_payees_statistics():
     """Получить полную статистику по всем payees"""
@@ -126,13 +140,138 @@ def get_full_payees_statistics():
         print(f"❌ Ошибка при получении статистики: {e}")
         return None
 
+def get_count_statistics(api: TipaltiRestAPI, statuses=COUNT_STATUSES, countries=(), focus: str = None,
+                         concurrency: int = 8) -> dict:
+    """Status/country histograms from limit=1 totalCount probes, sent in parallel
+
+    Country probes need the 'country' filter pushed down; without it only the
+    status histogram is built.
+    """
+    probes = [('total', None, None)] + [('status', status, None) for status in statuses]
+    if 'country' in api.pushdown_filters:
+        probes += [('country', None, code) for code in countries if code]
+        if focus:
+            probes += [('focus', status, focus) for status in statuses]
+
+    def probe(spec):
+        kind, status, country = spec
+        query = api.query()
+        if status:
+            query = query.status(status)
+        if country:
+            query = query.country(country, fields=('beneficiaryCountryCode',))
+        return query.count()
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        counts = list(pool.map(probe, probes))
+
+    total = counts[0]
+    result = {'total': total, 'status_statistics': {}, 'country_statistics': {},
+              'country_status_breakdown': {}, 'requests': len(probes)}
+    for (kind, status, country), count in zip(probes[1:], counts[1:]):
+        if not count:
+            continue
+        if kind == 'status':
+            result['status_statistics'][status] = count
+        elif kind == 'country':
+            result['country_statistics'][country] = count
+        else:
+            result['country_status_breakdown'].setdefault(country, {})[status] = count
+
+    other = total - sum(result['status_statistics'].values())
+    if other > 0:
+        result['status_statistics']['OTHER'] = other
+    return result
+
+
+def get_count_only_statistics(countries=(), focus: str = None, pushdown=('status',), concurrency: int = 8):
+    """Вывести статистику по счетчикам (без загрузки payees)"""
+    
+    print(f"📊 СТАТИСТИКА PAYEES ПО СЧЕТЧИКАМ - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 60)
+    
+    try:
+        client_id, client_secret, is_sandbox = config_rest.get_validated_config()
+        api = TipaltiRestAPI(client_id, client_secret, is_sandbox, pushdown_filters=pushdown)
+        
+        if (countries or focus) and 'country' not in pushdown:
+            print("⚠️ Фильтр по стране не передается серверу (--pushdown status,country) - только статусы")
+        
+        stats = get_count_statistics(api, countries=countries, focus=focus, concurrency=concurrency)
+        total = stats['total']
+        
+        print(f"🌐 Среда: {'Sandbox' if is_sandbox else 'Production'}")
+        print(f"📡 Запросов: {stats['requests']} (limit=1)")
+        print(f"👥 Всего payees: {total}")
+        
+        print("\n📈 СТАТУСЫ:")
+        print("-" * 40)
+        for status, count in sorted(stats['status_statistics'].items()):
+            print(f"  {status}: {count} ({count / total * 100 if total else 0:.1f}%)")
+        
+        if stats['country_statistics']:
+            print("\n🌍 СТРАНЫ:")
+            print("-" * 40)
+            for country, count in sorted(stats['country_statistics'].items(), key=lambda x: x[1], reverse=True):
+                print(f"  {country}: {count} ({count / total * 100 if total else 0:.1f}%)")
+        
+        for country, statuses in stats['country_status_breakdown'].items():
+            country_total = sum(statuses.values())
+            print(f"\n🎯 {country} ПО СТАТУСАМ:")
+            print("-" * 40)
+            for status, count in sorted(statuses.items()):
+                print(f"  {status}: {count} ({count / country_total * 100:.1f}%)")
+        
+        api.close()
+        return stats
+        
+    except Exception as e:
+        print(f"❌ Ошибка при получении статистики: {e}")
+        return None
+
+def resolve_count_countries(countries_arg: str, pushdown) -> Optional[List[str]]:
+    """Countries for the --counts histogram: --countries, else the latest countries_list CSV
+
+    Returns [] without country pushdown (statuses only) and None, after an
+    error message, when no country list is available.
+    """
+    countries = [code.strip().upper() for code in (countries_arg or '').split(',') if code.strip()]
+    if countries or 'country' not in pushdown:
+        return countries
+
+    path = find_latest_countries_csv()
+    if not path:
+        print("❌ Не найден countries_list_*.csv - укажите страны через --countries (например RU,UA,BR)")
+        return None
+    print(f"📁 Страны из {path}")
+    return [code for code, _ in read_countries_csv(path) if code]
+
 def main():
     """Основная функция"""
     
+    parser = argparse.ArgumentParser(description='Payee status/country statistics')
+    parser.add_argument('--counts', action='store_true',
+                        help='Counts only, from parallel limit=1 totalCount probes (no full download)')
+    parser.add_argument('--countries', default='',
+                        help='Comma-separated country codes to count (--counts; default: latest countries_list CSV)')
+    parser.add_argument('--focus', type=str.upper, help='Country to break down by status (--counts)')
+    parser.add_argument('--pushdown', default='status',
+                        help='Comma-separated filters the server applies (status,country)')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+    
     try:
         # Проверить конфигурацию
         config_rest.validate_config()
         
+        if args.counts:
+            pushdown = tuple(name.strip() for name in args.pushdown.split(',') if name.strip())
+            countries = resolve_count_countries(args.countries, pushdown)
+            if countries is None:
+                return
+            get_count_only_statistics(countries, args.focus, pushdown, args.concurrency)
+            return
+        
         # Получить статистику
         stats = get_full_payees_statistics()
         
@@ -159,4 +298,5 @@ def main():
         print(f"❌ Ошибка: {e}")
 
 if __name__ == "__main__":
+    maybe_profile()
     main() 
\ No newline at end of file
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Profiling Switch
+cProfile, a low-overhead sampling profiler and tracemalloc for any entry-point
+script, enabled by an environment variable or a --profile flag
+
+Usage:
+  TIPALTI_PROFILE=cprofile python backup_payees_with_cursor.py
+  TIPALTI_PROFILE=sampling,memory python block_ua_payees.py
+  python payees_full_status_report.py --profile              # cprofile + memory
+  python payees_full_status_report.py --profile=sampling
+
+Modes (comma-separated):
+  cprofile  deterministic profile of the main thread     -> profiles/<script>_<ts>.prof
+  sampling  stack samples of all threads                 -> profiles/<script>_<ts>.collapsed
+  memory    tracemalloc snapshot + top-N allocations     -> profiles/<script>_<ts>.tracemalloc
+
+Settings: TIPALTI_PROFILE_DIR (default profiles), TIPALTI_PROFILE_TOP (20),
+TIPALTI_PROFILE_INTERVAL (sampling period in seconds, 0.005).
+
+.prof files open with snakeviz / pstats; .collapsed files with flamegraph.pl
+or speedscope.
+"""
+
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+
+
+MODES = ('cprofile', 'sampling', 'memory')
+DEFAULT_FLAG_MODES = 'cprofile,memory'
+
+_active = False
+
+
+class SamplingProfiler:
+    """Samples the stacks of every thread at a fixed interval
+
+    Unlike cProfile it sees worker threads (concurrent fetches, hedging) and
+    adds almost no overhead to the profiled code.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+                self.samples += 1
+
+    def write_collapsed(self, path: str):
+        """Brendan Gregg's collapsed-stack format (one 'a;b;c count' line per stack)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+    def top(self, limit: int) -> Tuple[List[Tuple[str, int]], List[Tuple[str, int]]]:
+        """(self samples, total samples) per function, most frequent first"""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for function in set(stack):
+                total[function] += count
+        return own.most_common(limit), total.most_common(limit)
+
+
+class ProfileSession:
+    """One profiled run; the report is written when the process exits
+
+    cProfile, pstats and tracemalloc are imported only when a session is
+    created, so scripts that are not profiled pay nothing at startup.
+    """
+
+    def __init__(self, modes: Set[str], name: str, output_dir: str = 'profiles', top: int = 20,
+                 interval: float = 0.005):
+        self.modes = modes
+        self.name = name
+        self.output_dir = output_dir
+        self.top = top
+        self.started = time.perf_counter()
+        self.prefix = os.path.join(output_dir, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+
+        if 'cprofile' in modes:
+            import cProfile
+            self.cprofile = cProfile.Profile()
+        else:
+            self.cprofile = None
+        self.sampler = SamplingProfiler(interval) if 'sampling' in modes else None
+
+    def start(self):
+        if 'memory' in self.modes:
+            import tracemalloc
+            tracemalloc.start()
+        if self.sampler:
+            self.sampler.start()
+        if self.cprofile:
+            self.cprofile.enable()
+
+    def stop(self):
+        if self.cprofile:
+            self.cprofile.disable()
+        if self.sampler:
+            self.sampler.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        elapsed = time.perf_counter() - self.started
+
+        print()
+        print(f"🔬 ПРОФИЛИРОВАНИЕ: {self.name} ({elapsed:.1f}с, режимы: {', '.join(sorted(self.modes))})")
+        print("=" * 60)
+
+        if self.cprofile:
+            self._report_cprofile()
+        if self.sampler:
+            self._report_sampling()
+        if 'memory' in self.modes:
+            self._report_memory()
+
+    def _report_cprofile(self):
+        import io
+        import pstats
+
+        path = f"{self.prefix}.prof"
+        self.cprofile.dump_stats(path)
+
+        buffer = io.StringIO()
+        pstats.Stats(self.cprofile, stream=buffer).sort_stats('cumulative').print_stats(self.top)
+        print(f"⏱️ cProfile (top {self.top} по cumulative):")
+        lines = buffer.getvalue().splitlines()
+        start = next((i for i, line in enumerate(lines) if line.lstrip().startswith('ncalls')), 0)
+        for line in lines[start:]:
+            if line.strip():
+                print(f"  {line}")
+        print(f"💾 {path}")
+
+    def _report_sampling(self):
+        path = f"{self.prefix}.collapsed"
+        self.sampler.write_collapsed(path)
+
+        samples = max(self.sampler.samples, 1)
+        own, total = self.sampler.top(self.top)
+        print(f"📈 Сэмплы: {self.sampler.samples:,} (все потоки, шаг {self.sampler.interval * 1000:.0f}мс)")
+        print(f"  {'self':>6} {'total':>6}  функция")
+        total_by_function = dict(total)
+        for function, count in own:
+            print(f"  {count / samples:>6.1%} {total_by_function.get(function, count) / samples:>6.1%}  {function}")
+        print(f"💾 {path}")
+
+    def _report_memory(self):
+        import tracemalloc
+
+        path = f"{self.prefix}.tracemalloc"
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        snapshot.dump(path)
+
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '*cProfile.py'),
+            tracemalloc.Filter(False, '*pstats.py'),
+            tracemalloc.Filter(False, __file__),
+        ))
+        print(f"🧠 Память: сейчас {current / 1024 / 1024:.1f} MB, пик {peak / 1024 / 1024:.1f} MB")
+        print(f"  Top {self.top} аллокаций (по строкам):")
+        for stat in snapshot.statistics('lineno')[:self.top]:
+            frame = stat.traceback[0]
+            print(f"  {stat.size / 1024:>10,.1f} KB {stat.count:>9,}  "
+                  f"{os.path.basename(frame.filename)}:{frame.lineno}")
+        print(f"💾 {path}")
+
+
+def _parse_modes(value: str) -> Set[str]:
+    if value.lower() in ('1', 'true', 'yes', 'on'):
+        value = DEFAULT_FLAG_MODES
+    modes = {mode.strip().lower() for mode in value.split(',') if mode.strip()}
+    unknown = modes - set(MODES)
+    if unknown:
+        print(f"⚠️ Неизвестные режимы профилирования: {', '.join(sorted(unknown))} (доступны: {', '.join(MODES)})")
+    return modes & set(MODES)
+
+
+def _take_profile_flag() -> Optional[str]:
+    """Remove --profile[=modes] from sys.argv so the script's own parsing never sees it"""
+    for i, arg in enumerate(sys.argv[1:], start=1):
+        if arg == '--profile':
+            del sys.argv[i]
+            return DEFAULT_FLAG_MODES
+        if arg.startswith('--profile='):
+            del sys.argv[i]
+            return arg.split('=', 1)[1]
+    return None
+
+
+def maybe_profile(name: Optional[str] = None) -> Optional[ProfileSession]:
+    """Start profiling if TIPALTI_PROFILE or --profile asks for it
+
+    Call first thing in a script's ``__main__`` block. The report is printed
+    and the files written at interpreter exit, so every way a script can end
+    (return, sys.exit, Ctrl+C) is covered.
+    """
+    global _active
+
+    requested = _take_profile_flag() or os.getenv('TIPALTI_PROFILE')
+    if not requested or _active:
+        return None
+
+    modes = _parse_modes(requested)
+    if not modes:
+        return None
+
+    name = name or os.path.splitext(os.path.basename(sys.argv[0]))[0] or 'python'
+    session = ProfileSession(
+        modes,
+        name,
+        output_dir=os.getenv('TIPALTI_PROFILE_DIR', 'profiles'),
+        top=int(os.getenv('TIPALTI_PROFILE_TOP', '20')),
+        interval=float(os.getenv('TIPALTI_PROFILE_INTERVAL', '0.005'))
+    )
+    session.start()
+    atexit.register(session.stop)
+    _active = True
+    return session
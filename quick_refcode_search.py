@@ -7,6 +7,7 @@
 from tipalti_rest_api import TipaltiRestAPI
 import config_rest
 import json
+from profiling import maybe_profile
 
 def find_payee_by_refcode(api, target_refcode="22737"):
     """Найти payee с определенным refCode"""
@@ -14,46 +15,19 @@ def find_payee_by_refcode(api, target_refcode="22737"):
     print(f"🔍 Ищем payee с refCode = {target_refcode}")
     print("=" * 50)
     
-    limit = 100
-    offset = 0
-    page = 1
+    # refCode пушится на сервер, если API его поддерживает; иначе проверяется локально.
+    # Страницы с ошибками пропускаются (после повторов), поиск продолжается
+    query = api.query(skip_failed_pages=True).ref_code(target_refcode)
+    payee = query.first()
     
-    while True:
-        print(f"📄 Страница {page}...", end=" ")
-        
-        try:
-            params = {
-                'limit': limit,
-                'offset': offset
-            }
-            
-            response = api._make_request('GET', '/payees', params=params)
-            payees = response.get('items', [])
-            
-            print(f"получено {len(payees)} payees")
-            
-            if not payees:
-                break
-            
-            # Поиск по refCode
-            for payee in payees:
-                ref_code = payee.get('refCode', '')
-                
-                if ref_code == target_refcode:
-                    print(f"\n🎯 НАЙДЕН! Payee с refCode = {target_refcode}")
-                    return payee
-            
-            if len(payees) < limit:
-                break
-            
-            offset += limit  
-            page += 1
-            
-        except Exception as e:
-            print(f"❌ Ошибка: {e}")
-            offset += limit
-            page += 1
-            continue
+    if payee:
+        print(f"\n🎯 НАЙДЕН! Payee с refCode = {target_refcode}")
+        return payee
+    
+    if query.skipped_pages:
+        print(f"\n⚠️  Payee с refCode = {target_refcode} не найден, но {len(query.skipped_pages)} "
+              f"страниц не загружено - результат неточный")
+        return None
     
     print(f"\n❌ Payee с refCode = {target_refcode} НЕ найден")
     return None
@@ -162,4 +136,5 @@ def main():
         traceback.print_exc()
 
 if __name__ == "__main__":
+    maybe_profile()
     main() 
\ No newline at end of file
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Client-side Rate Limiter
+Token bucket shared by every thread using one API client
+"""
+
+import threading
+import time
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` requests per second with bursts up to ``burst``"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.throttled_waits = 0
+        self.throttled_seconds = 0.0
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a request may be sent; returns seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    if waited:
+                        self.throttled_waits += 1
+                        self.throttled_seconds += waited
+                    return waited
+
+                delay = (1 - self._tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
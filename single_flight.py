@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Request Coalescing
+Identical calls in flight at the same time share one execution and its result
+"""
+
+import threading
+from typing import Any, Callable, Dict
+
+
+class _Call:
+    """One in-flight execution shared by every caller with the same key"""
+
+    __slots__ = ('done', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls by key
+
+    The first caller for a key runs ``fn``; callers arriving while it runs
+    block and receive the same result (or exception). Nothing is cached once
+    the call completes.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
@@ -7,6 +7,7 @@
 from tipalti_rest_api import TipaltiRestAPI
 import config_rest
 import json
+from profiling import maybe_profile
 
 def smart_search_refcode(api, target_refcode="22737"):
     """Умный поиск с диагностикой"""
@@ -198,4 +199,5 @@ def main():
         traceback.print_exc()
 
 if __name__ == "__main__":
+    maybe_profile()
     main() 
\ No newline at end of file
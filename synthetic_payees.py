@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Synthetic Payee Generator
+Deterministic payees in the REST /payees item shape for load tests and benchmarks
+
+Country distribution comes from the latest countries_list_*.csv, the status mix
+from the production status report. The same --seed always yields the same data.
+
+Usage:
+  python synthetic_payees.py --count 1000000 --output payees_synthetic_1m.jsonl
+  python synthetic_payees.py --count 5000 --output payees_synthetic.json --seed 7
+  python mock_tipalti_server.py --synthetic 1000000          # seed the stand-in server
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from backup_io import find_latest_countries_csv, read_countries_csv, write_backup_payees
+from profiling import maybe_profile
+
+
+# Production status mix (full_payees_status_report_20250723_122809.json)
+DEFAULT_STATUS_WEIGHTS = (('SUSPENDED', 2964), ('ACTIVE', 897), ('BLOCKED_BY_TIPALTI', 39))
+
+# Used when no countries_list_*.csv is available
+FALLBACK_COUNTRY_WEIGHTS = (('', 1619), ('BR', 1550), ('IN', 227), ('RU', 113), ('UA', 60), ('US', 40))
+
+# Share of payees whose payment country differs from the beneficiary country
+CROSS_BORDER_SHARE = 0.08
+
+FIRST_NAMES = ('Ana', 'Bruno', 'Carlos', 'Daria', 'Elena', 'Felipe', 'Gabriel', 'Hanna', 'Igor', 'Julia',
+               'Karan', 'Lucas', 'Maria', 'Nikita', 'Olga', 'Pedro', 'Priya', 'Rafael', 'Sofia', 'Tiago')
+LAST_NAMES = ('Silva', 'Santos', 'Oliveira', 'Souza', 'Kumar', 'Sharma', 'Ivanov', 'Petrova', 'Shevchenko',
+              'Kovalenko', 'Smith', 'Garcia', 'Lima', 'Costa', 'Singh', 'Melnyk', 'Pereira', 'Rocha')
+CITIES = ('Sao Paulo', 'Rio de Janeiro', 'Mumbai', 'Delhi', 'Moscow', 'Kyiv', 'Lviv', 'Tallinn',
+          'New York', 'Mexico City', 'Lisbon', 'Warsaw')
+EMAIL_DOMAINS = ('gmail.com', 'yahoo.com', 'outlook.com', 'mail.ru', 'ukr.net', 'hotmail.com')
+PAYMENT_METHODS = ('PayPal', 'ACH', 'WireTransfer', 'Payoneer', 'Check')
+
+ID_BASE = 3412542488415314357500000
+CREATED_FROM = datetime(2021, 1, 1)
+CREATED_SPAN_MINUTES = 4 * 365 * 24 * 60
+
+
+def load_country_weights(path: Optional[str] = None) -> List[Tuple[str, int]]:
+    """(country code, count) pairs from a countries_list CSV, else FALLBACK_COUNTRY_WEIGHTS"""
+    path = path or find_latest_countries_csv()
+    if not path:
+        return list(FALLBACK_COUNTRY_WEIGHTS)
+    return read_countries_csv(path)
+
+
+def _cumulative(weights: Sequence[Tuple[str, int]]) -> Tuple[List[str], List[int]]:
+    values, cum_weights, total = [], [], 0
+    for value, weight in weights:
+        total += weight
+        values.append(value)
+        cum_weights.append(total)
+    return values, cum_weights
+
+
+def iter_synthetic_payees(count: int, seed: int = 42, country_weights: Optional[Sequence[Tuple[str, int]]] = None,
+                          status_weights: Sequence[Tuple[str, int]] = DEFAULT_STATUS_WEIGHTS) -> Iterator[Dict]:
+    """Yield ``count`` payees; streaming, so millions never need to be in memory at once"""
+    rng = random.Random(seed)
+    countries, country_cum = _cumulative(country_weights if country_weights is not None else load_country_weights())
+    statuses, status_cum = _cumulative(status_weights)
+    payment_countries = [code for code in countries if code] or ['US']
+
+    for i in range(count):
+        country = rng.choices(countries, cum_weights=country_cum)[0]
+        status = rng.choices(statuses, cum_weights=status_cum)[0]
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+
+        payment_country = country
+        if not country or rng.random() < CROSS_BORDER_SHARE:
+            payment_country = rng.choice(payment_countries)
+
+        created = CREATED_FROM + timedelta(minutes=rng.randrange(CREATED_SPAN_MINUTES))
+        updated = created + timedelta(minutes=rng.randrange(365 * 24 * 60))
+
+        contact = {
+            'firstName': first_name,
+            'lastName': last_name,
+            'email': f"{first_name.lower()}.{last_name.lower()}{i}@{rng.choice(EMAIL_DOMAINS)}",
+            'paymentCountryCode': payment_country,
+            'address': {'city': rng.choice(CITIES), 'countryCode': payment_country}
+        }
+        if country:
+            contact['beneficiaryCountryCode'] = country
+
+        payee = {
+            'id': str(ID_BASE + i),
+            'refCode': str(10000 + i),
+            'name': f"{first_name} {last_name}" if rng.random() < 0.3 else 'No name',
+            'status': status,
+            'paymentMethod': rng.choice(PAYMENT_METHODS),
+            'contactInformation': contact,
+            'createdDate': created.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'lastUpdated': updated.strftime('%Y-%m-%dT%H:%M:%SZ')
+        }
+        yield payee
+
+
+def generate_payees(count: int, seed: int = 42, country_weights: Optional[Sequence[Tuple[str, int]]] = None,
+                    status_weights: Sequence[Tuple[str, int]] = DEFAULT_STATUS_WEIGHTS) -> List[Dict]:
+    """Generate ``count`` payees as a list"""
+    return list(iter_synthetic_payees(count, seed, country_weights, status_weights))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic Tipalti payees')
+    parser.add_argument('--count', type=int, required=True, help='Number of payees')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed = same data)')
+    parser.add_argument('--countries', help='countries_list CSV for the country distribution (default: latest)')
+    parser.add_argument('--output', help='Output file (.jsonl streams; .json writes a cursor-style backup)')
+    args = parser.parse_args()
+
+    country_weights = load_country_weights(args.countries)
+    output = args.output or f"payees_synthetic_{args.count}_seed{args.seed}.jsonl"
+
+    print("🧬 ГЕНЕРАЦИЯ SYNTHETIC PAYEES")
+    print("=" * 50)
+    print(f"👥 Количество: {args.count:,} | 🎲 Seed: {args.seed}")
+    print(f"🌍 Стран в распределении: {len(country_weights)}")
+
+    started = time.time()
+    written = write_backup_payees(
+        output,
+        iter_synthetic_payees(args.count, args.seed, country_weights),
+        metadata={'backup_type': 'synthetic', 'seed': args.seed}
+    )
+    elapsed = time.time() - started
+
+    print(f"✅ Записано {written:,} payees в {output} за {elapsed:.1f}с ({written / max(elapsed, 1e-9):,.0f}/с)")
+
+
+if __name__ == "__main__":
+    maybe_profile()
+    main()
@@ -1,15 +1,29 @@
 import requests
+import os
 import hmac
 import hashlib
 import time
 import xml.etree.ElementTree as ET
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+from concurrent_fetch import fetch_ordered, iter_fetch_completed
+from rate_limiter import RateLimiter
+from circuit_breaker import CircuitBreakerRegistry, is_failure_status
+from tracing import TimedHTTPAdapter, Tracer, activate, timed_phase
+from cassette import wrap_transport
+
+
+# SOAP requests/second for callers fanning out detail lookups (get_payees_details)
+SOAP_DETAILS_RATE_LIMIT = 4.0
 
 
 class TipaltiAPI:
     """Simple Tipalti SOAP API client for user management"""
     
-    def __init__(self, payer_name: str, master_key: str, is_sandbox: bool = True):
+    def __init__(self, payer_name: str, master_key: str, is_sandbox: bool = True,
+                 rate_limit: Optional[float] = None,
+                 breaker_failure_threshold: int = 5, breaker_recovery_timeout: float = 30.0,
+                 api_root: Optional[str] = None, cassette: Optional[str] = None,
+                 cassette_mode: Optional[str] = None, cassette_realtime: Optional[bool] = None):
         self.payer_name = payer_name
         self.master_key = master_key
         self.is_sandbox = is_sandbox
@@ -19,6 +33,29 @@ class TipaltiAPI:
             self.base_url = "https://api.sandbox.tipalti.com/v14/PayeeFunctions.asmx"
         else:
             self.base_url = "https://api.tipalti.com/v14/PayeeFunctions.asmx"
+        
+        # Stand-in server (e.g. mock_tipalti_server.py)
+        api_root = api_root or os.getenv('TIPALTI_API_URL')
+        if api_root:
+            self.base_url = f"{api_root.rstrip('/')}/v14/PayeeFunctions.asmx"
+        
+        # Client-wide limit in requests/second shared by all threads (None = unlimited)
+        self.rate_limiter = RateLimiter(rate_limit, burst=max(1, int(rate_limit))) if rate_limit else None
+        
+        # Per-action circuit breakers (fail fast while Tipalti is degraded)
+        self.breakers = CircuitBreakerRegistry(breaker_failure_threshold, breaker_recovery_timeout)
+        
+        # Pooled session whose connections report dns/connect/tls timings
+        self.session = requests.Session()
+        adapter = TimedHTTPAdapter()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        # Optional record/replay of responses (cassette argument or TIPALTI_CASSETTE env var)
+        self.transport = wrap_transport(self.session, cassette, cassette_mode, cassette_realtime)
+        
+        # Before/after/error hooks with per-phase timings (see tracing.py)
+        self.tracer = Tracer()
     
     def generate_signature(self, idap: str = "", additional_param: str = "") -> tuple:
         """Generate HMAC-SHA256 signature for API authentication"""
@@ -33,8 +70,12 @@ class TipaltiAPI:
         
         return timestamp, signature
     
-    def _make_soap_request(self, action: str, soap_body: str) -> str:
-        """Make SOAP request to Tipalti API"""
+    def _make_soap_request(self, action: str, soap_body: str, parser: Optional[Callable[[str], Any]] = None) -> Any:
+        """Make SOAP request to Tipalti API
+        
+        Returns the response XML, or ``parser(xml)`` when a parser is given so
+        XML decoding is timed as part of the call's trace span.
+        """
         soap_envelope = f"""<?xml version="1.0" encoding="utf-8"?>
 <soap12:Envelope xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
                 xmlns:xsd="http://www.w3.org/2001/XMLSchema" 
@@ -50,13 +91,49 @@ class TipaltiAPI:
             'Content-Type': f'application/soap+xml; charset=utf-8; action="http://Tipalti.org/{action}"'
         }
         
+        breaker = self.breakers.get(f"SOAP {action}")
+        span = self.tracer.start(f"SOAP {action}", **{'http.method': 'POST', 'http.url': self.base_url,
+                                                      'soap.action': action})
+        
         try:
-            response = requests.post(self.base_url, data=soap_envelope, headers=headers)
+            breaker.before_call()
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            started = time.perf_counter()
+            try:
+                with activate(span):
+                    response = self.transport.request('POST', self.base_url, data=soap_envelope, headers=headers,
+                                                      stream=True)
+                    span.add_phase('ttfb', time.perf_counter() - started - span.connection_time())
+                    with timed_phase(span, 'download'):
+                        response_xml = response.text
+            except requests.RequestException:
+                breaker.record_failure()
+                raise
+            
+            span.set_attribute('http.status_code', response.status_code)
+            if is_failure_status(response.status_code):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            
             response.raise_for_status()
-            return response.text
+            
+            if parser is None:
+                result = response_xml
+            else:
+                with timed_phase(span, 'decode'):
+                    result = parser(response_xml)
+            
+            self.tracer.finish(span)
+            return result
         except requests.RequestException as e:
+            self.tracer.finish(span, e)
             print(f"API request failed: {e}")
             raise
+        except Exception as e:
+            self.tracer.finish(span, e)
+            raise
     
     def get_payees_list(self) -> List[Dict]:
         """Get list of all payees from Tipalti"""
@@ -69,14 +146,13 @@ class TipaltiAPI:
         
         try:
             # Try GetExtendedPayeeDetailList method as found in documentation
-            response_xml = self._make_soap_request('GetExtendedPayeeDetailList', soap_body)
-            return self._parse_payees_list(response_xml)
+            return self._make_soap_request('GetExtendedPayeeDetailList', soap_body, self._parse_payees_list)
         except Exception as e:
             print(f"Failed to get payees list: {e}")
             return []
     
-    def get_payee_details(self, idap: str) -> Optional[Dict]:
-        """Get detailed information for a specific payee"""
+    def _fetch_payee_details(self, idap: str) -> Optional[Dict]:
+        """Get payee details, raising on request failures"""
         timestamp, signature = self.generate_signature(idap)
         
         soap_body = f"""
@@ -85,13 +161,28 @@ class TipaltiAPI:
       <key>{signature}</key>
       <idap>{idap}</idap>"""
         
+        return self._make_soap_request('GetExtendedPayeeDetails', soap_body, self._parse_payee_details)
+    
+    def get_payee_details(self, idap: str) -> Optional[Dict]:
+        """Get detailed information for a specific payee"""
         try:
-            response_xml = self._make_soap_request('GetExtendedPayeeDetails', soap_body)
-            return self._parse_payee_details(response_xml)
+            return self._fetch_payee_details(idap)
         except Exception as e:
             print(f"Failed to get payee details for {idap}: {e}")
             return None
     
+    def get_payees_details(self, idaps: Iterable[str], concurrency: int = 4,
+                           stream: bool = False) -> Union[List[Dict], Iterator[Dict]]:
+        """Get details for many payees concurrently (respects the client rate limit)
+        
+        Returns one result dict per idap: {'id', 'success', 'data', 'error'},
+        in input order (or completion order with stream=True). A failed lookup
+        carries the request error in 'error' and never aborts the batch.
+        """
+        if stream:
+            return iter_fetch_completed(idaps, self._fetch_payee_details, concurrency)
+        return fetch_ordered(idaps, self._fetch_payee_details, concurrency)
+    
     def deactivate_payee(self, idap: str) -> bool:
         """Deactivate a payee"""
         timestamp, signature = self.generate_signature(idap)
@@ -108,8 +199,7 @@ class TipaltiAPI:
       </payeeInfo>"""
         
         try:
-            response_xml = self._make_soap_request('UpdateOrCreatePayeeInfo', soap_body)
-            return self._parse_update_response(response_xml)
+            return self._make_soap_request('UpdateOrCreatePayeeInfo', soap_body, self._parse_update_response)
         except Exception as e:
             print(f"Failed to deactivate payee {idap}: {e}")
             return False
@@ -0,0 +1,477 @@
+#!/usr/bin/env python3
+"""
+Tipalti CLI
+One entry point for the payee tools. Only argparse and the standard library
+load at startup; requests, the API clients and the analytics modules are
+imported by the subcommand that needs them.
+
+Usage:
+  ./tipalti token [--raw] [--refresh]
+  ./tipalti search 22737 [--mirror [BACKUP]]
+  ./tipalti backup [--output payees_backup_20250801.jsonl | --store [DIR]] [--status ACTIVE]
+  ./tipalti report [--mirror [BACKUP] | --counts [--focus RU --pushdown status,country]]
+  ./tipalti block --country UA [--execute]
+  ./tipalti deactivate --country RU [--backup FILE] [--execute]
+  ./tipalti delete --country RU [--backup FILE] [--execute]
+  ./tipalti progress --country RU [--mirror [BACKUP]] [--once]
+  ./tipalti estimate --country RU --error 0.03
+  ./tipalti diff [OLD NEW] [--output changes.jsonl]
+  ./tipalti store add|list|materialize|stats
+  ./tipalti gateway [--port 8787] [--key SECRET]
+
+Mutating commands run as a dry run unless --execute is given.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+
+TOKEN_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'tipalti', 'token.json')
+TOKEN_SCOPE = 'tipalti.api.payee.read tipalti.api.payee.write'
+
+# Refresh cached tokens this long before they expire
+TOKEN_SAFETY_MARGIN = 60
+
+
+def _credentials():
+    """(client_id, client_secret, is_sandbox) from .env / environment"""
+    import config_rest
+    return config_rest.get_validated_config()
+
+
+def _api(**options):
+    from tipalti_rest_api import TipaltiRestAPI
+    client_id, client_secret, is_sandbox = _credentials()
+    return TipaltiRestAPI(client_id, client_secret, is_sandbox, **options)
+
+
+def _mirror_path(value):
+    """--mirror without a value means the latest local backup"""
+    from backup_io import find_latest_backup
+    path = find_latest_backup() if value in (None, 'latest') else value
+    if not path:
+        sys.exit("❌ Не найдено локальных бэкапов (payees_backup_*.json[l]) - укажите файл")
+    return path
+
+
+def _confirm(prompt: str, expected: str) -> bool:
+    answer = input(f"{prompt}\n   Введите '{expected}' для подтверждения: ").strip()
+    return answer == expected
+
+
+# token
+
+def _auth_url(is_sandbox: bool) -> str:
+    # Same endpoints as TipaltiRestAPI, without importing requests
+    api_root = os.getenv('TIPALTI_API_URL')
+    if api_root:
+        return f"{api_root.rstrip('/')}/connect/token"
+    return "https://sso.sandbox.tipalti.com/connect/token" if is_sandbox else "https://sso.tipalti.com/connect/token"
+
+
+def _read_token_cache(cache_key: str):
+    try:
+        with open(TOKEN_CACHE_PATH, 'r', encoding='utf-8') as f:
+            entry = json.load(f).get(cache_key)
+    except (OSError, ValueError):
+        return None
+    if entry and entry['expires_at'] - TOKEN_SAFETY_MARGIN > time.time():
+        return entry
+    return None
+
+
+def _write_token_cache(cache_key: str, entry: dict):
+    try:
+        with open(TOKEN_CACHE_PATH, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    cache[cache_key] = entry
+
+    os.makedirs(os.path.dirname(TOKEN_CACHE_PATH), mode=0o700, exist_ok=True)
+    fd = os.open(TOKEN_CACHE_PATH + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(cache, f)
+    os.replace(TOKEN_CACHE_PATH + '.tmp', TOKEN_CACHE_PATH)
+
+
+def fetch_token(client_id: str, client_secret: str, is_sandbox: bool, refresh: bool = False) -> dict:
+    """Bearer token via client credentials, cached on disk (0600) until shortly before expiry"""
+    from urllib.parse import urlencode
+    from urllib.request import Request, urlopen
+
+    auth_url = _auth_url(is_sandbox)
+    cache_key = f"{auth_url}|{client_id}"
+    if not refresh:
+        cached = _read_token_cache(cache_key)
+        if cached:
+            return cached
+
+    payload = urlencode({
+        'grant_type': 'client_credentials',
+        'client_id': client_id,
+        'client_secret': client_secret,
+        'scope': TOKEN_SCOPE
+    }).encode('ascii')
+    request = Request(auth_url, data=payload, headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    with urlopen(request, timeout=30) as response:
+        token_data = json.loads(response.read())
+
+    entry = {
+        'access_token': token_data['access_token'],
+        'expires_at': time.time() + token_data.get('expires_in', 3600)
+    }
+    _write_token_cache(cache_key, entry)
+    return entry
+
+
+def cmd_token(args):
+    client_id, client_secret, is_sandbox = _credentials()
+    entry = fetch_token(client_id, client_secret, is_sandbox, refresh=args.refresh)
+
+    if args.raw:
+        print(entry['access_token'])
+        return
+
+    expires = datetime.fromtimestamp(entry['expires_at'])
+    print(f"Bearer {entry['access_token']}")
+    print(f"⏰ Действителен до: {expires:%Y-%m-%d %H:%M:%S} ({(entry['expires_at'] - time.time()) / 60:.0f} мин)",
+          file=sys.stderr)
+
+
+# search
+
+def _matches(payee: dict, needle: str) -> bool:
+    contact = payee.get('contactInformation') or {}
+    if needle in (str(payee.get('refCode', '')), str(payee.get('id', ''))):
+        return True
+    return '@' in needle and needle.lower() == (contact.get('email') or '').lower()
+
+
+def cmd_search(args):
+    if args.mirror is not False:
+        from backup_io import iter_backup_payees
+        path = _mirror_path(args.mirror)
+        found = [payee for payee in iter_backup_payees(path) if _matches(payee, args.needle)]
+        print(f"📁 Зеркало: {path}", file=sys.stderr)
+    elif '@' in args.needle:
+        sys.exit("❌ Поиск по email возможен только по зеркалу: добавьте --mirror")
+    else:
+        pushdown = tuple(name.strip() for name in args.pushdown.split(',') if name.strip())
+        api = _api(pushdown_filters=pushdown)
+        # Payee id: one (cached) details request
+        details = api.get_payee_details(args.needle)
+        found = [details] if details else []
+        if not found:
+            if 'ref_code' not in api.pushdown_filters:
+                # Without server-side refCode filtering this would download the whole account
+                sys.exit(f"❌ Payee с id '{args.needle}' не найден. Для поиска по refCode используйте "
+                         f"--mirror или --pushdown status,ref_code (если API фильтрует по refCode)")
+            found = api.query(page_size=100).ref_code(args.needle).all()
+
+    if not found:
+        print(f"❌ Payee '{args.needle}' не найден")
+        sys.exit(1)
+
+    for payee in found:
+        print(json.dumps(payee, ensure_ascii=False, indent=2))
+
+
+# backup
+
+def cmd_backup(args):
+    from backup_io import write_backup_payees
+    from event_log import ProgressLine
+
+    api = _api()
+    query = api.query(page_size=args.page_size)
+    if args.status:
+        query = query.status(args.status)
+
+    output = args.output or f"payees_backup_{datetime.now():%Y%m%d_%H%M%S}.jsonl"
+    progress = ProgressLine(label='Backup')
+
+    def payees():
+        for matched, response in query.pages():
+            progress.total = response.get('totalCount') or progress.total
+            progress.update(len(matched))
+            yield from matched
+
+    if args.store:
+        from backup_store import BackupStore
+        snapshot = BackupStore(args.store).add_snapshot(payees(), source=api.base_url)
+        progress.close()
+        print(f"📦 {snapshot['count']:,} payees -> {args.store} (снапшот {snapshot['name']}, "
+              f"новых записей: {snapshot['new_records']:,})")
+        return
+
+    count = write_backup_payees(output, payees(), metadata={
+        'environment': 'sandbox' if api.is_sandbox else 'production',
+        'api_base_url': api.base_url,
+        'backup_type': 'tipalti_cli'
+    })
+    progress.close()
+    print(f"💾 {count:,} payees -> {output}")
+
+
+# report
+
+def cmd_report(args):
+    if args.counts:
+        from payees_status_report import get_count_only_statistics, resolve_count_countries
+        pushdown = tuple(name.strip() for name in args.pushdown.split(',') if name.strip())
+        countries = resolve_count_countries(args.countries, pushdown)
+        if countries is None:
+            sys.exit(1)
+        get_count_only_statistics(countries, args.focus, pushdown, args.concurrency)
+        return
+
+    if args.mirror is False:
+        import payees_full_status_report
+        payees_full_status_report.main()
+        return
+
+    from backup_io import load_backup_payees
+    from payees_full_status_report import analyze_payees_comprehensive, print_comprehensive_report
+
+    path = _mirror_path(args.mirror)
+    print(f"📁 Зеркало: {path}")
+    payees = load_backup_payees(path)
+    print_comprehensive_report(analyze_payees_comprehensive(payees), len(payees))
+
+
+# block / deactivate / delete
+
+def cmd_block(args):
+    from payee_record import PayeeRecord
+    from block_ua_payees import block_ua_payees_batch, save_results_report
+
+    api = _api()
+    query = api.query(page_size=100, page_delay=0.1).status('ACTIVE').country(args.country)
+    payees = [PayeeRecord.from_api(payee) for payee in query]
+    print(f"🎯 Активных {args.country} payees: {len(payees):,}")
+    if not payees:
+        return
+
+    dry_run = not args.execute
+    if not dry_run and not args.yes and not _confirm(
+            f"⚠️ Будет заблокировано (SUSPENDED) {len(payees):,} payees", f"BLOCK {args.country} PAYEES"):
+        print("❌ Отменено")
+        return
+
+    results = block_ua_payees_batch(api, payees, dry_run=dry_run, batch_size=args.batch_size, delay=args.delay)
+    save_results_report(results, payees, dry_run=dry_run)
+
+
+def _backup_cohort(args, active_only: bool):
+    """Payees of --country from --backup (default: latest backup)"""
+    from backup_io import iter_backup_payees
+
+    path = _mirror_path(args.backup)
+    print(f"📁 Бэкап: {path}")
+    cohort = []
+    for payee in iter_backup_payees(path):
+        contact = payee.get('contactInformation') or {}
+        if contact.get('beneficiaryCountryCode') != args.country:
+            continue
+        if active_only and payee.get('status') in ('BLOCKED_BY_TIPALTI', 'BLOCKED', 'SUSPENDED'):
+            continue
+        cohort.append({
+            'id': payee['id'],
+            'refCode': payee.get('refCode', ''),
+            'status': payee.get('status', 'UNKNOWN'),
+            'email': contact.get('email', 'N/A'),
+            'firstName': contact.get('firstName', ''),
+            'lastName': contact.get('lastName', ''),
+            'companyName': contact.get('companyName', '')
+        })
+    return cohort
+
+
+def cmd_deactivate(args):
+    from deactivate_ru_payees import DEACTIVATION_STATUSES, create_deactivation_report, deactivate_payees
+
+    payees = _backup_cohort(args, active_only=True)
+    print(f"🎯 Активных {args.country} payees к деактивации: {len(payees):,}")
+    if not payees:
+        return
+
+    dry_run = not args.execute
+    if not dry_run and not args.yes and not _confirm(
+            f"⚠️ Будет деактивировано {len(payees):,} payees (статус {' / '.join(DEACTIVATION_STATUSES)}, "
+            f"первый принятый API)", f"DEACTIVATE {len(payees)} {args.country} PAYEES"):
+        print("❌ Отменено")
+        return
+
+    results = deactivate_payees(_api(), payees, dry_run=dry_run)
+    print(f"📋 Отчет: {create_deactivation_report(results)}")
+
+
+def cmd_delete(args):
+    from delete_ru_payees import create_deletion_report, delete_payee_via_rest_api
+    from event_log import ProgressLine, get_event_logger
+
+    payees = _backup_cohort(args, active_only=False)
+    print(f"🎯 {args.country} payees к удалению: {len(payees):,}")
+    if not payees:
+        return
+
+    dry_run = not args.execute
+    if not dry_run and not args.yes and not _confirm(
+            f"⚠️ Будет БЕЗВОЗВРАТНО удалено {len(payees):,} payees", f"DELETE {len(payees)} {args.country} PAYEES"):
+        print("❌ Отменено")
+        return
+
+    api = _api()
+    log = get_event_logger()
+    progress = ProgressLine(len(payees), f"{'DRY RUN ' if dry_run else ''}Удаление {args.country}")
+    results = []
+    for i, payee in enumerate(payees, 1):
+        result = delete_payee_via_rest_api(api, payee['id'], dry_run)
+        results.append({**result, 'payee_refCode': payee['refCode'], 'original_status': payee['status']})
+        if not result.get('success'):
+            log.error('payee_failed', payee_id=payee['id'], ref_code=payee['refCode'], dry_run=dry_run,
+                      message=result.get('message'))
+        elif dry_run:
+            log.info('payee_would_delete', payee_id=payee['id'], ref_code=payee['refCode'], dry_run=True)
+        else:
+            # Durable audit trail only for deletions that actually happened
+            log.audit('payee_deleted', payee_id=payee['id'], ref_code=payee['refCode'], dry_run=False,
+                      message=result.get('message'))
+        progress.update(ok=bool(result.get('success')))
+        
+        # Rate limiting to avoid API throttling
+        if not dry_run and i % 10 == 0:
+            time.sleep(1)  # 1 second pause every 10 requests
+    progress.close()
+    print(f"📋 Отчет: {create_deletion_report(payees, results)}")
+
+
+def cmd_progress(args):
+    from check_progress import main as watch_progress
+    watch_progress(args.passthrough)
+
+
+def cmd_estimate(args):
+    from payee_sampling import main as estimate
+    estimate(args.passthrough)
+
+
+def cmd_diff(args):
+    from backup_diff import main as diff
+    diff(args.passthrough)
+
+
+def cmd_store(args):
+    from backup_store import main as store
+    store(args.passthrough)
+
+
+def cmd_gateway(args):
+    from tipalti_gateway import serve
+    serve(args.host, args.port, args.key, args.rate_limit, args.job_workers, args.verbose)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='tipalti', description='Tipalti payee tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    token = commands.add_parser('token', help='Print a bearer token (cached until expiry)')
+    token.add_argument('--raw', action='store_true', help='Token only, no "Bearer " prefix or expiry')
+    token.add_argument('--refresh', action='store_true', help='Ignore the cached token')
+    token.set_defaults(handler=cmd_token)
+
+    search = commands.add_parser('search', help='Find a payee by id or refCode (email: --mirror only)')
+    search.add_argument('needle')
+    search.add_argument('--mirror', nargs='?', const='latest', default=False, metavar='BACKUP',
+                        help='Search a local backup instead of the API (default: latest)')
+    search.add_argument('--pushdown', default='status',
+                        help='Filters the server applies; refCode lookups via the API need ref_code')
+    search.set_defaults(handler=cmd_search)
+
+    backup = commands.add_parser('backup', help='Back up payees to JSONL/JSON')
+    backup.add_argument('--output', help='.jsonl (streamed) or .json')
+    backup.add_argument('--status', help='Only payees with this status')
+    backup.add_argument('--page-size', type=int, default=100)
+    backup.add_argument('--store', nargs='?', const=os.getenv('TIPALTI_BACKUP_STORE', 'backup_store'),
+                        metavar='DIR', help='Add a snapshot to the deduplicated backup store instead of a file')
+    backup.set_defaults(handler=cmd_backup)
+
+    report = commands.add_parser('report', help='Full status/country report')
+    report.add_argument('--mirror', nargs='?', const='latest', default=False, metavar='BACKUP',
+                        help='Analyze a local backup instead of the API (default: latest)')
+    report.add_argument('--counts', action='store_true', help='Counts only, from limit=1 totalCount probes')
+    report.add_argument('--countries', default='',
+                        help='Comma-separated country codes to count (--counts; default: latest countries_list CSV)')
+    report.add_argument('--focus', type=str.upper, help='Country to break down by status (--counts)')
+    report.add_argument('--concurrency', type=int, default=8, help='Parallel count probes (--counts)')
+    report.add_argument('--pushdown', default='status', help='Filters the server applies (status,country)')
+    report.set_defaults(handler=cmd_report)
+
+    for name, handler, help_text in (
+            ('block', cmd_block, 'Suspend ACTIVE payees of a country (live query)'),
+            ('deactivate', cmd_deactivate, 'Block active payees of a country found in a backup'),
+            ('delete', cmd_delete, 'Delete payees of a country found in a backup')):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('--country', required=True, type=str.upper)
+        command.add_argument('--execute', action='store_true', help='Apply changes (default: dry run)')
+        command.add_argument('--yes', action='store_true', help='Skip the confirmation prompt')
+        if name == 'block':
+            command.add_argument('--batch-size', type=int, default=10)
+            command.add_argument('--delay', type=float, default=1.0)
+        else:
+            command.add_argument('--backup', nargs='?', const='latest', default=None, metavar='FILE')
+        command.set_defaults(handler=handler)
+
+    progress = commands.add_parser('progress', add_help=False,
+                                   help='Watch blocking progress of a country cohort (see check_progress.py -h)')
+    progress.set_defaults(handler=cmd_progress, passthrough=True)
+
+    estimate = commands.add_parser('estimate', add_help=False,
+                                   help='Estimate status/country shares from sampled pages (see payee_sampling.py -h)')
+    estimate.set_defaults(handler=cmd_estimate, passthrough=True)
+
+    diff = commands.add_parser('diff', add_help=False,
+                               help='What changed between two backups (see backup_diff.py -h)')
+    diff.set_defaults(handler=cmd_diff, passthrough=True)
+
+    store = commands.add_parser('store', add_help=False,
+                                help='Deduplicated backup store (see backup_store.py -h)')
+    store.set_defaults(handler=cmd_store, passthrough=True)
+
+    gateway = commands.add_parser('gateway', help='Run the local gateway daemon (warm token, pool and cache)')
+    gateway.add_argument('--host', default='127.0.0.1')
+    gateway.add_argument('--port', type=int, default=8787)
+    gateway.add_argument('--key', default=os.getenv('TIPALTI_GATEWAY_KEY'), help='X-Gateway-Key value (default: generated)')
+    gateway.add_argument('--rate-limit', type=float, default=None)
+    gateway.add_argument('--job-workers', type=int, default=1)
+    gateway.add_argument('--verbose', action='store_true')
+    gateway.set_defaults(handler=cmd_gateway)
+
+    return parser
+
+
+def main(argv=None):
+    from profiling import maybe_profile
+    maybe_profile('tipalti')
+
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if getattr(args, 'passthrough', False):
+        # Subcommands with their own argument parser get the remaining arguments
+        args.passthrough = extra
+    elif extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+    try:
+        args.handler(args)
+    except KeyboardInterrupt:
+        print("\n⏹️  Прервано пользователем")
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+"""
+Tipalti Local Gateway
+Long-running daemon holding a warm OAuth token, a pooled connection and the
+details/ETag caches of one TipaltiRestAPI, shared by short-lived tools,
+Postman and cron jobs over a local HTTP API
+
+Endpoints:
+  GET   /health                     token expiry, cache and request statistics
+  GET   /token                      {"access_token", "expires_at"} - for Postman pre-request scripts
+  GET   /metrics                    Prometheus text
+  GET   /payees                     ?status=&country=&refCode=&modifiedSince=&limit=&offset= (one page)
+                                    &all=1 returns every matching payee
+  GET   /payees/{id}                cached payee details
+  PATCH /payees/{id}                JSON body passed to update_payee
+  POST  /jobs                       {"action": "suspend"|"activate"|"delete", "ids": [...], "dry_run": true}
+  GET   /jobs, /jobs/{id}           bulk job progress and results
+  *     /api/v1/..., /v2/...        pass-through to Tipalti with the gateway's token
+
+Usage:
+  python tipalti_gateway.py --port 8787
+  KEY=$(cat ~/.cache/tipalti/gateway_key)
+  curl -s -H "X-Gateway-Key: $KEY" localhost:8787/payees/3412542488415314357590467
+  curl -s -H "X-Gateway-Key: $KEY" -H 'Content-Type: application/json' -X POST localhost:8787/jobs \
+       -d '{"action": "suspend", "ids": ["..."], "dry_run": false}'
+
+Every request needs the X-Gateway-Key header. The key comes from --key or
+TIPALTI_GATEWAY_KEY; without one a random key is generated at startup and
+written to ~/.cache/tipalti/gateway_key (mode 0600). Request bodies must be
+application/json, and requests whose Host or Origin is not the gateway's own
+address are rejected, so web pages (including via DNS rebinding) cannot
+drive it. Binds to 127.0.0.1 by default.
+"""
+
+import argparse
+import hmac
+import itertools
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from tipalti_rest_api import TipaltiRestAPI
+import config_rest
+from event_log import get_event_logger
+from profiling import maybe_profile
+
+
+JOB_ACTIONS = {
+    'suspend': {'status': 'SUSPENDED'},
+    'activate': {'status': 'ACTIVE'},
+    'delete': None
+}
+
+# Finished jobs kept for GET /jobs
+MAX_FINISHED_JOBS = 100
+
+LOCAL_HOSTS = ('127.0.0.1', 'localhost', '::1')
+
+# Same pacing as the bulk scripts: pause after every JOB_PAUSE_EVERY live calls
+JOB_PAUSE_EVERY = 10
+JOB_PAUSE = 1.0
+
+KEY_FILE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'tipalti', 'gateway_key')
+
+PAYEE_PATH = re.compile(r'/payees/([^/]+)')
+
+
+class GatewayJob:
+    """Bulk mutation running in the gateway's job pool"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, action: str, payee_ids: List[str], dry_run: bool = True):
+        self.id = str(next(self._ids))
+        self.action = action
+        self.payee_ids = payee_ids
+        self.dry_run = dry_run
+        self.status = 'queued'
+        self.done = 0
+        self.failed = 0
+        self.results: List[Dict] = []
+        self.created_at = datetime.now().isoformat()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def run(self, api: TipaltiRestAPI):
+        self.status = 'running'
+        self.started = time.time()
+        for payee_id in self.payee_ids:
+            result = self._apply(api, payee_id)
+            self.results.append(result)
+            self.done += 1
+            if not result['success']:
+                self.failed += 1
+            # Rate limiting to avoid API throttling
+            if not self.dry_run and self.done % JOB_PAUSE_EVERY == 0 and self.done < len(self.payee_ids):
+                time.sleep(JOB_PAUSE)
+        self.status = 'finished'
+        self.finished = time.time()
+
+    def _apply(self, api: TipaltiRestAPI, payee_id: str) -> Dict:
+        if self.dry_run:
+            return {'payee_id': payee_id, 'success': True, 'message': f'DRY RUN - would {self.action}'}
+        try:
+            if self.action == 'delete':
+                result = api.delete_payee(payee_id)
+                result = {'payee_id': payee_id, 'success': result['success'], 'message': result['message']}
+            else:
+                success = api.update_payee(payee_id, JOB_ACTIONS[self.action])
+                result = {'payee_id': payee_id, 'success': success,
+                          'message': 'updated' if success else 'update_payee returned False'}
+        except Exception as e:
+            result = {'payee_id': payee_id, 'success': False, 'message': str(e)}
+
+        # Live mutations outlive the in-memory job: durable audit trail in the event log
+        log = get_event_logger()
+        if result['success']:
+            log.audit('gateway_payee_mutated', job_id=self.id, action=self.action, payee_id=payee_id,
+                      message=result['message'])
+        else:
+            log.error('gateway_payee_failed', job_id=self.id, action=self.action, payee_id=payee_id,
+                      message=result['message'])
+        return result
+
+    def to_dict(self, include_results: bool = False) -> Dict:
+        elapsed = ((self.finished or time.time()) - self.started) if self.started else 0.0
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = len(self.payee_ids) - self.done
+        data = {
+            'id': self.id,
+            'action': self.action,
+            'dry_run': self.dry_run,
+            'status': self.status,
+            'total': len(self.payee_ids),
+            'done': self.done,
+            'failed': self.failed,
+            'rate_per_s': round(rate, 2),
+            'eta_s': round(remaining / rate, 1) if rate > 0 and remaining else None,
+            'created_at': self.created_at
+        }
+        if include_results:
+            data['results'] = self.results
+        return data
+
+
+class TipaltiGateway:
+    """Shared client state behind the HTTP handler"""
+
+    def __init__(self, api: TipaltiRestAPI, key: Optional[str] = None, job_workers: int = 1):
+        self.api = api
+        self.key = key
+        self.started = time.time()
+        self.jobs: Dict[str, GatewayJob] = {}
+        self._jobs_lock = threading.Lock()
+        self._job_pool = ThreadPoolExecutor(max_workers=job_workers, thread_name_prefix='gateway-job')
+
+    def warm_up(self):
+        """Fetch the token and open the pooled connection before the first caller arrives"""
+        self.api._get_access_token()
+
+    def submit_job(self, action: str, payee_ids: List[str], dry_run: bool) -> GatewayJob:
+        job = GatewayJob(action, payee_ids, dry_run)
+        with self._jobs_lock:
+            self.jobs[job.id] = job
+            finished = [j for j in self.jobs.values() if j.status == 'finished']
+            for old in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self.jobs[old.id]
+        self._job_pool.submit(job.run, self.api)
+        return job
+
+    def health(self) -> Dict:
+        api = self.api
+        return {
+            'status': 'ok',
+            'uptime_s': round(time.time() - self.started, 1),
+            'environment': 'sandbox' if api.is_sandbox else 'production',
+            'base_url': api.base_url,
+            'token_expires_at': api.token_expires_at.isoformat() if api.token_expires_at else None,
+            'caches': {
+                'details': api.details_cache.stats(),
+                'validators': api.validator_cache.stats()
+            },
+            'coalesced_requests': api._inflight.coalesced,
+            'jobs': {job_id: job.status for job_id, job in self.jobs.items()},
+            'endpoints': api.stats()
+        }
+
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    """Local HTTP API over the shared TipaltiGateway"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'TipaltiGateway/1.0'
+    disable_nagle_algorithm = True
+
+    @property
+    def gateway(self) -> TipaltiGateway:
+        return self.server.gateway
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # Helpers
+
+    def _send(self, status: int, body: bytes, content_type: str = 'application/json; charset=utf-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self, status: int, payload):
+        self._send(status, json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8'))
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return None
+        return json.loads(self.rfile.read(length))
+
+    def _local_origin(self) -> bool:
+        """Host (and Origin, when sent) must name the gateway itself"""
+        allowed = self.server.allowed_hosts
+        host = urlparse(f"//{self.headers.get('Host', '')}").hostname
+        if host not in allowed:
+            self._json(403, {'error': f"Host {self.headers.get('Host')!r} is not allowed"})
+            return False
+        origin = self.headers.get('Origin')
+        if origin is not None and urlparse(origin).hostname not in allowed:
+            self._json(403, {'error': f"Origin {origin!r} is not allowed"})
+            return False
+        return True
+
+    def _authorized(self) -> bool:
+        key = self.headers.get('X-Gateway-Key') or ''
+        if not hmac.compare_digest(key.encode('utf-8'), self.gateway.key.encode('utf-8')):
+            self._json(401, {'error': 'Missing or wrong X-Gateway-Key'})
+            return False
+        return True
+
+    def _handle(self, method: str):
+        parsed = urlparse(self.path)
+        if not self._local_origin() or not self._authorized():
+            self.close_connection = True
+            return
+
+        body = None
+        if method in ('POST', 'PATCH', 'PUT'):
+            content_type = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type != 'application/json':
+                self.close_connection = True
+                self._json(415, {'error': 'Content-Type must be application/json'})
+                return
+            try:
+                body = self._body()
+            except ValueError:
+                self._json(400, {'error': 'Body must be JSON'})
+                return
+
+        query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        try:
+            self._route(method, parsed.path, query, body)
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else 502
+            self._json(status, {'error': str(e)})
+        except requests.RequestException as e:
+            self._json(502, {'error': str(e)})
+        except Exception as e:
+            self._json(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    # Routing
+
+    def _route(self, method: str, path: str, query: Dict[str, str], body):
+        api = self.gateway.api
+
+        if path.startswith('/api/v1/') or path.startswith('/v2/'):
+            self._passthrough(method, path, query, body)
+            return
+
+        if method == 'GET' and path == '/health':
+            self._json(200, self.gateway.health())
+        elif method == 'GET' and path == '/token':
+            token = api._get_access_token()
+            self._json(200, {'access_token': token, 'expires_at': api.token_expires_at.isoformat()})
+        elif method == 'GET' and path == '/metrics':
+            self._send(200, api.metrics_prometheus().encode('utf-8'), 'text/plain; version=0.0.4')
+        elif method == 'GET' and path == '/payees':
+            self._list_payees(query)
+        elif path.startswith('/payees/'):
+            payee_id = path[len('/payees/'):]
+            if method == 'GET':
+                details = api.get_payee_details(payee_id, use_cache=query.get('cache', '1') != '0')
+                self._json(200 if details else 404, details or {'error': 'Payee not found'})
+            elif method == 'PATCH':
+                success = api.update_payee(payee_id, body or {})
+                log = get_event_logger()
+                if success:
+                    log.audit('gateway_payee_mutated', action='patch', payee_id=payee_id, data=body or {})
+                else:
+                    log.error('gateway_payee_failed', action='patch', payee_id=payee_id, data=body or {})
+                self._json(200 if success else 502, {'success': success, 'payee_id': payee_id})
+            else:
+                self._json(405, {'error': f'{method} not allowed on {path}'})
+        elif path == '/jobs' and method == 'POST':
+            self._create_job(body or {})
+        elif path == '/jobs' and method == 'GET':
+            self._json(200, [job.to_dict() for job in self.gateway.jobs.values()])
+        elif path.startswith('/jobs/') and method == 'GET':
+            job = self.gateway.jobs.get(path[len('/jobs/'):])
+            if job is None:
+                self._json(404, {'error': 'Job not found'})
+            else:
+                self._json(200, job.to_dict(include_results=query.get('results') == '1'))
+        else:
+            self._json(404, {'error': f'No route for {method} {path}'})
+
+    def _list_payees(self, query: Dict[str, str]):
+        page_size = int(query.get('limit', 100))
+        payee_query = self.gateway.api.query(page_size=page_size)
+        if query.get('status'):
+            payee_query = payee_query.status(*query['status'].split(','))
+        if query.get('country'):
+            payee_query = payee_query.country(*query['country'].split(','))
+        if query.get('refCode'):
+            payee_query = payee_query.ref_code(*query['refCode'].split(','))
+        if query.get('modifiedSince'):
+            payee_query = payee_query.modified_since(datetime.fromisoformat(query['modifiedSince']))
+
+        if query.get('all') == '1':
+            items = payee_query.all()
+            self._json(200, {'items': items, 'totalCount': len(items)})
+            return
+
+        # Single page at the requested offset, with the query's local filters applied
+        params = payee_query.server_params()
+        params.update({'limit': page_size, 'offset': int(query.get('offset', 0))})
+        response = self.gateway.api._make_request('GET', '/payees', params=params)
+        predicate = payee_query.compile()
+        self._json(200, {
+            'items': [payee for payee in response.get('items', []) if predicate(payee)],
+            'totalCount': response.get('totalCount'),
+            'pageInfo': response.get('pageInfo')
+        })
+
+    def _create_job(self, body: Dict):
+        action = body.get('action')
+        payee_ids = body.get('ids') or []
+        if action not in JOB_ACTIONS or not isinstance(payee_ids, list) or not payee_ids:
+            self._json(400, {'error': f"Expected {{'action': one of {sorted(JOB_ACTIONS)}, 'ids': [...]}}"})
+            return
+        job = self.gateway.submit_job(action, [str(i) for i in payee_ids], bool(body.get('dry_run', True)))
+        self._json(202, job.to_dict())
+
+    def _passthrough(self, method: str, path: str, query: Dict[str, str], body):
+        """Forward to Tipalti with the warm token and the upstream status
+
+        REST v1 GETs go through the client's caches and coalescing; writes
+        are sent as-is and recorded in the event log.
+        """
+        api = self.gateway.api
+        match = PAYEE_PATH.search(path)
+        if method != 'GET' and match:
+            api.details_cache.invalidate(match.group(1))
+
+        if method == 'GET' and path.startswith('/api/v1/'):
+            # HTTP errors raise and are mapped to their status by _handle
+            result = api._make_request(method, path[len('/api/v1'):], params=query or None)
+            if not isinstance(result, (dict, list)):
+                self._json(502, {'error': f'Unexpected upstream response: {result!r}'})
+            else:
+                self._json(200, result)
+            return
+
+        if path.startswith('/api/v1/'):
+            url = f"{api.base_url}{path[len('/api/v1'):]}"
+            content_type = 'application/json-patch+json' if method == 'PATCH' else 'application/json'
+        else:
+            url = f"{api.v2_base_url}{path[len('/v2'):]}"
+            content_type = 'application/json'
+        headers = {
+            'Authorization': f'Bearer {api._get_access_token()}',
+            'Content-Type': content_type,
+            'Accept': 'application/json'
+        }
+        response = api._send(method, url, headers, params=query or None, data=body)
+
+        if method != 'GET':
+            log = get_event_logger()
+            if response.ok:
+                log.audit('gateway_passthrough_mutated', method=method, path=path, status=response.status_code,
+                          payee_id=match.group(1) if match else None)
+            else:
+                log.error('gateway_passthrough_failed', method=method, path=path, status=response.status_code,
+                          payee_id=match.group(1) if match else None)
+        self._send(response.status_code, response.content,
+                   response.headers.get('Content-Type', 'application/json'))
+
+
+class GatewayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, gateway: TipaltiGateway, verbose: bool = False):
+        super().__init__(address, GatewayHandler)
+        self.gateway = gateway
+        self.verbose = verbose
+        self.allowed_hosts = set(LOCAL_HOSTS) | {address[0]}
+
+
+def load_or_create_key(key: Optional[str] = None) -> str:
+    """Explicit key, or a random one written to KEY_FILE_PATH (0600) for local tools"""
+    if key:
+        return key
+    key = secrets.token_urlsafe(32)
+    os.makedirs(os.path.dirname(KEY_FILE_PATH), mode=0o700, exist_ok=True)
+    fd = os.open(KEY_FILE_PATH + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(key)
+    os.replace(KEY_FILE_PATH + '.tmp', KEY_FILE_PATH)
+    return key
+
+
+def serve(host: str = '127.0.0.1', port: int = 8787, key: Optional[str] = None,
+          rate_limit: Optional[float] = None, job_workers: int = 1, verbose: bool = False):
+    """Warm up a client and serve the gateway until interrupted"""
+    generated = not key
+    key = load_or_create_key(key)
+    client_id, client_secret, is_sandbox = config_rest.get_validated_config()
+    api = TipaltiRestAPI(client_id, client_secret, is_sandbox, rate_limit=rate_limit)
+    gateway = TipaltiGateway(api, key=key, job_workers=job_workers)
+
+    print("🛰️ TIPALTI LOCAL GATEWAY")
+    print("=" * 50)
+    print(f"🌐 Среда: {'Sandbox' if is_sandbox else 'Production'} ({api.base_url})")
+    print("🔐 Получение OAuth токена...")
+    gateway.warm_up()
+    print(f"✅ Токен действителен до {api.token_expires_at:%H:%M:%S} (обновляется автоматически)")
+
+    server = GatewayServer((host, port), gateway, verbose)
+    print(f"🚀 Слушаем http://{host}:{port} (X-Gateway-Key обязателен)")
+    if generated:
+        print(f"🔑 Ключ сгенерирован: {KEY_FILE_PATH}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️  Gateway остановлен")
+    finally:
+        server.server_close()
+        api.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Tipalti gateway daemon')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--key', default=os.getenv('TIPALTI_GATEWAY_KEY'),
+                        help='X-Gateway-Key value (default: TIPALTI_GATEWAY_KEY, else a generated key)')
+    parser.add_argument('--rate-limit', type=float, default=None, help='Requests/second towards Tipalti')
+    parser.add_argument('--job-workers', type=int, default=1, help='Bulk jobs running at the same time')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+    serve(args.host, args.port, args.key, args.rate_limit, args.job_workers, args.verbose)
+
+
+if __name__ == "__main__":
+    maybe_profile()
+    main()
@@ -5,6 +5,7 @@ Modern REST interface wrapper around SOAP API
 """
 
 import requests
+import os
 import time
 import hmac
 import hashlib
@@ -39,6 +40,10 @@ class TipaltiHybridAPI:
         # SOAP endpoint (internal)
         self.soap_url = f"https://api.{'sandbox.' if is_sandbox else ''}tipalti.com/v14/PayeeFunctions.asmx"
         
+        # Stand-in server (e.g. mock_tipalti_server.py)
+        if os.getenv('TIPALTI_API_URL'):
+            self.soap_url = f"{os.getenv('TIPALTI_API_URL').rstrip('/')}/v14/PayeeFunctions.asmx"
+        
         print(f"🔗 TipaltiHybridAPI initialized")
         print(f"   Environment: {'Sandbox' if is_sandbox else 'Production'}")
         print(f"   Payer: {payer_name}")
@@ -4,16 +4,71 @@ Tipalti REST API Client
 Using OAuth 2.0 Client Credentials Flow
 """
 
+import copy
 import requests
 import json
-from typing import Dict, List, Optional
+import os
+import re
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Union
 from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlparse
+from payee_query import PayeeQuery
+from payee_cache import TTLCache
+from single_flight import SingleFlight
+from rate_limiter import RateLimiter
+from concurrent_fetch import fetch_ordered, iter_fetch_completed
+from circuit_breaker import CircuitBreakerRegistry, is_failure_status
+from hedging import Hedger, LatencyTracker
+from http2_transport import Http2Transport
+from client_metrics import ClientMetrics
+from tracing import RequestSpan, TimedHTTPAdapter, Tracer, activate, timed_phase
+from cassette import wrap_transport
+
+# Fast JSON decoding when orjson is installed (falls back to stdlib json)
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# urllib3 transparently decodes brotli only when a brotli package is installed
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+
+def decode_json(response: requests.Response) -> Dict:
+    """Decode a (already decompressed) JSON response body"""
+    if not response.content:
+        return {}
+    return _json_loads(response.content)
 
 
 class TipaltiRestAPI:
     """Modern Tipalti REST API client with OAuth 2.0 authentication"""
     
-    def __init__(self, client_id: str, client_secret: str, is_sandbox: bool = True):
+    def __init__(self, client_id: str, client_secret: str, is_sandbox: bool = True,
+                 pushdown_filters: Iterable[str] = ('status',),
+                 details_cache: Optional[TTLCache] = None,
+                 revalidate: bool = True,
+                 rate_limit: Optional[float] = None,
+                 breaker_failure_threshold: int = 5,
+                 breaker_recovery_timeout: float = 30.0,
+                 hedge: bool = False,
+                 hedge_budget: float = 0.05,
+                 http2: bool = False,
+                 pool_size: int = 32,
+                 api_root: Optional[str] = None,
+                 cassette: Optional[str] = None,
+                 cassette_mode: Optional[str] = None,
+                 cassette_realtime: Optional[bool] = None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.is_sandbox = is_sandbox
@@ -22,12 +77,79 @@ class TipaltiRestAPI:
         if is_sandbox:
             self.base_url = "https://api.sandbox.tipalti.com/api/v1"
             self.auth_url = "https://sso.sandbox.tipalti.com/connect/token"
+            self.v2_base_url = "https://api.sandbox.tipalti.com/v2"
         else:
             self.base_url = "https://api-p.tipalti.com/api/v1" 
             self.auth_url = "https://sso.tipalti.com/connect/token"
+            self.v2_base_url = "https://api.tipalti.com/v2"
+        
+        # Stand-in server (e.g. mock_tipalti_server.py) serving every endpoint from one root
+        api_root = api_root or os.getenv('TIPALTI_API_URL')
+        if api_root:
+            api_root = api_root.rstrip('/')
+            self.base_url = f"{api_root}/api/v1"
+            self.auth_url = f"{api_root}/connect/token"
+            self.v2_base_url = f"{api_root}/v2"
         
         self.access_token = None
         self.token_expires_at = None
+        
+        # Transport: pooled HTTP/1.1 session, or multiplexed HTTP/2 via httpx
+        self.http2 = http2
+        if http2:
+            self.transport = Http2Transport()
+        else:
+            self.transport = requests.Session()
+            adapter = TimedHTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            self.transport.mount('https://', adapter)
+            self.transport.mount('http://', adapter)
+        
+        # Optional record/replay of responses (cassette argument or TIPALTI_CASSETTE env var)
+        self.transport = wrap_transport(self.transport, cassette, cassette_mode, cassette_realtime)
+        
+        # Filters GET /payees applies server-side (see payee_query.FILTER_PARAMS)
+        self.pushdown_filters = frozenset(pushdown_filters)
+        
+        # LRU/TTL cache in front of get_payee_details (invalidated on writes)
+        self.details_cache = details_cache if details_cache is not None else TTLCache()
+        
+        # ETag/Last-Modified validators + raw bodies for conditional GETs
+        self.revalidate = revalidate
+        self.validator_cache = TTLCache(maxsize=1000, ttl=24 * 3600)
+        
+        # Coalesces identical in-flight GETs
+        self._inflight = SingleFlight()
+        
+        # Optional client-wide limit in requests/second (shared by all threads)
+        self.rate_limiter = RateLimiter(rate_limit, burst=max(1, int(rate_limit))) if rate_limit else None
+        
+        # Per-endpoint circuit breakers (fail fast while Tipalti is degraded)
+        self.breakers = CircuitBreakerRegistry(breaker_failure_threshold, breaker_recovery_timeout)
+        
+        # Observed latencies per endpoint; GETs slower than p95 may be hedged
+        self.latency = LatencyTracker()
+        
+        self.hedger = Hedger(budget=hedge_budget) if hedge else None
+        
+        # Per-endpoint counters and latency histograms (see stats()/metrics_prometheus())
+        self.metrics = ClientMetrics()
+        
+        # Before/after/error hooks with per-phase timings (see tracing.py)
+        self.tracer = Tracer()
+    
+    def stats(self) -> Dict[str, Dict]:
+        """Per-endpoint request/latency statistics"""
+        return self.metrics.snapshot()
+    
+    def metrics_prometheus(self) -> str:
+        """Per-endpoint statistics in Prometheus text format"""
+        return self.metrics.to_prometheus()
+    
+    def close(self):
+        """Close pooled connections and the hedging workers"""
+        if self.hedger:
+            self.hedger.close()
+        self.transport.close()
     
     def _get_access_token(self) -> str:
         """Get OAuth 2.0 access token using client credentials flow"""
@@ -50,10 +172,10 @@ class TipaltiRestAPI:
         }
         
         try:
-            response = requests.post(self.auth_url, data=payload, headers=headers)
+            response = self._send('POST', self.auth_url, headers, data=payload)
             response.raise_for_status()
             
-            token_data = response.json()
+            token_data = decode_json(response)
             self.access_token = token_data['access_token']
             
             # Calculate token expiration (subtract 60 seconds for safety margin)
@@ -68,6 +190,164 @@ class TipaltiRestAPI:
                 print(f"Response: {e.response.text}")
             raise
     
+    @staticmethod
+    def _endpoint_name(method: str, url: str) -> str:
+        """Normalized endpoint label, e.g. 'GET /payees/{id}' or 'DELETE /v2/payees/{id}'"""
+        path = urlparse(url).path
+        if path.startswith('/api/v1'):
+            path = path[len('/api/v1'):]
+        path = re.sub(r'/payees/[^/]+', '/payees/{id}', path)
+        return f"{method.upper()} {path}"
+    
+    def _send(self, method: str, url: str, headers: Dict, params: Dict = None, data: Dict = None,
+              span: Optional[RequestSpan] = None) -> requests.Response:
+        """Send a single HTTP request (no auth, retries or decoding)
+        
+        Goes through the client rate limiter and the endpoint's circuit
+        breaker; raises CircuitOpenError without touching the network while
+        the endpoint's circuit is open. Network phases (dns, connect, tls,
+        ttfb, download) are added to ``span``; without one the call gets
+        its own span.
+        """
+        
+        endpoint = self._endpoint_name(method, url)
+        own_span = span is None
+        if own_span:
+            span = self.tracer.start(endpoint, **{'http.method': method.upper(), 'http.url': url})
+        
+        try:
+            breaker = self.breakers.get(endpoint)
+            breaker.before_call()
+            
+            if self.rate_limiter:
+                waited = self.rate_limiter.acquire()
+                if waited:
+                    self.metrics.record_throttle(endpoint, waited)
+            
+            started = time.perf_counter()
+            connection_before = span.connection_time()
+            try:
+                with activate(span):
+                    response = self._dispatch(method, url, headers, params=params, data=data)
+                    headers_at = time.perf_counter()
+                    span.add_phase('ttfb', headers_at - started - (span.connection_time() - connection_before))
+                    with timed_phase(span, 'download'):
+                        content = response.content
+            except requests.RequestException:
+                breaker.record_failure()
+                self.metrics.record_error(endpoint, time.perf_counter() - started)
+                raise
+            
+            elapsed = time.perf_counter() - started
+            self.latency.record(endpoint, elapsed)
+            self.metrics.record_response(endpoint, response.status_code, len(content), elapsed)
+            span.set_attribute('http.status_code', response.status_code)
+            
+            if is_failure_status(response.status_code):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            
+        except Exception as e:
+            if own_span:
+                self.tracer.finish(span, e)
+            raise
+        
+        if own_span:
+            self.tracer.finish(span)
+        return response
+    
+    def _dispatch(self, method: str, url: str, headers: Dict, params: Dict = None, data: Dict = None) -> requests.Response:
+        """Issue the HTTP call itself on the configured transport
+        
+        Bodies are streamed so _send can time headers (ttfb) and body
+        download separately; _send always reads the content.
+        """
+        
+        method = method.upper()
+        if method == 'GET':
+            return self.transport.request('GET', url, headers=headers, params=params, stream=True)
+        elif method == 'POST':
+            if headers.get('Content-Type') == 'application/x-www-form-urlencoded':
+                return self.transport.request('POST', url, headers=headers, data=data, stream=True)
+            return self.transport.request('POST', url, headers=headers, json=data, stream=True)
+        elif method == 'PATCH':
+            return self.transport.request('PATCH', url, headers=headers, json=data, stream=True)  # Use JSON for json-patch+json
+        elif method == 'PUT':
+            return self.transport.request('PUT', url, headers=headers, data=data, stream=True)  # Use form data
+        elif method == 'DELETE':
+            return self.transport.request('DELETE', url, headers=headers, stream=True)
+        else:
+            raise ValueError(f"Unsupported HTTP method: {method}")
+    
+    @staticmethod
+    def _request_key(url: str, params: Dict = None) -> str:
+        """Stable key for a GET request (URL + sorted query parameters)"""
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted((k, str(v)) for k, v in params.items()))}"
+    
+    def _store_validators(self, cache_key: str, response: requests.Response):
+        """Remember ETag/Last-Modified and the raw body for later revalidation"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        
+        if etag or last_modified:
+            self.validator_cache.set(cache_key, {
+                'etag': etag,
+                'last_modified': last_modified,
+                'body': response.content
+            })
+        else:
+            self.validator_cache.invalidate(cache_key)
+    
+    def _send_get(self, url: str, headers: Dict, params: Dict = None,
+                  span: Optional[RequestSpan] = None) -> requests.Response:
+        """Send a GET, hedging it with a duplicate if it runs past the observed p95"""
+        
+        send = lambda: self._send('GET', url, headers, params=params, span=span)
+        
+        if not self.hedger:
+            return send()
+        
+        endpoint = self._endpoint_name('GET', url)
+        delay = self.latency.percentile(endpoint, 95)
+        if delay is None:
+            return send()
+        
+        return self.hedger.call(send, delay, on_hedge=lambda: self.metrics.record_retry(endpoint))
+    
+    def _fetch_get(self, url: str, headers: Dict, params: Dict = None,
+                   span: Optional[RequestSpan] = None) -> bytes:
+        """GET a URL and return the raw body, revalidating with stored validators"""
+        
+        cache_key = None
+        validators = None
+        if self.revalidate:
+            cache_key = self._request_key(url, params)
+            validators = self.validator_cache.get(cache_key)
+            if validators:
+                headers = dict(headers)
+                if validators.get('etag'):
+                    headers['If-None-Match'] = validators['etag']
+                if validators.get('last_modified'):
+                    headers['If-Modified-Since'] = validators['last_modified']
+        
+        response = self._send_get(url, headers, params, span)
+        
+        # 304 Not Modified - serve the stored body
+        if response.status_code == 304 and validators:
+            if span is not None:
+                span.set_attribute('tipalti.revalidated', True)
+            return validators['body']
+        
+        response.raise_for_status()
+        
+        if cache_key:
+            self._store_validators(cache_key, response)
+        
+        return response.content
+    
     def _make_request(self, method: str, endpoint: str, params: Dict = None, data: Dict = None) -> Dict:
         """Make authenticated REST API request"""
         
@@ -79,40 +359,51 @@ class TipaltiRestAPI:
             headers = {
                 'Authorization': f'Bearer {token}',
                 'Content-Type': 'application/json-patch+json',  # Official Tipalti docs requirement
-                'Accept': 'application/json'
+                'Accept': 'application/json',
+                'Accept-Encoding': ACCEPT_ENCODING
             }
         else:
             headers = {
                 'Authorization': f'Bearer {token}',
                 'Content-Type': 'application/json',
-                'Accept': 'application/json'
+                'Accept': 'application/json',
+                'Accept-Encoding': ACCEPT_ENCODING
             }
         
         # Full URL
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
         
+        span = self.tracer.start(
+            self._endpoint_name(method, url),
+            **{'http.method': method.upper(), 'http.url': url}
+        )
+        
         try:
             if method.upper() == 'GET':
-                response = requests.get(url, headers=headers, params=params)
-            elif method.upper() == 'POST':
-                response = requests.post(url, headers=headers, json=data)
-            elif method.upper() == 'PATCH':
-                response = requests.patch(url, headers=headers, json=data)  # Use JSON for json-patch+json
-            elif method.upper() == 'PUT':
-                response = requests.put(url, headers=headers, data=data)  # Use form data
-            elif method.upper() == 'DELETE':
-                response = requests.delete(url, headers=headers)
+                # Identical GETs in flight share one network call; each caller
+                # decodes its own copy of the body
+                body = self._inflight.do(
+                    self._request_key(url, params),
+                    lambda: self._fetch_get(url, headers, params, span)
+                )
+                with timed_phase(span, 'decode'):
+                    result = _json_loads(body) if body else {}
             else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+                response = self._send(method, url, headers, params=params, data=data, span=span)
+                response.raise_for_status()
+                with timed_phase(span, 'decode'):
+                    result = decode_json(response)
             
-            response.raise_for_status()
-            return response.json()
+            self.tracer.finish(span)
+            return result
             
-        except requests.RequestException as e:
-            print(f"API request failed: {e}")
-            if hasattr(e, 'response') and e.response:
-                print(f"Response status: {e.response.status_code}")
-                print(f"Response body: {e.response.text}")
+        except Exception as e:
+            self.tracer.finish(span, e)
+            if isinstance(e, requests.RequestException):
+                print(f"API request failed: {e}")
+                if hasattr(e, 'response') and e.response:
+                    print(f"Response status: {e.response.status_code}")
+                    print(f"Response body: {e.response.text}")
             raise
     
     def get_payees_list(self, limit: int = 100, offset: int = 0, status: str = None) -> List[Dict]:
@@ -150,19 +441,61 @@ class TipaltiRestAPI:
             print(f"Failed to get payees list: {e}")
             return []
     
-    def get_payee_details(self, payee_id: str) -> Optional[Dict]:
-        """Get detailed information for a specific payee"""
+    def query(self, page_size: int = 100, page_delay: float = 0.0, **options) -> PayeeQuery:
+        """Build a filtered /payees query (server pushdown + local predicates)
+
+        ``options`` go to PayeeQuery (page_retries, skip_failed_pages).
+        """
+        return PayeeQuery(self, page_size=page_size, page_delay=page_delay, **options)
+    
+    def _fetch_payee_details(self, payee_id: str, use_cache: bool = True) -> Optional[Dict]:
+        """Get payee details (cache first), raising on request failures
+        
+        Callers get their own copy: mutating the result never changes the cache.
+        """
+        
+        if use_cache:
+            cached = self.details_cache.get(payee_id)
+            if cached is not None:
+                return copy.deepcopy(cached)
+        
+        response = self._make_request('GET', f'/payees/{payee_id}')
+        details = response.get('data')
+        if details is not None:
+            self.details_cache.set(payee_id, copy.deepcopy(details))
+        return details
+    
+    def get_payee_details(self, payee_id: str, use_cache: bool = True) -> Optional[Dict]:
+        """Get detailed information for a specific payee (served from cache when fresh)"""
         
         try:
-            response = self._make_request('GET', f'/payees/{payee_id}')
-            return response.get('data')
+            return self._fetch_payee_details(payee_id, use_cache)
         except Exception as e:
             print(f"Failed to get payee details for {payee_id}: {e}")
             return None
     
+    def get_payees_details(self, payee_ids: Iterable[str], concurrency: int = 8,
+                           stream: bool = False) -> Union[List[Dict], Iterator[Dict]]:
+        """Get details for many payees concurrently (respects the client rate limit)
+        
+        Returns one result dict per id: {'id', 'success', 'data', 'error'}.
+        Failures are reported per id and never abort the batch. By default
+        results keep input order; with stream=True they are yielded as they
+        complete.
+        """
+        
+        if stream:
+            return iter_fetch_completed(payee_ids, self._fetch_payee_details, concurrency)
+        return fetch_ordered(payee_ids, self._fetch_payee_details, concurrency)
+    
     def update_payee(self, payee_id: str, data: Dict) -> bool:
         """Update payee information using official PATCH endpoint"""
         
+        # Drop cached details before and after the PATCH, even if it fails
+        # (its outcome is unknown); the second pass evicts a concurrent read
+        # that re-cached the old record while the PATCH was in flight
+        self.details_cache.invalidate(payee_id)
+        
         try:
             response = self._make_request('PATCH', f'/payees/{payee_id}', data=data)
             # If no exception raised, consider it successful
@@ -170,15 +503,16 @@ class TipaltiRestAPI:
         except Exception as e:
             print(f"Failed to update payee {payee_id}: {e}")
             return False
+        finally:
+            self.details_cache.invalidate(payee_id)
     
     def delete_payee(self, payee_id: str) -> Dict:
         """Delete a payee by ID via REST API v2"""
+        self.details_cache.invalidate(payee_id)
+        
         try:
             # Use v2 API endpoint - different base URL structure
-            if self.is_sandbox:
-                delete_url = f"https://api.sandbox.tipalti.com/v2/payees/{payee_id}"
-            else:
-                delete_url = f"https://api.tipalti.com/v2/payees/{payee_id}"
+            delete_url = f"{self.v2_base_url}/payees/{payee_id}"
             
             # Get valid access token
             token = self._get_access_token()
@@ -190,12 +524,15 @@ class TipaltiRestAPI:
                 'Accept': 'application/json'
             }
             
-            response = requests.delete(delete_url, headers=headers)
+            response = self._send('DELETE', delete_url, headers)
             response.raise_for_status()
             
             return {'success': True, 'message': 'Payee deleted successfully', 'response_code': response.status_code}
         except requests.RequestException as e:
             return {'success': False, 'message': f'API request failed: {e}'}
+        finally:
+            # Evict anything re-cached while the DELETE was in flight
+            self.details_cache.invalidate(payee_id)
     
     def deactivate_payee(self, payee_id: str) -> bool:
         """Deactivate a payee"""
@@ -204,6 +541,7 @@ class TipaltiRestAPI:
             'status': 'inactive'  # or whatever the correct status field is
         }
         
+        # update_payee invalidates the details cache for this payee
         return self.update_payee(payee_id, update_data)
     
     def get_payments_list(self, payee_id: str = None, limit: int = 100, offset: int = 0) -> List[Dict]:
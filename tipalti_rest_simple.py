@@ -8,6 +8,7 @@ import requests
 import json
 from typing import Dict, List, Optional
 import config_rest
+from profiling import maybe_profile
 
 
 class TipaltiSimpleRestAPI:
@@ -188,6 +189,7 @@ def test_rest_api():
 
 
 if __name__ == "__main__":
+    maybe_profile()
     print("🧪 Testing Tipalti REST API with different approaches")
     print("📡 This will try various endpoints and authentication methods")
     print()
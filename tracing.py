@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Request Tracing
+Pluggable before/after/error hooks around transport calls with a per-phase
+timing breakdown (dns, connect, tls, ttfb, download, decode)
+"""
+
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+PHASES = ('dns', 'connect', 'tls', 'ttfb', 'download', 'decode')
+CONNECTION_PHASES = ('dns', 'connect', 'tls')
+
+_active = threading.local()
+
+
+class RequestSpan:
+    """One traced transport call
+
+    ``phases`` holds seconds per phase. Connection phases (dns, connect, tls)
+    are only non-zero when the call had to open a new connection; reused
+    pooled connections skip them. ``context`` is free space for hooks (e.g.
+    the OpenTelemetry span object).
+    """
+
+    __slots__ = ('name', 'attributes', 'start_time', 'end_time', 'phases', 'error', 'context')
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.error: Optional[BaseException] = None
+        self.context: Dict[str, Any] = {}
+
+    def add_phase(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + max(0.0, seconds)
+
+    def connection_time(self) -> float:
+        return sum(self.phases.get(phase, 0.0) for phase in CONNECTION_PHASES)
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        end = self.end_time if self.end_time is not None else time.time()
+        return end - self.start_time
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'attributes': self.attributes,
+            'start_time': self.start_time,
+            'duration_ms': round(self.duration * 1000, 3),
+            'phases_ms': {phase: round(seconds * 1000, 3) for phase, seconds in self.phases.items()},
+            'error': repr(self.error) if self.error else None
+        }
+
+
+def current_span() -> Optional[RequestSpan]:
+    """Span active in this thread (set while a transport call is in progress)"""
+    return getattr(_active, 'span', None)
+
+
+class activate:
+    """Context manager making ``span`` the thread's active span"""
+
+    def __init__(self, span: Optional[RequestSpan]):
+        self.span = span
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = current_span()
+        _active.span = self.span
+        return self.span
+
+    def __exit__(self, *exc):
+        _active.span = self.previous
+        return False
+
+
+class Tracer:
+    """Dispatches span lifecycle events to registered hooks
+
+    A hook is any object with optional ``before(span)``, ``after(span)`` and
+    ``error(span, exc)`` methods. Hook failures are reported and swallowed so
+    tracing can never break a request.
+    """
+
+    def __init__(self):
+        self.hooks: List[Any] = []
+
+    def add_hook(self, hook):
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def _call(self, method: str, *args):
+        for hook in self.hooks:
+            fn = getattr(hook, method, None)
+            if fn is None:
+                continue
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"⚠️ Trace hook {type(hook).__name__}.{method} failed: {e}")
+
+    def start(self, name: str, **attributes) -> RequestSpan:
+        span = RequestSpan(name, attributes)
+        self._call('before', span)
+        return span
+
+    def finish(self, span: RequestSpan, error: Optional[BaseException] = None):
+        span.end_time = time.time()
+        if error is not None:
+            span.error = error
+            self._call('error', span, error)
+        else:
+            self._call('after', span)
+
+
+class timed_phase:
+    """Context manager adding elapsed time to a span phase (no-op without a span)"""
+
+    def __init__(self, span: Optional[RequestSpan], phase: str):
+        self.span = span
+        self.phase = phase
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.span is not None:
+            self.span.add_phase(self.phase, time.perf_counter() - self.started)
+        return False
+
+
+# Connection-level timing (urllib3)
+
+class _TimedConnectionMixin:
+    """Times DNS, TCP connect and TLS handshake of new connections"""
+
+    def _new_conn(self):
+        span = current_span()
+        if span is None:
+            return super()._new_conn()
+
+        started = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)
+        except OSError:
+            # Let urllib3 raise its usual NameResolutionError
+            return super()._new_conn()
+        resolved = time.perf_counter()
+        span.add_phase('dns', resolved - started)
+
+        # Connect to the address we just resolved (SNI/cert checks still use self.host)
+        original_host = self._dns_host
+        self._dns_host = infos[0][4][0]
+        try:
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = original_host
+        span.add_phase('connect', time.perf_counter() - resolved)
+        return sock
+
+    def connect(self):
+        span = current_span()
+        if span is None:
+            return super().connect()
+
+        before = span.phases.get('dns', 0.0) + span.phases.get('connect', 0.0)
+        started = time.perf_counter()
+        super().connect()
+        total = time.perf_counter() - started
+
+        if isinstance(self, HTTPSConnection):
+            socket_setup = span.phases.get('dns', 0.0) + span.phases.get('connect', 0.0) - before
+            span.add_phase('tls', total - socket_setup)
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """requests adapter whose connections report dns/connect/tls phases"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool
+        }
+
+
+# Hooks
+
+class OpenTelemetryHook:
+    """Bridges spans to an OpenTelemetry tracer
+
+    Usage:
+        from opentelemetry import trace
+        api.tracer.add_hook(OpenTelemetryHook(trace.get_tracer('tipalti')))
+    """
+
+    def __init__(self, otel_tracer):
+        self.otel_tracer = otel_tracer
+
+    def before(self, span: RequestSpan):
+        span.context['otel_span'] = self.otel_tracer.start_span(
+            span.name, attributes=self._attributes(span), start_time=int(span.start_time * 1e9)
+        )
+
+    def _finish(self, span: RequestSpan):
+        otel_span = span.context.get('otel_span')
+        if otel_span is None:
+            return None
+        for key, value in self._attributes(span).items():
+            otel_span.set_attribute(key, value)
+        for phase, seconds in span.phases.items():
+            otel_span.set_attribute(f"tipalti.phase.{phase}_ms", round(seconds * 1000, 3))
+        return otel_span
+
+    def after(self, span: RequestSpan):
+        otel_span = self._finish(span)
+        if otel_span is not None:
+            otel_span.end(end_time=int(span.end_time * 1e9))
+
+    def error(self, span: RequestSpan, exc: BaseException):
+        otel_span = self._finish(span)
+        if otel_span is None:
+            return
+        otel_span.record_exception(exc)
+        try:
+            from opentelemetry.trace import Status, StatusCode
+            otel_span.set_status(Status(StatusCode.ERROR, str(exc)))
+        except ImportError:
+            otel_span.set_attribute('error', True)
+        otel_span.end(end_time=int(span.end_time * 1e9))
+
+    @staticmethod
+    def _attributes(span: RequestSpan) -> Dict[str, Any]:
+        return {key: value for key, value in span.attributes.items()
+                if isinstance(value, (str, bool, int, float))}
+
+
+class SpanRecorder:
+    """Keeps finished spans in memory (handy for profiling a sweep)"""
+
+    def __init__(self, limit: int = 10000):
+        self.limit = limit
+        self.spans: List[RequestSpan] = []
+        self._lock = threading.Lock()
+
+    def _keep(self, span: RequestSpan):
+        with self._lock:
+            self.spans.append(span)
+            if len(self.spans) > self.limit:
+                del self.spans[0]
+
+    def after(self, span: RequestSpan):
+        self._keep(span)
+
+    def error(self, span: RequestSpan, exc: BaseException):
+        self._keep(span)
+
+    def phase_totals(self) -> Dict[str, float]:
+        """Total seconds per phase across recorded spans"""
+        totals = {phase: 0.0 for phase in PHASES}
+        with self._lock:
+            for span in self.spans:
+                for phase, seconds in span.phases.items():
+                    totals[phase] = totals.get(phase, 0.0) + seconds
+        return totals